@@ -0,0 +1,594 @@
+"""Concrete implementation for the Dirty Pipeline enricher.
+
+Implementative details
+----------------------
+The dirty pipeline enricher is an enricher based on the original dirty pipeline
+built as a sequence of python repositories. This enricher is meant to be a temporary
+solution to provide the complete enrichment for a given user provided payload, but
+it really isn't meant to be a long term solution.
+
+We want a precise clockwork swiss army knife for the enrichment, and the dirty pipeline
+is more like a pipebomb. 
+"""
+from typing import Dict, Iterator, List, Optional
+import hashlib
+import shutil
+import os
+import subprocess
+from downloaders import BaseDownloader
+from downloaders.extractors import AutoExtractor
+
+from alchemy_wrapper.models import (
+    DataPayload,
+    Task,
+    Document,
+    TaskRelatedDocument,
+    TaskType,
+    DerivedTask,
+)
+from enrichers import Enricher
+from enrichers.resource_usage import ResourceAccounting
+from enrichers.shutdown import ShutdownRequested
+
+
+class DirtyPipelineEnricher(Enricher):
+    """Concrete implementation for the Dirty Pipeline enricher."""
+
+    def __init__(self):
+        """Initialize the Dirty Pipeline enricher."""
+        super().__init__()
+        self._extractor = AutoExtractor()
+        self._downloader = BaseDownloader(auto_extract=False)
+        self._root = "/app/enpkg_full/"
+        self._output_path = "/app/temporary_output/"
+
+        self._prepare_resources()
+
+        # We create the TaskType entries for the steps of the dirty pipeline.
+        steps = [
+            {
+                "name": "Data organization",
+                "description": "Ensures that the data is organized in a way that is compatible with the pipeline.",
+            },
+            {
+                "name": "Massive ID",
+                "description": "Adds massive ID to the data.",
+            },
+            {
+                "name": "Taxonomy enhancer",
+                "description": "Adds taxonomy information to the data.",
+            },
+            {
+                "name": "ISDB annotation",
+                "description": "Proceeds to ISDB annotations to the data.",
+            },
+            {
+                "name": "Sirius/Canopus",
+                "description": "Adds annotations to the data.",
+            },
+            {
+                "name": "Chemo info fetcher",
+                "description": "Adds annotations to the data.",
+            },
+            {
+                "name": "Memo unaligned repo",
+                "description": "Adds annotations to the data.",
+            },
+            {
+                "name": "Graph builder step 1",
+                "description": "First step of the graph builder.",
+            },
+            {
+                "name": "Graph builder step 2",
+                "description": "Second step of the graph builder.",
+            },
+            {
+                "name": "Graph builder step 3",
+                "description": "Third step of the graph builder.",
+            },
+            {
+                "name": "Graph builder step 4",
+                "description": "Fourth step of the graph builder.",
+            },
+            {
+                "name": "Graph builder step 5",
+                "description": "Fifth step of the graph builder.",
+            },
+            {
+                "name": "Graph builder step 6",
+                "description": "Sixth step of the graph builder.",
+            },
+            {
+                "name": "Graph builder step 7",
+                "description": "Seventh step of the graph builder.",
+            },
+            {
+                "name": "Graph builder step 8",
+                "description": "Eighth step of the graph builder.",
+            },
+            {
+                "name": "Graph builder step 9",
+                "description": "Ninth step of the graph builder.",
+            },
+            {
+                "name": "Graph builder step 10",
+                "description": "Tenth step of the graph builder.",
+            }
+        ]
+
+        for step in steps:
+            if self._session.query(TaskType).filter_by(name=step["name"]).first():
+                continue
+            task_type = TaskType(
+                name=step["name"],
+                description=step["description"],
+            )
+            self._session.add(task_type)
+
+        # We populate an array with the task types.
+        self._task_type_ids = [
+            self._session.query(TaskType).filter_by(name=step["name"]).first().id
+            for step in steps
+        ]
+
+        # The tasks associated to the data payloads are created by the website,
+        # with the same task type used in DataPayload.new_data_payload.
+        payload_task_type = (
+            self._session.query(TaskType)
+            .filter_by(name="Data payload processing")
+            .first()
+        )
+        if payload_task_type is None:
+            payload_task_type = TaskType(
+                name="Data payload processing",
+                description="Task type for data payload processing.",
+            )
+            self._session.add(payload_task_type)
+            self._session.flush()
+        self._payload_task_type_id = payload_task_type.id
+        self._session.commit()
+
+    @classmethod
+    def repository(cls) -> str:
+        """Name of the repository providing these specific metadata."""
+        return "Dirty Pipeline"
+
+    @classmethod
+    def name(cls) -> str:
+        """Name of the enricher."""
+        return "Dirty Pipeline"
+
+    def _prepare_resources(self):
+        """Download and prepare the databases required by the steps of the pipeline."""
+        self._frozen_metadata = "/app/enpkg_full/03_enpkg_mn_isdb_isdb_taxo/db_metadata/230106_frozen_metadata.csv.gz"
+        # Only the downloads are guarded by the circuit breaker of the
+        # repository, so that the local errors do not open the circuit.
+        self._call_remote(
+            self._downloader.download,
+            "https://drive.switch.ch/index.php/s/T09ictsnhv59UOy/download",
+            # "https://zenodo.org/record/7534071/files/230106_frozen_metadata.csv.gz",
+            self._frozen_metadata,
+        )
+
+        subprocess.run(
+            [
+                "python",
+                f"{self._root}03_enpkg_mn_isdb_isdb_taxo/src/adducts_formatter.py",
+                "-p",
+                "./db_metadata/230106_frozen_metadata.csv.gz",
+            ],
+            check=True,
+            capture_output=True,
+        )
+
+        self._call_remote(
+            self._downloader.download,
+            "https://drive.switch.ch/index.php/s/FqZHW4Qmo1bx2mz/download",
+            # "https://zenodo.org/records/8287341/files/isdb_pos_cleaned.pkl",
+            "/app/enpkg_full/03_enpkg_mn_isdb_isdb_taxo/db_spectra/isdb_pos_cleaned.pkl",
+        )
+
+    def _select_enrichables(self, enrichables: List[DataPayload]) -> List[DataPayload]:
+        """Returns the payloads of the batch that can be enriched.
+
+        Parameters
+        ----------
+        enrichables
+            batch of candidate enrichables.
+
+        Implementation details
+        ----------------------
+        The payloads that can be enriched by the dirty pipeline are the ones
+        associated to tasks that are still PENDING.
+        """
+        payloads = [
+            enrichable
+            for enrichable in enrichables
+            if isinstance(enrichable, DataPayload)
+        ]
+        if not payloads:
+            return []
+
+        pending_task_ids = {
+            task_id
+            for (task_id,) in self._session.query(Task.id).filter(
+                Task.id.in_([payload.task_id for payload in payloads]),
+                Task.status == "PENDING",
+            )
+        }
+        return [payload for payload in payloads if payload.task_id in pending_task_ids]
+
+    def _get_task_type_ids(self) -> List[int]:
+        """Returns the ids of the task types of the tasks executed by this enricher.
+
+        Implementation details
+        ----------------------
+        The derived tasks of the steps of the pipeline are not included, as the
+        heartbeats are emitted for the data payload task only. When an abandoned
+        data payload task is resumed, its derived tasks are executed again.
+        """
+        return [*super()._get_task_type_ids(), self._payload_task_type_id]
+
+    def _get_round_budget(self) -> int:
+        """Returns the maximal number of payloads enriched in a single round.
+
+        Implementative details
+        ----------------------
+        A run of the dirty pipeline may take hours, so we keep the rounds short
+        in order not to hold the discovery cursor open for too long and so that
+        the payloads uploaded in the meantime are scheduled promptly.
+        """
+        return 10
+
+    def _get_new_elements_to_enrich(self) -> Iterator[DataPayload]:
+        """Yields the new elements to enrich.
+
+        Implementation details
+        ----------------------
+        The new elements to enrich are the ones that are associated to a task with
+        status PENDING, excluding the ones waiting to be retried. They are ordered
+        by the priority of their task and then fairly across the users who uploaded
+        them, so that a user uploading many payloads does not starve the others.
+        """
+        return self._stream_candidates(
+            self.scheduler.order(
+                self._session.query(DataPayload)
+                .join(Task, Task.id == DataPayload.task_id)
+                .filter(Task.status == "PENDING", Task.is_due()),
+                user_id=DataPayload.user_id,
+                created_at=Task.created_at,
+                priority=Task.priority,
+            )
+        )
+
+    def _get_existing_task(self, enrichable: DataPayload) -> Optional[Task]:
+        # In the case of the data payload, there is no need
+        # to create a new entry in the task table, as there is
+        # already one associated to the data payload.
+        return self._session.query(Task).filter_by(id=enrichable.task_id).first()
+
+    def _create_new_derived_task(self, task_id: int, task_number: int) -> Task:
+        """Create a new derived task.
+
+        Parameters
+        ----------
+        task_id
+            id of the task to derive.
+        task_number
+            number of the task to derive.
+
+        Returns
+        -------
+        derived_task
+            derived task.
+
+        """
+        # First we check whether this subtask has already been created
+        # for this parent task.
+        # 
+        # We want to join the Derived Task table and the Task table on the
+        # keys derived_task_id and id respectively. Then we want to filter
+        # by the parent_task_id and the task_type_id, with the first being
+        # a column of the Derived Task table and the second being a column
+        # of the Task table.
+        #
+        # We order the results by the created_at column of the Task table
+        # in descending order, so that the most recent one is the first one.
+        #
+
+        derived_task = (
+            self._session.query(Task)
+            .join(DerivedTask, DerivedTask.derived_task_id == Task.id)
+            .filter(DerivedTask.parent_task_id == task_id)
+            .filter(Task.task_type_id == self._task_type_ids[task_number])
+            .order_by(Task.created_at.desc())
+            .first()
+        )
+
+        if derived_task is not None:
+            if derived_task.has_failed():
+                derived_task.restart(session=self._session)
+            return derived_task
+
+        derived_task = Task(
+            task_type_id=self._task_type_ids[task_number],
+            user_id=self.id,
+        )
+
+        self._session.add(derived_task)
+        self._session.flush()
+
+        self._session.add(
+            DerivedTask(
+                parent_task_id=task_id,
+                derived_task_id=derived_task.id,
+            )
+        )
+        self._session.commit()
+
+        return derived_task
+
+    def _get_step_commands(self, extraction_path: str) -> List[str]:
+        """Returns the commands executing the steps of the dirty pipeline, in order.
+
+        Parameters
+        ----------
+        extraction_path
+            path where the data payload was extracted.
+
+        Implementation details
+        ----------------------
+        The i-th command is executed within the derived task with the i-th
+        task type of the steps of the dirty pipeline.
+        """
+        return [
+            (
+                f'bash -c "source activate enpkg_full; python {self._root}01_enpkg_data_organization/src/create_architecture.py '
+                f"--source_path {extraction_path}/msdata/processed "
+                f"--target_path {self._output_path} --source_metadata_path {extraction_path}/metadata "
+                f"--sample_metadata_filename dbgi_tropical_toydataset_metadata.tsv --lcms_method_params_filename "
+                "dbgi_tropical_toydataset_lcms_params.txt --lcms_processing_params_filename "
+                'dbgi_tropical_toydataset_mzmine_params.xml --polarity pos"'
+            ),
+            (
+                f'bash -c "source activate enpkg_full; python {self._root}01_enpkg_data_organization/src/add_massive_id.py '
+                f'--massive_id MSV000092400 -p {self._output_path}"'
+            ),
+            (
+                f'bash -c "source activate enpkg_full; python {self._root}02_enpkg_taxo_enhancer/src/taxo_info_fetcher.py '
+                f'-p {self._output_path} -f"'
+            ),
+            f'bash -c "source activate enpkg_full; python {self._root}03_enpkg_mn_isdb_isdb_taxo/src/nb_indifile.py"',
+            f'bash -c "source activate enpkg_full; python {self._root}04_enpkg_sirius_canopus/src/sirius_canopus_by_file.py"',
+            f'bash -c "source activate enpkg_full; python {self._root}05_enpkg_meta_analysis/src/chemo_info_fetcher.py -p {self._output_path} --sql_name structures_metadata.db"',
+            f'bash -c "source activate enpkg_full; python {self._root}05_enpkg_meta_analysis/src/memo_unaligned_repo.py -p {self._output_path} --ionization pos --output memo_matrix"',
+            f'bash -c "source activate enpkg_full; python {self._root}06_enpkg_graph_builder/src/individual_processing/01_a_rdf_enpkg_metadata_indi.py"',
+            # The step 01_b_rdf_enpkgmodule_metadata_indi.py is currently disabled.
+            # f'bash -c "source activate enpkg_full; python {self._root}06_enpkg_graph_builder/src/individual_processing/01_b_rdf_enpkgmodule_metadata_indi.py"',
+            f'bash -c "source activate enpkg_full; python {self._root}06_enpkg_graph_builder/src/individual_processing/02_a_rdf_features_indi.py"',
+            f'bash -c "source activate enpkg_full; python {self._root}06_enpkg_graph_builder/src/individual_processing/02_b_rdf_features_spec2vec_indi.py"',
+            f'bash -c "source activate enpkg_full; python {self._root}06_enpkg_graph_builder/src/individual_processing/03_rdf_csi_annotations_indi.py"',
+            f'bash -c "source activate enpkg_full; python {self._root}06_enpkg_graph_builder/src/individual_processing/04_rdf_canopus_indi.py"',
+            f'bash -c "source activate enpkg_full; python {self._root}06_enpkg_graph_builder/src/individual_processing/05_rdf_isdb_annotations_indi.py"',
+            f'bash -c "source activate enpkg_full; python {self._root}06_enpkg_graph_builder/src/individual_processing/06_rdf_individual_mn_indi.py"',
+            f'bash -c "source activate enpkg_full; python {self._root}06_enpkg_graph_builder/src/individual_processing/07_rdf_structures_metadata_indi.py"',
+            f'bash -c "source activate enpkg_full; python {self._root}06_enpkg_graph_builder/src/individual_processing/08_rdf_merger.py"',
+            f'bash -c "source activate enpkg_full; python {self._root}06_enpkg_graph_builder/src/individual_processing/09_rdf_exporter.py"',
+        ]
+
+    def _run_step(self, derived_task: Task, command: str):
+        """Executes a step of the dirty pipeline within the provided derived task.
+
+        Parameters
+        ----------
+        derived_task
+            derived task associated to the step.
+        command
+            shell command executing the step.
+        """
+        # Whether the derived task was just created, restarted after a failure
+        # or released upon a shutdown, each execution of the step is an attempt.
+        derived_task.start(session=self._session)
+        try:
+            with ResourceAccounting(
+                task_id=derived_task.id,
+                attempt=derived_task.attempts,
+                logger=self._logger,
+            ), self._metrics.time_enrichment(self._get_task_type_name(derived_task)):
+                subprocess.run(
+                    command,
+                    shell=True,
+                    check=True,
+                    capture_output=True,
+                )
+        except subprocess.CalledProcessError as process_exception:
+            derived_task.failure(session=self._session, reason=process_exception)
+            raise process_exception
+
+        derived_task.success(session=self._session)
+
+    def _enrich(self, enrichable: DataPayload, task: Task) -> Optional[Dict[str, str]]:
+        """Enrich the metadata of a enrichable class.
+
+        Parameters
+        ----------
+        enrichable
+            enrichable class to enrich.
+
+        Returns
+        -------
+        The path of the enriched archive, or None if the payload could not be extracted.
+        """
+        # We set the status of the task associated to the enrichable to STARTED.
+        path = enrichable.get_unsafe_path()
+
+        results = self._extractor.extract(path)[0]
+
+        if not results["success"]:
+            return None
+
+        extraction_path = results["destination"]
+
+        # We execute the dirty pipeline, which is composed
+        # by a sequence of python scripts with parameters.
+
+        shutil.rmtree(self._output_path, ignore_errors=True)
+        os.makedirs(self._output_path, exist_ok=True)
+        restored = self._restore_checkpoint(task)
+
+        # We create a new derived task for each step of the dirty pipeline,
+        # and we execute the steps in order.
+        for task_number, command in enumerate(self._get_step_commands(extraction_path)):
+            derived_task = self._create_new_derived_task(
+                task.id,
+                task_number=task_number,
+            )
+            # When resuming from a checkpoint, the steps that already
+            # succeeded are not executed again.
+            if restored and derived_task.status == "SUCCESS":
+                continue
+            if self.is_stopping():
+                self._save_checkpoint(task)
+                raise ShutdownRequested(
+                    f"Checkpointed task {task.id} before step {task_number}."
+                )
+            try:
+                self._run_step(derived_task, command)
+            except ShutdownRequested:
+                # The step was interrupted by the shutdown deadline: it will be
+                # executed again by the replica resuming from the checkpoint.
+                self._session.rollback()
+                derived_task.release(session=self._session, count_attempt=False)
+                self._save_checkpoint(task)
+                raise
+
+        # We zip the output directory as a tar.gz file and we move it to the safe subdirectory.
+
+        subprocess.run(
+            [
+                "tar",
+                "-czvf",
+                enrichable.get_safe_path(),
+                self._output_path,
+            ],
+            check=True,
+            capture_output=True,
+        )
+
+        self._register_output(enrichable, task)
+        self._discard_checkpoint(task)
+
+        return {"path": enrichable.get_safe_path()}
+
+    def _get_checkpoint_path(self, task: Task) -> str:
+        """Returns the path of the checkpoint of the pipeline output of the task.
+
+        Implementative details
+        ----------------------
+        The checkpoint is stored in the safe volume, which is shared by the
+        replicas of the enricher, so that any of them can resume the task.
+        """
+        return f"/app/safe/tasks/{task.id}/checkpoint.tar.gz"
+
+    def _save_checkpoint(self, task: Task):
+        """Archive the current output of the pipeline as the checkpoint of the task."""
+        checkpoint_path = self._get_checkpoint_path(task)
+        os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+        # We write the archive aside and then move it, so that a checkpoint
+        # interrupted by the container being killed is never restored.
+        subprocess.run(
+            ["tar", "-czf", f"{checkpoint_path}.partial", self._output_path],
+            check=True,
+            capture_output=True,
+        )
+        os.replace(f"{checkpoint_path}.partial", checkpoint_path)
+        self._logger.info(f"Saved the checkpoint of task {task.id}.")
+
+    def _restore_checkpoint(self, task: Task) -> bool:
+        """Restore the output of the pipeline from the checkpoint of the task, if any.
+
+        Returns
+        -------
+        Whether a checkpoint was restored.
+        """
+        checkpoint_path = self._get_checkpoint_path(task)
+        if not os.path.exists(checkpoint_path):
+            return False
+        # The archive stores the output directory relatively to the root.
+        subprocess.run(
+            ["tar", "-xzf", checkpoint_path, "-C", "/"],
+            check=True,
+            capture_output=True,
+        )
+        self._logger.info(f"Resuming task {task.id} from its checkpoint.")
+        return True
+
+    def _discard_checkpoint(self, task: Task):
+        """Remove the checkpoint of a completed task."""
+        checkpoint_path = self._get_checkpoint_path(task)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+    def _register_output(self, enrichable: DataPayload, task: Task):
+        """Register the enriched archive of the payload as a document of the task.
+
+        Parameters
+        ----------
+        enrichable
+            enrichable class whose safe path contains the enriched archive.
+        task
+            task to which the document is related.
+        """
+        # We create a new document entry in the database.
+        document = Document(
+            name=f"Dirty Pipeline enrichment for task {task.id}",
+            description=f"Dirty Pipeline enrichment for task {task.id}",
+            path=enrichable.get_safe_path(),
+            user_id=self.id,
+        )
+
+        self._session.add(document)
+        self._session.flush()
+
+        # We insert a new entry for relationship between the task and the document.
+        task_document = TaskRelatedDocument(
+            task_id=task.id,
+            document_id=document.id,
+        )
+
+        self._session.add(task_document)
+        self._session.commit()
+
+    def _get_cache_input(self, enrichable: DataPayload) -> Dict[str, str]:
+        """Returns the SHA256 hash of the content of the payload.
+
+        Implementative details
+        ----------------------
+        The output of the dirty pipeline only depends on the content of the
+        payload, so identical payloads uploaded by different users, or
+        uploaded twice by the same user, are enriched only once.
+        """
+        digest = hashlib.sha256()
+        with open(enrichable.get_unsafe_path(), "rb") as payload:
+            for chunk in iter(lambda: payload.read(1 << 20), b""):
+                digest.update(chunk)
+        return {"payload_sha256": digest.hexdigest()}
+
+    def _enrich_from_cache(
+        self, enrichable: DataPayload, task: Task, result: Dict[str, str]
+    ) -> Optional[Dict[str, str]]:
+        """Copy the archive of an identical payload instead of running the pipeline.
+
+        Implementative details
+        ----------------------
+        If the cached archive is not available anymore, for instance because
+        it was deleted together with its payload, the cached result is stale,
+        and the pipeline is executed through the regular enrichment path.
+        """
+        if not os.path.exists(result["path"]):
+            return None
+
+        shutil.copyfile(result["path"], enrichable.get_safe_path())
+        self._register_output(enrichable, task)
+
+        return {"path": enrichable.get_safe_path()}
@@ -1,5 +1,5 @@
 """Run the Dirty Pipeline Enricher."""
-from src import DirtyPipelineEnricher
+from dirty_pipeline_enricher import DirtyPipelineEnricher
 
 if __name__ == "__main__":
     DirtyPipelineEnricher().start_service()
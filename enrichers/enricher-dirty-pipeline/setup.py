@@ -0,0 +1,21 @@
+"""Module installing the Dirty Pipeline enricher."""
+from setuptools import find_packages, setup
+
+setup(
+    name='dirty_pipeline_enricher',
+    version="0.0.1",
+    description='Enricher of the data payloads with the dirty pipeline.',
+    author="Luca Cappelletti", # Other authors can be added here
+    license='MIT',
+    python_requires='>=3.8.0',
+    packages=find_packages(
+        include=['dirty_pipeline_enricher', 'dirty_pipeline_enricher.*']
+    ),
+    install_requires=["alchemy-wrapper", "enrichers", "downloaders"],
+    include_package_data=True,
+    entry_points={
+        "emikg.enrichers": [
+            "dirty_pipeline = dirty_pipeline_enricher:DirtyPipelineEnricher"
+        ],
+    },
+)
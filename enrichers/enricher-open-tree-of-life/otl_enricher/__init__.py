@@ -0,0 +1,11 @@
+from alchemy_wrapper.models.base import Base
+from alchemy_wrapper.database import engine
+from alchemy_wrapper.migrations import apply_migrations
+from .migrations import MIGRATIONS
+from .otl_enricher import OTLEnricher
+from .taxonomy_tree import TaxonomyTree
+
+Base.metadata.create_all(bind=engine)
+apply_migrations(engine, MIGRATIONS)
+
+__all__ = ["OTLEnricher", "TaxonomyTree"]
\ No newline at end of file
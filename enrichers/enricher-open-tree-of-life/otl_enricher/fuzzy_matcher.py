@@ -0,0 +1,282 @@
+"""Submodule providing the local fuzzy matching of the taxon names already resolved.
+
+Implementative details
+----------------------
+The Taxonomic Name Resolution Service is asked for approximate matches, which are slow to
+compute remotely, even for names that are trivial misspellings of names already resolved,
+such as "Homo sapeins". The FuzzyMatcher therefore keeps an in-process trigram index of the
+names resolved so far, i.e. both the names of the enriched taxa and the resolved names of
+their open_tree_of_life entries, and answers the close matches of a name locally.
+
+The trigrams of a name are the sequences of three characters of the name, padded with two
+spaces at its start and one at its end, as the pg_trgm extension of Postgres does. A single
+edit of a name changes at most four of its trigrams, so any name within the allowed edit
+distance shares at least one of the rarest trigrams of the searched name: the candidates
+are retrieved from the postings of these trigrams only, those missing too many trigrams of
+the name are discarded, and the others are verified with their edit distance, counting the
+transpositions of adjacent characters as single edits.
+
+A match is only served locally when it is of high confidence, i.e. its similarity is above
+the minimal similarity and no candidate of another taxon is almost as similar. Otherwise,
+the name is left to the remote service.
+
+The index is refreshed incrementally, loading the entries created since the last refresh,
+optionally restricted to the entries of a version of the taxonomy, such as the version of
+the offline taxonomy, so that the names of the outdated entries are never served. As the
+entries refreshed to a new version of the taxonomy keep their ids, the index is reset after
+such a refresh, and loaded again from the first entry.
+It is bounded to a maximal number of names: once it is exceeded, the least recently used
+names, i.e. the ones neither indexed again nor matched for the longest time, are removed
+along with their postings, so that the memory of the service does not grow with the number
+of enriched taxa.
+"""
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from collections import OrderedDict, defaultdict
+import math
+from sqlalchemy import select
+from alchemy_wrapper.database import Session
+from alchemy_wrapper.models import Taxon
+from .models import OpenTreeOfLifeEntry, OpenTreeOfLifeNode
+from .offline_taxonomy import normalize_taxon_name
+
+
+def get_trigrams(name: str) -> FrozenSet[str]:
+    """Returns the trigrams of the provided normalized name."""
+    padded = f"  {name} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def get_edit_distance(first: str, second: str) -> int:
+    """Returns the edit distance between the names, counting transpositions as single edits."""
+    before_previous_row = previous_row = None
+    row = list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        previous_row, row = row, [i] + [0] * len(second)
+        for j in range(1, len(second) + 1):
+            row[j] = min(
+                previous_row[j] + 1,
+                row[j - 1] + 1,
+                previous_row[j - 1] + (first[i - 1] != second[j - 1]),
+            )
+            if (
+                i > 1
+                and j > 1
+                and first[i - 1] == second[j - 2]
+                and first[i - 2] == second[j - 1]
+            ):
+                row[j] = min(row[j], before_previous_row[j - 2] + 1)
+        before_previous_row = previous_row
+    return row[-1]
+
+
+class FuzzyMatcher:
+    """In-process trigram index of the taxon names already resolved."""
+
+    def __init__(
+        self,
+        minimal_similarity: float = 0.9,
+        minimal_margin: float = 0.05,
+        maximal_number_of_names: int = 100_000,
+        taxonomy_version: Optional[str] = None,
+    ) -> None:
+        """Initialize the fuzzy matcher.
+
+        Parameters
+        ----------
+        minimal_similarity
+            minimal similarity, i.e. one minus the edit distance relative to the
+            length of the longest name, of a match served locally.
+        minimal_margin
+            minimal difference of similarity between the match and the most
+            similar candidate of another taxon for the match to be served locally.
+        maximal_number_of_names
+            number of indexed names above which the least recently used ones
+            are removed from the index.
+        taxonomy_version
+            version of the taxonomy of the indexed entries, if restricted.
+        """
+        self.minimal_similarity = minimal_similarity
+        self.minimal_margin = minimal_margin
+        self.maximal_number_of_names = maximal_number_of_names
+        self.taxonomy_version = taxonomy_version
+        # The indexed names by id, with the ott id, the resolved name, the
+        # synonym status, the rank and the taxonomy version of their entry.
+        self._names: Dict[int, str] = {}
+        self._entries: Dict[int, Tuple[int, str, bool, Optional[str], str]] = {}
+        # The ids of the indexed names, from the least to the most recently used.
+        self._name_ids: "OrderedDict[str, int]" = OrderedDict()
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._next_name_id = 0
+        self._last_entry_id = 0
+
+    def __len__(self) -> int:
+        """Returns the number of indexed names."""
+        return len(self._names)
+
+    def _add(self, name: str, entry: Tuple[int, str, bool, Optional[str], str]):
+        """Index the provided normalized name, resolved as the provided entry."""
+        if name in self._name_ids:
+            self._name_ids.move_to_end(name)
+            return
+        name_id = self._next_name_id
+        self._next_name_id += 1
+        self._name_ids[name] = name_id
+        self._names[name_id] = name
+        self._entries[name_id] = entry
+        for trigram in get_trigrams(name):
+            self._postings[trigram].add(name_id)
+        while len(self._name_ids) > self.maximal_number_of_names:
+            self._remove_least_recently_used()
+
+    def _remove_least_recently_used(self):
+        """Removes the least recently used name from the index, along with its postings."""
+        name, name_id = self._name_ids.popitem(last=False)
+        del self._names[name_id]
+        del self._entries[name_id]
+        for trigram in get_trigrams(name):
+            posting = self._postings[trigram]
+            posting.discard(name_id)
+            if not posting:
+                del self._postings[trigram]
+
+    def reset(self):
+        """Removes all the indexed names, so that the next refresh loads all the entries again."""
+        self._names.clear()
+        self._entries.clear()
+        self._name_ids.clear()
+        self._postings.clear()
+        self._next_name_id = 0
+        self._last_entry_id = 0
+
+    def refresh(self) -> int:
+        """Index the names of the entries created since the last refresh.
+
+        Returns
+        -------
+        The number of loaded entries.
+        """
+        query = (
+            select(
+                OpenTreeOfLifeEntry.id,
+                Taxon.name,
+                OpenTreeOfLifeEntry.ott_id,
+                OpenTreeOfLifeEntry.resolved_taxon_name,
+                OpenTreeOfLifeEntry.is_synonym,
+                OpenTreeOfLifeNode.rank,
+                OpenTreeOfLifeEntry.version,
+            )
+            .join(Taxon, Taxon.id == OpenTreeOfLifeEntry.taxon_id)
+            .outerjoin(
+                OpenTreeOfLifeNode,
+                OpenTreeOfLifeNode.ott_id == OpenTreeOfLifeEntry.ott_id,
+            )
+            .where(OpenTreeOfLifeEntry.id > self._last_entry_id)
+            .order_by(OpenTreeOfLifeEntry.id)
+        )
+        if self.taxonomy_version is not None:
+            query = query.where(OpenTreeOfLifeEntry.version == self.taxonomy_version)
+        session = Session()
+        try:
+            rows = session.execute(query).all()
+        finally:
+            session.close()
+
+        for entry_id, taxon_name, *entry in rows:
+            entry = tuple(entry)
+            self._add(normalize_taxon_name(entry[1]), entry)
+            self._add(normalize_taxon_name(taxon_name), entry)
+            self._last_entry_id = entry_id
+        return len(rows)
+
+    def match(self, taxon_name: str) -> Optional[Dict]:
+        """Returns the high-confidence local match of the provided name, if any.
+
+        Parameters
+        ----------
+        taxon_name
+            name to match, which is normalized.
+
+        Returns
+        -------
+        The match of the name, in the format of the responses of the tnrs_match
+        endpoint for a single name, or None if the name has no match of high
+        confidence, and should be resolved by the remote service.
+        """
+        search_string = normalize_taxon_name(taxon_name)
+        # The similarity is relative to the longest name, so a longer
+        # candidate may be slightly more distant than a shorter one.
+        maximal_distance = math.floor(
+            (1 - self.minimal_similarity) * len(search_string) / self.minimal_similarity
+        )
+        # Any name within the maximal distance shares all but four trigrams
+        # per edit with the searched name, and so at least one of its rarest.
+        maximal_number_of_missing_trigrams = 4 * maximal_distance
+        postings = sorted(
+            (
+                self._postings.get(trigram, set())
+                for trigram in get_trigrams(search_string)
+            ),
+            key=len,
+        )
+
+        candidates = set()
+        for posting in postings[: maximal_number_of_missing_trigrams + 1]:
+            candidates.update(posting)
+
+        # The most similar candidate, and the most similar one of another taxon.
+        best, best_similarity, runner_up_similarity = None, 0.0, 0.0
+        for name_id in candidates:
+            name = self._names[name_id]
+            if abs(len(name) - len(search_string)) > maximal_distance:
+                continue
+            # The edit distance is only computed for the candidates sharing
+            # enough trigrams to be within the maximal distance.
+            number_of_missing_trigrams = sum(
+                name_id not in posting for posting in postings
+            )
+            if number_of_missing_trigrams > maximal_number_of_missing_trigrams:
+                continue
+            similarity = 1 - get_edit_distance(search_string, name) / max(
+                len(name), len(search_string)
+            )
+            if best is None:
+                best, best_similarity = name_id, similarity
+            elif similarity > best_similarity:
+                if self._entries[best][0] != self._entries[name_id][0]:
+                    runner_up_similarity = best_similarity
+                best, best_similarity = name_id, similarity
+            elif self._entries[best][0] != self._entries[name_id][0]:
+                runner_up_similarity = max(runner_up_similarity, similarity)
+
+        if (
+            best is None
+            or best_similarity < self.minimal_similarity
+            or best_similarity - runner_up_similarity < self.minimal_margin
+        ):
+            return None
+
+        self._name_ids.move_to_end(self._names[best])
+        ott_id, matched_name, is_synonym, rank, source = self._entries[best]
+        return {
+            "results": [
+                {
+                    "name": search_string,
+                    "matches": [
+                        {
+                            "is_approximate_match": search_string
+                            != normalize_taxon_name(matched_name),
+                            "is_synonym": is_synonym,
+                            "matched_name": matched_name,
+                            "score": best_similarity,
+                            "search_string": search_string,
+                            "taxon": {
+                                "ott_id": ott_id,
+                                "name": matched_name,
+                                "rank": rank,
+                                "source": source,
+                            },
+                        }
+                    ],
+                }
+            ]
+        }
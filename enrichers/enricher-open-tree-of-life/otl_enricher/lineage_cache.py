@@ -0,0 +1,224 @@
+"""Submodule providing the persistent cache of the nodes of the Open Tree Taxonomy.
+
+Implementative details
+----------------------
+The lineage of a taxon is retrieved from the taxonomy/taxon_info endpoint, and related
+taxa share most of their ancestors, such as their kingdom, phylum or family. Each node of
+the retrieved lineages is stored in the open_tree_of_life_nodes table, with its name, rank
+and parent, so that the lineage of an already seen node is assembled from the cache by
+walking up its ancestors, with a single recursive query, without calling the remote service.
+
+Each node is stored with its materialized path, i.e. the ids of its ancestors from the root
+of the taxonomy down to the node itself, on which the TaxonomyTree queries the subtrees. When
+the nodes of a new version of the taxonomy overwrite the stored ones, the paths of the stored
+descendants of the nodes which moved are rewritten along with them.
+
+The remote service is only called for the nodes whose chain of ancestors is not complete
+in the cache, i.e. does not reach the root of the taxonomy, and at most once per node when
+several lineages are requested together.
+
+The cache uses its own short-lived sessions, as the result cache of the enrichers does, so
+that a failure of the cache never affects the session used for the enrichment itself. As the
+nodes are shared by the lineages, they are inserted as the result writer of the enrichers
+inserts its rows, skipping the nodes already stored, such as by another replica in the
+meantime, without discarding the other nodes of the batch.
+"""
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import func, literal, select
+from alchemy_wrapper.database import Session
+from enrichers.result_writer import INSERT_CONSTRUCTS
+from .models import OpenTreeOfLifeNode
+from .taxonomy_tree import get_subtree_condition
+
+# The fields of the nodes of a lineage which are cached.
+NODE_FIELDS = ("ott_id", "name", "unique_name", "rank")
+
+
+class LineageCache:
+    """Persistent cache of the nodes of the Open Tree Taxonomy."""
+
+    def get_lineages(
+        self, ott_ids: List[int], fetch: Callable[[int], Dict]
+    ) -> Dict[int, Dict]:
+        """Returns the taxon information, with the lineage, of the provided nodes.
+
+        Parameters
+        ----------
+        ott_ids
+            ids of the nodes whose lineage is requested.
+        fetch
+            function returning the response of the taxon_info endpoint for the
+            provided id, including the lineage, called for the nodes whose
+            lineage is not complete in the cache.
+
+        Returns
+        -------
+        The taxon information of each node, in the format of the response of
+        the taxon_info endpoint, restricted to the cached fields.
+        """
+        unique_ott_ids = list(dict.fromkeys(ott_ids))
+        nodes = self._load_ancestors(unique_ott_ids)
+
+        lineages = {}
+        for ott_id in unique_ott_ids:
+            lineage = self._assemble_lineage(ott_id, nodes)
+            if lineage is None:
+                taxon_info = fetch(ott_id)
+                self.store([taxon_info])
+                lineage = self._to_cached_fields(taxon_info)
+                # The fetched nodes may complete the lineages of the next ids.
+                nodes.update(self._get_nodes(taxon_info))
+            lineages[ott_id] = lineage
+        return lineages
+
+    def _load_ancestors(self, ott_ids: List[int]) -> Dict[int, Dict]:
+        """Returns the cached nodes of the provided ids and of all their cached ancestors."""
+        if not ott_ids:
+            return {}
+        ancestors = (
+            select(OpenTreeOfLifeNode)
+            .where(OpenTreeOfLifeNode.ott_id.in_(ott_ids))
+            .cte(name="ancestors", recursive=True)
+        )
+        ancestors = ancestors.union(
+            select(OpenTreeOfLifeNode).where(
+                OpenTreeOfLifeNode.ott_id == ancestors.c.parent_ott_id
+            )
+        )
+        session = Session()
+        try:
+            return {
+                row.ott_id: {
+                    **{key: getattr(row, key) for key in NODE_FIELDS},
+                    "parent_ott_id": row.parent_ott_id,
+                }
+                for row in session.execute(select(ancestors))
+            }
+        finally:
+            session.close()
+
+    @staticmethod
+    def _assemble_lineage(ott_id: int, nodes: Dict[int, Dict]) -> Optional[Dict]:
+        """Returns the taxon information of the node assembled from the cached nodes, if complete."""
+        if ott_id not in nodes:
+            return None
+        node = nodes[ott_id]
+        lineage = []
+        parent_ott_id = node["parent_ott_id"]
+        while parent_ott_id is not None:
+            # A missing ancestor, or a cycle left by an inconsistent cache,
+            # makes the lineage incomplete.
+            if parent_ott_id not in nodes or len(lineage) >= len(nodes):
+                return None
+            parent = nodes[parent_ott_id]
+            lineage.append({key: parent[key] for key in NODE_FIELDS})
+            parent_ott_id = parent["parent_ott_id"]
+        return {**{key: node[key] for key in NODE_FIELDS}, "lineage": lineage}
+
+    @staticmethod
+    def _to_cached_fields(taxon_info: Dict) -> Dict:
+        """Returns the provided taxon information restricted to the cached fields."""
+        return {
+            **{key: taxon_info[key] for key in NODE_FIELDS},
+            "lineage": [
+                {key: ancestor[key] for key in NODE_FIELDS}
+                for ancestor in taxon_info.get("lineage", ())
+            ],
+        }
+
+    @staticmethod
+    def _get_nodes(taxon_info: Dict) -> Dict[int, Dict]:
+        """Returns the nodes of the provided taxon information, with their parents and paths.
+
+        Implementative details
+        ----------------------
+        The lineage returned by the taxon_info endpoint goes from the parent of
+        the node up to the root of the taxonomy, so the parent of each node is
+        the next one in the lineage, and the root has no parent.
+        """
+        chain = [taxon_info, *taxon_info.get("lineage", ())]
+        nodes = {}
+        path = "/"
+        parent = None
+        for node in reversed(chain):
+            path = f"{path}{node['ott_id']}/"
+            nodes[node["ott_id"]] = {
+                **{key: node[key] for key in NODE_FIELDS},
+                "parent_ott_id": parent["ott_id"] if parent is not None else None,
+                "path": path,
+            }
+            parent = node
+        return nodes
+
+    def remove(self, ott_ids: List[int]):
+        """Removes the provided nodes, such as the ones missing from a new version of the taxonomy.
+
+        Parameters
+        ----------
+        ott_ids
+            ids of the nodes to remove. The lineages of their descendants are
+            then incomplete, and fetched again when requested.
+        """
+        if not ott_ids:
+            return
+        session = Session()
+        try:
+            session.query(OpenTreeOfLifeNode).filter(
+                OpenTreeOfLifeNode.ott_id.in_(ott_ids)
+            ).delete(synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    def store(self, taxon_infos: List[Dict], overwrite: bool = False):
+        """Stores the nodes of the provided taxon information and all of their ancestors.
+
+        Parameters
+        ----------
+        taxon_infos
+            taxon information, in the format of the response of the taxon_info
+            endpoint, including the lineage up to the root of the taxonomy.
+        overwrite
+            whether to replace the nodes already stored, such as when they were
+            stored from a previous version of the taxonomy. The paths of the
+            stored descendants of the replaced nodes are rewritten accordingly.
+        """
+        nodes = {}
+        for taxon_info in taxon_infos:
+            nodes.update(self._get_nodes(taxon_info))
+        if not nodes:
+            return
+        session = Session()
+        try:
+            moved_paths = {}
+            if overwrite:
+                moved_paths = {
+                    previous_path: nodes[ott_id]["path"]
+                    for ott_id, previous_path in session.query(
+                        OpenTreeOfLifeNode.ott_id, OpenTreeOfLifeNode.path
+                    ).filter(OpenTreeOfLifeNode.ott_id.in_(list(nodes)))
+                    if previous_path != nodes[ott_id]["path"]
+                }
+                session.query(OpenTreeOfLifeNode).filter(
+                    OpenTreeOfLifeNode.ott_id.in_(list(nodes))
+                ).delete(synchronize_session=False)
+            insert = INSERT_CONSTRUCTS[session.get_bind().dialect.name]
+            session.execute(
+                insert(OpenTreeOfLifeNode).on_conflict_do_nothing(),
+                list(nodes.values()),
+            )
+            # The descendants are moved from the deepest moved node up, so that
+            # each descendant takes the new path of its closest moved ancestor.
+            for previous_path in sorted(moved_paths, key=len, reverse=True):
+                session.query(OpenTreeOfLifeNode).filter(
+                    get_subtree_condition(previous_path)
+                ).update(
+                    {
+                        OpenTreeOfLifeNode.path: literal(moved_paths[previous_path])
+                        + func.substr(OpenTreeOfLifeNode.path, len(previous_path) + 1)
+                    },
+                    synchronize_session=False,
+                )
+            session.commit()
+        finally:
+            session.close()
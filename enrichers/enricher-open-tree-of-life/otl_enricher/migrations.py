@@ -0,0 +1,50 @@
+"""Submodule providing the migrations of the tables of the OTL enricher.
+
+Implementative details
+----------------------
+As for the core models, the tables are created with Base.metadata.create_all, which never
+alters the existing ones, so the columns added to the tables of the enricher afterwards are
+added to the existing databases by the statements below, applied with the apply_migrations
+function of the alchemy wrapper right after the tables are created.
+
+The materialized paths of the open_tree_of_life_nodes table are backfilled from the parents
+of the nodes already cached, walking down from the root of the taxonomy. The nodes whose
+chain of ancestors does not reach the root cannot have a path, and are deleted: the table
+is a cache, and these nodes are fetched again, with their complete lineage, when needed.
+
+The indices of the columns declared with index=True are named as SQLAlchemy names them, so
+that the databases created afterwards hold the same indices.
+"""
+from typing import List
+
+# The migrations of the tables of the OTL enricher, in order.
+MIGRATIONS: List[str] = [
+    # The materialized paths of the cached nodes, used to query the subtrees.
+    "ALTER TABLE open_tree_of_life_nodes ADD COLUMN IF NOT EXISTS path TEXT",
+    # The recursion is empty, and the statement free, once all the paths are set.
+    """
+    WITH RECURSIVE paths (ott_id, path) AS (
+        SELECT ott_id, '/' || ott_id || '/'
+        FROM open_tree_of_life_nodes
+        WHERE parent_ott_id IS NULL
+        AND EXISTS (SELECT 1 FROM open_tree_of_life_nodes WHERE path IS NULL)
+        UNION ALL
+        SELECT child.ott_id, paths.path || child.ott_id || '/'
+        FROM open_tree_of_life_nodes AS child
+        JOIN paths ON child.parent_ott_id = paths.ott_id
+    )
+    UPDATE open_tree_of_life_nodes AS node
+    SET path = paths.path
+    FROM paths
+    WHERE node.ott_id = paths.ott_id AND node.path IS NULL
+    """,
+    "DELETE FROM open_tree_of_life_nodes WHERE path IS NULL",
+    "ALTER TABLE open_tree_of_life_nodes ALTER COLUMN path SET NOT NULL",
+    "CREATE INDEX IF NOT EXISTS open_tree_of_life_nodes_path "
+    "ON open_tree_of_life_nodes (path text_pattern_ops)",
+    # The indices used by the refresh of the entries to a new taxonomy version.
+    "CREATE INDEX IF NOT EXISTS ix_open_tree_of_life_version "
+    "ON open_tree_of_life (version)",
+    "CREATE INDEX IF NOT EXISTS ix_open_tree_of_life_ott_id "
+    "ON open_tree_of_life (ott_id)",
+]
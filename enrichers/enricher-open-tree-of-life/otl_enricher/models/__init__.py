@@ -0,0 +1,4 @@
+from .open_tree_of_life_entry import OpenTreeOfLifeEntry
+from .open_tree_of_life_node import OpenTreeOfLifeNode
+
+__all__ = ["OpenTreeOfLifeEntry", "OpenTreeOfLifeNode"]
\ No newline at end of file
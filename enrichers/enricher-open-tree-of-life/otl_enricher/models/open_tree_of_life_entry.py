@@ -10,7 +10,8 @@ class OpenTreeOfLifeEntry(Base):
     __tablename__ = "open_tree_of_life"
 
     id = Column(Integer, primary_key=True)
-    ott_id = Column(Integer, nullable=False)
+    # The entries are refreshed by ott id upon a new version of the taxonomy.
+    ott_id = Column(Integer, nullable=False, index=True)
     domain = Column(
         Enum("eukaryota", "bacteria", "archaea", name="domain"), nullable=False
     )
@@ -34,8 +35,8 @@ class OpenTreeOfLifeEntry(Base):
     genus = Column(String(80), nullable=False)
     species = Column(String(80), nullable=False)
     # The version of the open tree of life taxonomy, which is
-    # referred to as the "taxon source"
-    version = Column(String(80), nullable=False)
+    # referred to as the "taxon source", indexed to find the outdated entries.
+    version = Column(String(80), nullable=False, index=True)
     # This is the best approximation of the taxon name that
     # open tree of life was able to determine. It could be as
     # general as tje kingdom or as specific as the species.
@@ -0,0 +1,36 @@
+"""SQLAlchemy database proxy relative to the cached nodes of the Open Tree Taxonomy."""
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+from sqlalchemy.sql import func
+from alchemy_wrapper.models.base import Base
+
+
+class OpenTreeOfLifeNode(Base):
+    """Define the OpenTreeOfLifeNode model."""
+
+    __tablename__ = "open_tree_of_life_nodes"
+    # The subtree of a node is a range of the index of the paths, scanned by
+    # the prefix queries, which requires the pattern operators in Postgres.
+    __table_args__ = (
+        Index(
+            "open_tree_of_life_nodes_path",
+            "path",
+            postgresql_ops={"path": "text_pattern_ops"},
+        ),
+    )
+
+    # The nodes are identified by their Open Tree Taxonomy id.
+    ott_id = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String(255), nullable=False)
+    unique_name = Column(String(255), nullable=False)
+    rank = Column(String(80), nullable=False)
+    # The id of the parent node, which is NULL for the root of the taxonomy.
+    parent_ott_id = Column(Integer, nullable=True, index=True)
+    # The materialized path of the node, i.e. the ids of the nodes from the
+    # root of the taxonomy down to the node itself, such as "/1/2/3/".
+    path = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=func.now())
+    updated_at = Column(DateTime, nullable=False, default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        """Represent instance as a unique string."""
+        return f"<OpenTreeOfLifeNode({self.ott_id!r}, {self.unique_name!r})>"
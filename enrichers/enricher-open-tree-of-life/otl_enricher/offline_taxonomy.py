@@ -0,0 +1,317 @@
+"""Submodule providing an offline index of the Open Tree Taxonomy.
+
+Implementative details
+----------------------
+The Open Tree Taxonomy is published as a dump, i.e. a directory containing the taxonomy.tsv
+file, with the id, parent, name, rank, unique name and flags of each taxon, the synonyms.tsv
+file, with the synonyms of the taxa, and the version.txt file. The dump can be downloaded from
+https://files.opentreeoflife.org/ott/ and ingested into a local SQLite file with:
+
+    python -m otl_enricher.offline_taxonomy path/to/ott3.5/ path/to/ott.sqlite
+
+The SQLite file is indexed on the normalized names of the taxa and of the synonyms, and on
+the parents of the taxa, so that the exact and synonym matches of a name and the lineage of
+a taxon are answered locally, with a few index lookups, without calling the remote service.
+As the Taxonomic Name Resolution Service does by default, the taxa flagged as suppressed,
+such as the environmental samples or the hidden taxa, are not matched by name, but they are
+still part of the lineages.
+
+The file is opened read-only, and a new version of the taxonomy is ingested into a separate
+file which atomically replaces the previous one.
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+import argparse
+import logging
+import os
+import sqlite3
+
+# The flags of the taxa that the Taxonomic Name Resolution Service does not match by default.
+SUPPRESSED_FLAGS = frozenset(
+    (
+        "not_otu",
+        "environmental",
+        "environmental_inherited",
+        "viral",
+        "hidden",
+        "hidden_inherited",
+        "was_container",
+        "barren",
+    )
+)
+
+SCHEMA = """
+CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE taxa (
+    ott_id INTEGER PRIMARY KEY,
+    parent_ott_id INTEGER,
+    name TEXT NOT NULL,
+    unique_name TEXT NOT NULL,
+    rank TEXT NOT NULL,
+    flags TEXT NOT NULL,
+    normalized_name TEXT
+);
+CREATE TABLE synonyms (
+    name TEXT NOT NULL,
+    ott_id INTEGER NOT NULL,
+    normalized_name TEXT NOT NULL
+);
+"""
+
+INDEXES = """
+CREATE INDEX taxa_normalized_name ON taxa (normalized_name);
+CREATE INDEX taxa_parent_ott_id ON taxa (parent_ott_id);
+CREATE INDEX synonyms_normalized_name ON synonyms (normalized_name);
+"""
+
+
+def normalize_taxon_name(taxon_name: str) -> str:
+    """Returns the provided taxon name, lowercased and with normalized whitespace."""
+    return " ".join(taxon_name.split()).lower()
+
+
+def _read_dump_file(path: str) -> Iterator[Dict[str, str]]:
+    """Yields the rows of a file of the taxonomy dump, as dictionaries.
+
+    Implementative details
+    ----------------------
+    The columns of the files of the dump are separated by a tab, a pipe
+    and a tab, and each row is terminated by a tab and a pipe. As the
+    values never contain tabs, each row is split on the tab and pipe
+    separators, and the remaining tabs are stripped from the values.
+    """
+
+    def split(line: str) -> List[str]:
+        return [value.strip("\t") for value in line.rstrip("\n").split("\t|")]
+
+    with open(path, "r", encoding="utf8") as dump_file:
+        header = split(dump_file.readline())
+        for line in dump_file:
+            yield dict(zip(header, split(line)))
+
+
+class OfflineTaxonomy:
+    """Offline index of the Open Tree Taxonomy, stored in a local SQLite file."""
+
+    def __init__(self, path: str) -> None:
+        """Open the offline taxonomy index.
+
+        Parameters
+        ----------
+        path
+            path of the SQLite file created by the build method.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"The offline taxonomy index {path} does not exist. "
+                "It can be built from a dump of the Open Tree Taxonomy with "
+                "python -m otl_enricher.offline_taxonomy."
+            )
+        # The index is only read, and may therefore be used by the
+        # successive rounds of the enricher from different threads.
+        self._connection = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self.version = self._connection.execute(
+            "SELECT value FROM metadata WHERE key = 'version'"
+        ).fetchone()[0]
+
+    @staticmethod
+    def build(taxonomy_directory: str, path: str) -> "OfflineTaxonomy":
+        """Ingests the provided dump of the Open Tree Taxonomy into an offline index.
+
+        Parameters
+        ----------
+        taxonomy_directory
+            directory of the dump, containing the taxonomy.tsv, synonyms.tsv
+            and version.txt files.
+        path
+            path of the SQLite file to create, replacing any existing one.
+        """
+        version_path = os.path.join(taxonomy_directory, "version.txt")
+        if os.path.exists(version_path):
+            with open(version_path, "r", encoding="utf8") as version_file:
+                version = version_file.read().strip()
+        else:
+            version = os.path.basename(os.path.normpath(taxonomy_directory))
+
+        partial_path = f"{path}.partial"
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+        connection = sqlite3.connect(partial_path)
+        try:
+            # The file is only published once complete, so there is
+            # no need for the journal to recover from a crash.
+            connection.execute("PRAGMA journal_mode = OFF")
+            connection.execute("PRAGMA synchronous = OFF")
+            connection.executescript(SCHEMA)
+            connection.execute(
+                "INSERT INTO metadata (key, value) VALUES ('version', ?)", (version,)
+            )
+            connection.executemany(
+                "INSERT INTO taxa VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        int(row["uid"]),
+                        int(row["parent_uid"]) if row["parent_uid"] else None,
+                        row["name"],
+                        row["uniqname"] or row["name"],
+                        row["rank"],
+                        row["flags"],
+                        # Suppressed taxa are not indexed by name.
+                        (
+                            None
+                            if SUPPRESSED_FLAGS.intersection(row["flags"].split(","))
+                            else normalize_taxon_name(row["name"])
+                        ),
+                    )
+                    for row in _read_dump_file(
+                        os.path.join(taxonomy_directory, "taxonomy.tsv")
+                    )
+                ),
+            )
+            connection.executemany(
+                "INSERT INTO synonyms VALUES (?, ?, ?)",
+                (
+                    (row["name"], int(row["uid"]), normalize_taxon_name(row["name"]))
+                    for row in _read_dump_file(
+                        os.path.join(taxonomy_directory, "synonyms.tsv")
+                    )
+                ),
+            )
+            connection.executescript(INDEXES)
+            connection.commit()
+        finally:
+            connection.close()
+
+        os.replace(partial_path, path)
+        return OfflineTaxonomy(path)
+
+    def get_source(self) -> str:
+        """Returns the taxon source, as reported by the remote services."""
+        return f"ott{self.version}"
+
+    def _to_taxon(self, row: Tuple) -> Dict:
+        """Returns the taxon of the provided row, as reported by the remote services."""
+        ott_id, name, unique_name, rank, flags = row
+        return {
+            "ott_id": ott_id,
+            "name": name,
+            "unique_name": unique_name,
+            "rank": rank,
+            "flags": flags.split(",") if flags else [],
+            "source": self.get_source(),
+        }
+
+    def match_names(self, taxon_names: List[str]) -> Dict[str, Dict]:
+        """Returns the exact and synonym matches of the provided names.
+
+        Parameters
+        ----------
+        taxon_names
+            names to match, which are normalized.
+
+        Returns
+        -------
+        The matches of each matched name, by normalized name, in the format
+        of the responses of the tnrs_match endpoint for a single name. The
+        names without any match are omitted.
+        """
+        responses = {}
+        for search_string in dict.fromkeys(map(normalize_taxon_name, taxon_names)):
+            matches = [
+                {
+                    "is_approximate_match": False,
+                    "is_synonym": False,
+                    "matched_name": row[1],
+                    "score": 1.0,
+                    "search_string": search_string,
+                    "taxon": self._to_taxon(row),
+                }
+                for row in self._connection.execute(
+                    "SELECT ott_id, name, unique_name, rank, flags FROM taxa "
+                    "WHERE normalized_name = ? ORDER BY ott_id",
+                    (search_string,),
+                )
+            ]
+            matches.extend(
+                {
+                    "is_approximate_match": False,
+                    "is_synonym": True,
+                    "matched_name": synonym,
+                    "score": 1.0,
+                    "search_string": search_string,
+                    "taxon": self._to_taxon(row),
+                }
+                for (synonym, *row) in self._connection.execute(
+                    "SELECT synonyms.name, taxa.ott_id, taxa.name, taxa.unique_name, "
+                    "taxa.rank, taxa.flags FROM synonyms "
+                    "JOIN taxa ON taxa.ott_id = synonyms.ott_id "
+                    "WHERE synonyms.normalized_name = ? "
+                    "AND taxa.normalized_name IS NOT NULL ORDER BY taxa.ott_id",
+                    (search_string,),
+                )
+            )
+            if matches:
+                responses[search_string] = {
+                    "results": [{"name": search_string, "matches": matches}]
+                }
+        return responses
+
+    def get_taxon_info(self, ott_id: int) -> Optional[Dict]:
+        """Returns the taxon information, with the lineage, of the provided taxon.
+
+        Parameters
+        ----------
+        ott_id
+            id of the taxon.
+
+        Returns
+        -------
+        The taxon information, in the format of the response of the taxon_info
+        endpoint, or None if the taxon is not part of the offline taxonomy.
+        """
+        rows = self._connection.execute(
+            "WITH RECURSIVE lineage (ott_id, depth) AS ("
+            " SELECT ?, 0"
+            " UNION ALL"
+            " SELECT taxa.parent_ott_id, lineage.depth + 1 FROM taxa"
+            " JOIN lineage ON taxa.ott_id = lineage.ott_id"
+            " WHERE taxa.parent_ott_id IS NOT NULL"
+            ") "
+            "SELECT taxa.ott_id, taxa.name, taxa.unique_name, taxa.rank, taxa.flags "
+            "FROM lineage JOIN taxa ON taxa.ott_id = lineage.ott_id "
+            "ORDER BY lineage.depth",
+            (ott_id,),
+        ).fetchall()
+        if not rows:
+            return None
+        return {
+            **self._to_taxon(rows[0]),
+            "lineage": [self._to_taxon(row) for row in rows[1:]],
+        }
+
+
+def main(arguments: Optional[List[str]] = None):
+    """Ingest a dump of the Open Tree Taxonomy into an offline index."""
+    parser = argparse.ArgumentParser(
+        description="Ingest a dump of the Open Tree Taxonomy into an offline index.",
+    )
+    parser.add_argument(
+        "taxonomy_directory",
+        help="directory containing the taxonomy.tsv and synonyms.tsv files.",
+    )
+    parser.add_argument("path", help="path of the SQLite file to create.")
+    parsed = parser.parse_args(arguments)
+
+    logging.basicConfig(level=logging.INFO)
+
+    offline_taxonomy = OfflineTaxonomy.build(parsed.taxonomy_directory, parsed.path)
+    logging.getLogger(OfflineTaxonomy.__name__).info(
+        f"Ingested the version {offline_taxonomy.version} of the Open Tree Taxonomy "
+        f"into {parsed.path}."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1137 @@
+"""Concrete implementation for the Open Tree of Life taxon Enricher.
+
+Implementative details
+----------------------
+The names of the taxa of each batch of candidates are resolved with as few calls to the
+Taxonomic Name Resolution Service as possible, as it accepts up to a thousand names per
+call, and the matches are then split back per taxon. The taxa whose name could not be
+resolved in batch, for instance because the service was degraded, are resolved one at a
+time when enriched, so that their failures are retried as usual.
+
+The lineages of the matched taxa are assembled from the persistent cache of the nodes of
+the taxonomy, and the taxon_info endpoint is only called for the nodes whose ancestors
+are not cached yet, once per node for the whole batch. The stored nodes, with their
+materialized paths, form the tree of the taxonomy queried by the TaxonomyTree.
+
+When the OTL_OFFLINE_TAXONOMY environment variable points to an offline index of the
+taxonomy, built from a dump of the Open Tree Taxonomy, the exact and synonym matches of
+the names and the lineages of the taxa are resolved locally from the index, and the remote
+services are only called for the names and the nodes missing from the index, such as the
+names requiring an approximate match.
+
+The responses of the remote services are stored in an on-disk response cache, located by
+the OTL_RESPONSE_CACHE environment variable, so that the requests issued again after a
+restart, or upon a re-enrichment, are answered without calling the remote services.
+
+The names which are close misspellings of names already resolved are matched locally, with
+a trigram index of the resolved names, and only the names without a match of high confidence
+are sent to the remote service for approximate matching. As the correctly spelled name of a
+distinct taxon may be as close to a resolved name as a misspelling, the close matches are
+only served for the names known to lack an exact match: the names missing from the offline
+taxonomy, or, without it, the names left unmatched by an exact matching of the service.
+
+When the offline taxonomy is updated to a new version, the entries enriched with a previous
+version are refreshed incrementally at the start of the first rounds, until none is left, and
+again after an entry of a previous version is stored: the entries whose taxon was
+merged, split or renamed in the new version are removed, along with their cached results
+and the cached nodes of their taxa, so that their taxa are resolved again, while the lineages
+of the others are updated in bulk. The version of the offline taxonomy is then the reference
+one: the response cache and the index of the resolved names only serve the responses and
+the entries of this version, and an entry resolved to a node merged, split or renamed in
+this version, such as by a remote service lagging behind it, is never stored, as it would
+only be removed again by the next refresh.
+
+The entries are written through the buffered result writer of the enrichers, in batches
+committed along with the status of their tasks, instead of in a transaction per taxon.
+
+The responses of the services are parsed directly from their dictionaries, into slotted
+OTLTaxonInfo records, selecting the same match and ancestors as the previous pandas-based
+parser did, without the cost of building and reshaping data frames for each taxon.
+"""
+from typing import Callable, Dict, Iterator, List, Optional
+from functools import partial
+import os
+
+from sqlalchemy import bindparam, exists, func, or_, update
+from alchemy_wrapper.models import Taxon, Task
+from enrichers import TaxonEnricher, RetryPolicy
+from enrichers.metrics import time_remote_call
+from opentree import OT, OTWebServicesError
+
+from .fuzzy_matcher import FuzzyMatcher
+from .lineage_cache import LineageCache
+from .models import OpenTreeOfLifeEntry
+from .offline_taxonomy import OfflineTaxonomy, normalize_taxon_name
+from .response_cache import ResponseCache
+
+# The maximal number of names accepted by a single call to the tnrs/match_names endpoint.
+TNRS_MAXIMAL_NUMBER_OF_NAMES = 1000
+
+
+class OTLEnricher(TaxonEnricher):
+    # The Open Tree of Life APIs may be temporarily unavailable, in which
+    # case we retry the enrichment later instead of failing it.
+    retry_policy = RetryPolicy(
+        maximal_number_of_attempts=5,
+        retryable_exceptions=(OSError, OTWebServicesError),
+    )
+    # Cache of the nodes of the taxonomy, from which the lineages are assembled.
+    lineage_cache: LineageCache = LineageCache()
+
+    @classmethod
+    def repository(cls) -> str:
+        """Name of the repository providing these specific metadata."""
+        return "Open Tree of Life"
+
+    @classmethod
+    def name(cls) -> str:
+        """Name of the enricher."""
+        return "Open Tree of Life"
+
+    def __init__(self, verbose: bool = True) -> None:
+        """Initialize the Open Tree of Life enricher."""
+        super().__init__(verbose=verbose)
+        # The TNRS responses of the names of the current batch, by normalized name.
+        self._tnrs_responses: Dict[str, Dict] = {}
+        offline_taxonomy_path = self._get_offline_taxonomy_path()
+        self._offline_taxonomy: Optional[OfflineTaxonomy] = (
+            OfflineTaxonomy(offline_taxonomy_path) if offline_taxonomy_path else None
+        )
+        # The cached responses and the indexed entries are restricted to
+        # the version of the offline taxonomy, if any.
+        taxonomy_version = (
+            None
+            if self._offline_taxonomy is None
+            else self._offline_taxonomy.get_source()
+        )
+        response_cache_path = self._get_response_cache_path()
+        self._response_cache: Optional[ResponseCache] = (
+            ResponseCache(response_cache_path, taxonomy_version=taxonomy_version)
+            if response_cache_path
+            else None
+        )
+        # The version of the taxonomy to which all the entries were last refreshed.
+        self._refreshed_taxonomy_version: Optional[str] = None
+        # The trigram index of the names already resolved, refreshed once per batch.
+        self._fuzzy_matcher = FuzzyMatcher(
+            maximal_number_of_names=self._get_maximal_number_of_fuzzy_names(),
+            taxonomy_version=taxonomy_version,
+        )
+
+    def _get_offline_taxonomy_path(self) -> Optional[str]:
+        """Returns the path of the offline index of the taxonomy, if any."""
+        return os.environ.get("OTL_OFFLINE_TAXONOMY")
+
+    def _get_response_cache_path(self) -> Optional[str]:
+        """Returns the path of the on-disk response cache, or an empty string to disable it."""
+        return os.environ.get("OTL_RESPONSE_CACHE", "otl_response_cache.sqlite")
+
+    def _get_maximal_number_of_fuzzy_names(self) -> int:
+        """Returns the number of names kept in the trigram index of the resolved names."""
+        return 100_000
+
+    def _get_result_batch_size(self) -> int:
+        """Returns the number of entries written at once, along with the status of their tasks."""
+        return 200
+
+    def _get_refresh_chunk_size(self) -> int:
+        """Returns the number of outdated ott ids refreshed at once."""
+        return 1000
+
+    def run_round(self) -> bool:
+        """Run a single round of the enricher service, after refreshing the outdated entries."""
+        if (
+            self._offline_taxonomy is not None
+            and self._refreshed_taxonomy_version != self._offline_taxonomy.get_source()
+        ):
+            self._refresh_outdated_entries()
+        return super().run_round()
+
+    def _refresh_outdated_entries(self):
+        """Brings the entries enriched with a previous version of the taxonomy to the offline one.
+
+        Implementative details
+        ----------------------
+        The outdated entries are processed by chunks of ott ids. The entries whose
+        ott id is not part of the new version, as it was merged or split, and the
+        entries whose taxon was renamed, are removed, so that their taxa are
+        enriched again. The lineages of the other entries are updated in bulk,
+        keeping the previous values of the ranks missing from the new lineages,
+        as the lineage columns of the entries are required.
+
+        The outdated entries are selected on the ranges of the index of the versions
+        before and after the current one, as an inequality cannot use the index.
+        Once none is left, the refresh is skipped until an entry of a previous
+        version is stored. The index of the resolved names is then reset, as the
+        refreshed entries were not part of it.
+        """
+        source = self._offline_taxonomy.get_source()
+        table = OpenTreeOfLifeEntry.__table__
+        lineage_columns = {
+            "domain": table.c.domain,
+            "kingdom": table.c.kingdom,
+            "phylum": table.c.phylum,
+            "class": table.c.class_,
+            "order": table.c.order,
+            "family": table.c.family,
+            "tribe": table.c.tribe,
+            "genus": table.c.genus,
+        }
+        update_lineage = (
+            update(table)
+            .where(
+                table.c.ott_id == bindparam("refreshed_ott_id"),
+                or_(table.c.version < source, table.c.version > source),
+            )
+            .values(
+                {
+                    **{
+                        column: func.coalesce(bindparam(f"refreshed_{rank}"), column)
+                        for rank, column in lineage_columns.items()
+                    },
+                    table.c.species: bindparam("refreshed_species"),
+                    table.c.version: source,
+                }
+            )
+        )
+
+        number_of_updated_ott_ids = number_of_removed_entries = 0
+        number_of_incomplete_lineages = 0
+        while not self.is_stopping():
+            outdated_ott_ids = [
+                ott_id
+                for (ott_id,) in self._session.query(OpenTreeOfLifeEntry.ott_id)
+                .filter(
+                    or_(
+                        OpenTreeOfLifeEntry.version < source,
+                        OpenTreeOfLifeEntry.version > source,
+                    )
+                )
+                .distinct()
+                .limit(self._get_refresh_chunk_size())
+            ]
+            if not outdated_ott_ids:
+                self._refreshed_taxonomy_version = source
+                break
+
+            taxon_infos = {}
+            for ott_id in outdated_ott_ids:
+                taxon_info = self._offline_taxonomy.get_taxon_info(ott_id)
+                if taxon_info is None:
+                    continue
+                taxon_infos[ott_id] = taxon_info
+                if not lineage_columns.keys() <= set(get_lineage_names(taxon_info)):
+                    number_of_incomplete_lineages += 1
+
+            removed_entries = [
+                (entry_id, ott_id, taxon_name)
+                for (
+                    entry_id,
+                    ott_id,
+                    resolved_taxon_name,
+                    is_synonym,
+                    taxon_name,
+                ) in self._session.query(
+                    OpenTreeOfLifeEntry.id,
+                    OpenTreeOfLifeEntry.ott_id,
+                    OpenTreeOfLifeEntry.resolved_taxon_name,
+                    OpenTreeOfLifeEntry.is_synonym,
+                    Taxon.name,
+                )
+                .join(Taxon, Taxon.id == OpenTreeOfLifeEntry.taxon_id)
+                .filter(
+                    OpenTreeOfLifeEntry.ott_id.in_(outdated_ott_ids),
+                    or_(
+                        OpenTreeOfLifeEntry.version < source,
+                        OpenTreeOfLifeEntry.version > source,
+                    ),
+                )
+                if is_removed_from_taxonomy(
+                    taxon_infos.get(ott_id), resolved_taxon_name, is_synonym
+                )
+            ]
+            if removed_entries:
+                self._session.query(OpenTreeOfLifeEntry).filter(
+                    OpenTreeOfLifeEntry.id.in_(
+                        [entry_id for entry_id, _, _ in removed_entries]
+                    )
+                ).delete(synchronize_session=False)
+
+            refreshed_taxon_infos = list(taxon_infos.values())
+            if refreshed_taxon_infos:
+                self._session.execute(
+                    update_lineage,
+                    [
+                        {
+                            "refreshed_ott_id": taxon_info["ott_id"],
+                            **{
+                                f"refreshed_{rank}": lineage_names.get(rank)
+                                for rank in lineage_columns
+                            },
+                            "refreshed_species": taxon_info["unique_name"],
+                        }
+                        for taxon_info, lineage_names in (
+                            (taxon_info, get_lineage_names(taxon_info))
+                            for taxon_info in refreshed_taxon_infos
+                        )
+                    ],
+                )
+            self._session.commit()
+
+            # The removed entries must not be restored from their cached
+            # results, nor their taxa from their cached nodes, and the nodes
+            # of the new version replace the old ones.
+            self.result_cache.invalidate(
+                enricher=self.name(),
+                version=self.version(),
+                cache_inputs=[
+                    {"taxon_name": normalize_taxon_name(taxon_name)}
+                    for _, _, taxon_name in removed_entries
+                ],
+            )
+            self.lineage_cache.remove(
+                [
+                    ott_id
+                    for _, ott_id, _ in removed_entries
+                    if ott_id not in taxon_infos
+                ]
+            )
+            self.lineage_cache.store(refreshed_taxon_infos, overwrite=True)
+            number_of_updated_ott_ids += len(refreshed_taxon_infos)
+            number_of_removed_entries += len(removed_entries)
+
+        if number_of_updated_ott_ids or number_of_removed_entries:
+            self._fuzzy_matcher.reset()
+            self._logger.info(
+                f"Refreshed the entries of {number_of_updated_ott_ids} taxa to the "
+                f"taxonomy {source}, and removed {number_of_removed_entries} entries "
+                "of merged, split or renamed taxa, which will be enriched again."
+            )
+        if number_of_incomplete_lineages:
+            self._logger.warning(
+                f"The lineages of {number_of_incomplete_lineages} taxa in the taxonomy "
+                f"{source} lack some of the stored ranks, whose previous values were kept."
+            )
+
+    def _evict_cached_results(self):
+        """Evicts the outdated cached results, and the outdated cached responses."""
+        super()._evict_cached_results()
+        if self._response_cache is not None:
+            evicted = self._response_cache.evict()
+            if evicted > 0:
+                self._logger.info(f"Evicted {evicted} cached responses.")
+
+    def _select_enrichables(self, enrichables: List[Taxon]) -> List[Taxon]:
+        """Returns the taxa of the batch that can be enriched.
+
+        Parameters
+        ----------
+        enrichables
+            batch of candidate enrichables.
+        """
+        taxa = [
+            enrichable for enrichable in enrichables if isinstance(enrichable, Taxon)
+        ]
+        if not taxa:
+            return []
+
+        # A Taxon is enrichable if there is not already an entry in the
+        # open_tree_of_life table with the same taxon_id.
+        enriched_taxon_ids = {
+            taxon_id
+            for (taxon_id,) in self._session.query(OpenTreeOfLifeEntry.taxon_id).filter(
+                OpenTreeOfLifeEntry.taxon_id.in_([taxon.id for taxon in taxa])
+            )
+        }
+        return [taxon for taxon in taxa if taxon.id not in enriched_taxon_ids]
+
+    def _get_new_elements_to_enrich(self) -> Iterator[Taxon]:
+        """Yields the new elements to enrich."""
+        # Stream the taxons that have no entry in the open_tree_of_life table,
+        # through an anti-join, excluding the ones whose enrichment is running
+        # elsewhere, is waiting to be retried, or failed recently. The taxons
+        # are ordered so that the ones of each user are interleaved.
+        return self._stream_candidates(
+            self.scheduler.order(
+                self._session.query(Taxon).filter(
+                    ~exists().where(OpenTreeOfLifeEntry.taxon_id == Taxon.id),
+                    ~self._is_awaiting_retry(),
+                    ~self._is_claimed(Taxon.id),
+                ),
+                user_id=Taxon.user_id,
+                created_at=Taxon.created_at,
+            )
+        )
+
+    def _get_cache_input(self, enrichable: Taxon) -> Dict:
+        """Returns the normalized taxon name, as the lookup only depends on it.
+
+        Parameters
+        ----------
+        enrichable
+            enrichable class to enrich.
+        """
+        return {"taxon_name": normalize_taxon_name(enrichable.name)}
+
+    def _prepare_batch(self, enrichables: List[Taxon]):
+        """Resolves the names of the taxa of the batch with as few TNRS calls as possible.
+
+        Parameters
+        ----------
+        enrichables
+            batch of taxa about to be enriched.
+        """
+        self._tnrs_responses = {}
+        if not enrichables:
+            return
+        taxon_names = [
+            normalize_taxon_name(enrichable.name) for enrichable in enrichables
+        ]
+        try:
+            self._fuzzy_matcher.refresh()
+        except Exception as exception:
+            self._logger.warning(
+                f"Unable to refresh the index of the resolved names: {exception!r}"
+            )
+        self._tnrs_responses = self._resolve_locally(taxon_names)
+
+        missing_taxon_names = [
+            taxon_name
+            for taxon_name in taxon_names
+            if taxon_name not in self._tnrs_responses
+        ]
+        if missing_taxon_names:
+            try:
+                tnrs_responses = self._resolve_remotely(missing_taxon_names)
+            except Exception as exception:
+                self._logger.warning(
+                    f"Unable to resolve the names of the batch of {len(missing_taxon_names)} taxa, "
+                    f"which will be resolved one at a time: {exception!r}"
+                )
+                return
+            self._tnrs_responses.update(tnrs_responses)
+
+        # We warm the lineage cache with the nodes of the batch, so that
+        # each node shared by several taxa of the batch is fetched once.
+        try:
+            self._get_lineages(
+                [
+                    get_best_match(result)["taxon"]["ott_id"]
+                    for response in self._tnrs_responses.values()
+                    for result in response["results"]
+                    if result["matches"]
+                ]
+            )
+        except Exception as exception:
+            self._logger.warning(
+                "Unable to retrieve the lineages of the batch, which will be "
+                f"retrieved one at a time: {exception!r}"
+            )
+
+    def _resolve_locally(self, taxon_names: List[str]) -> Dict[str, Dict]:
+        """Returns the TNRS responses of the names available without calling the remote service.
+
+        Parameters
+        ----------
+        taxon_names
+            normalized names to resolve.
+
+        Returns
+        -------
+        The TNRS responses of the names found in the offline taxonomy or in
+        the response cache, or, for the names missing from the offline
+        taxonomy, matching closely a name already resolved, by normalized name.
+        """
+        tnrs_responses = (
+            {}
+            if self._offline_taxonomy is None
+            else self._offline_taxonomy.match_names(taxon_names)
+        )
+        if self._response_cache is not None:
+            for taxon_name in taxon_names:
+                if taxon_name in tnrs_responses:
+                    continue
+                tnrs_response = self._response_cache.get(
+                    "tnrs_match", {"taxon_name": taxon_name}
+                )
+                if tnrs_response is not None:
+                    tnrs_responses[taxon_name] = tnrs_response
+        # Without the offline taxonomy, a name missing from the response cache
+        # may still have an exact match, which must be preferred to a close one.
+        if self._offline_taxonomy is not None:
+            tnrs_responses.update(
+                self._match_closely(
+                    [
+                        taxon_name
+                        for taxon_name in taxon_names
+                        if taxon_name not in tnrs_responses
+                    ]
+                )
+            )
+        return tnrs_responses
+
+    def _match_closely(self, taxon_names: List[str]) -> Dict[str, Dict]:
+        """Returns the high-confidence local matches of the names known to lack an exact match.
+
+        Parameters
+        ----------
+        taxon_names
+            normalized names without any exact match.
+        """
+        tnrs_responses = {}
+        for taxon_name in taxon_names:
+            tnrs_response = self._fuzzy_matcher.match(taxon_name)
+            if tnrs_response is not None:
+                tnrs_responses[taxon_name] = tnrs_response
+        return tnrs_responses
+
+    def _resolve_remotely(self, taxon_names: List[str]) -> Dict[str, Dict]:
+        """Returns the TNRS responses of the provided names, resolved by the remote service.
+
+        Implementative details
+        ----------------------
+        Without the offline taxonomy, the names are first matched exactly by the
+        service, which is cheaper than its approximate matching, and the names
+        left unmatched are then matched closely with the index of the resolved
+        names. Only the remaining names are matched approximately by the service.
+        The responses of the service are stored in the response cache, except
+        the empty responses of the exact matching.
+
+        Parameters
+        ----------
+        taxon_names
+            normalized names missing from the offline taxonomy and the response cache.
+
+        Returns
+        -------
+        The TNRS responses of the names, by normalized name. The names missing
+        from the responses of the service are omitted.
+        """
+        tnrs_responses = {}
+        if self._offline_taxonomy is None:
+            exact_responses = self._call_remote(tnrs_batch_lookup, taxon_names, False)
+            tnrs_responses.update(
+                {
+                    taxon_name: tnrs_response
+                    for taxon_name, tnrs_response in exact_responses.items()
+                    if any(result["matches"] for result in tnrs_response["results"])
+                }
+            )
+            self._cache_tnrs_responses(tnrs_responses)
+            tnrs_responses.update(
+                self._match_closely(
+                    [
+                        taxon_name
+                        for taxon_name in exact_responses
+                        if taxon_name not in tnrs_responses
+                    ]
+                )
+            )
+
+        missing_taxon_names = [
+            taxon_name for taxon_name in taxon_names if taxon_name not in tnrs_responses
+        ]
+        if missing_taxon_names:
+            approximate_responses = self._call_remote(
+                tnrs_batch_lookup, missing_taxon_names
+            )
+            self._cache_tnrs_responses(approximate_responses)
+            tnrs_responses.update(approximate_responses)
+        return tnrs_responses
+
+    def _cache_tnrs_responses(self, tnrs_responses: Dict[str, Dict]):
+        """Stores the provided TNRS responses of the service in the response cache, if any."""
+        if self._response_cache is None:
+            return
+        for taxon_name, tnrs_response in tnrs_responses.items():
+            self._response_cache.put(
+                "tnrs_match", {"taxon_name": taxon_name}, tnrs_response
+            )
+
+    def _fetch_taxon_info(self, fetch: Callable[[int], Dict], ott_id: int) -> Dict:
+        """Returns the response of the taxon_info endpoint, from the response cache if available.
+
+        Parameters
+        ----------
+        fetch
+            function returning the response of the taxon_info endpoint for the
+            provided id, called when the response is not cached.
+        ott_id
+            id of the requested node.
+        """
+        if self._response_cache is None:
+            return fetch(ott_id)
+        taxon_info = self._response_cache.get("taxon_info", {"ott_id": ott_id})
+        if taxon_info is None:
+            taxon_info = fetch(ott_id)
+            # Only the information of the node is cached, and never an error message.
+            if "ott_id" in taxon_info:
+                self._response_cache.put("taxon_info", {"ott_id": ott_id}, taxon_info)
+        return taxon_info
+
+    def _get_lineages(
+        self, ott_ids: List[int], fetch: Optional[Callable[[int], Dict]] = None
+    ) -> Dict[int, Dict]:
+        """Returns the taxon information, with the lineage, of the provided nodes.
+
+        Parameters
+        ----------
+        ott_ids
+            ids of the nodes whose lineage is requested.
+        fetch
+            function returning the response of the taxon_info endpoint for the
+            provided id, called for the nodes missing from the offline taxonomy,
+            the lineage cache and the response cache. By default, taxon_info_lookup,
+            called through the circuit breaker of the repository.
+        """
+        lineages = {}
+        missing_ott_ids = []
+        for ott_id in ott_ids:
+            taxon_info = (
+                None
+                if self._offline_taxonomy is None
+                else self._offline_taxonomy.get_taxon_info(ott_id)
+            )
+            if taxon_info is None:
+                missing_ott_ids.append(ott_id)
+            else:
+                lineages[ott_id] = taxon_info
+        if lineages:
+            # The nodes resolved offline are stored as well, so that the
+            # tree of the taxonomy includes the nodes of all the entries.
+            self.lineage_cache.store(list(lineages.values()))
+        if missing_ott_ids:
+            lineages.update(
+                self.lineage_cache.get_lineages(
+                    missing_ott_ids,
+                    fetch=partial(
+                        self._fetch_taxon_info,
+                        fetch or partial(self._call_remote, taxon_info_lookup),
+                    ),
+                )
+            )
+        return lineages
+
+    def _store_entry(
+        self, enrichable: Taxon, task: Task, otl_taxon_info: "OTLTaxonInfo"
+    ):
+        """Store the Open Tree of Life entry of the provided taxon.
+
+        Parameters
+        ----------
+        enrichable
+            enrichable class to enrich.
+        task
+            task enriching the taxon, along with which the entry is written.
+        otl_taxon_info
+            taxonomic information retrieved from Open Tree of Life.
+
+        Raises
+        ------
+        ValueError
+            if the taxon was resolved, with a previous version of the taxonomy,
+            to a node merged, split or renamed in the offline taxonomy.
+        """
+        if (
+            self._offline_taxonomy is not None
+            and otl_taxon_info.get_taxon_source() != self._offline_taxonomy.get_source()
+            and is_removed_from_taxonomy(
+                self._offline_taxonomy.get_taxon_info(otl_taxon_info.get_ott_id()),
+                otl_taxon_info.get_matched_name(),
+                otl_taxon_info.get_is_synonym(),
+            )
+        ):
+            raise ValueError(
+                f"The taxon {enrichable.name} was resolved to the node "
+                f"{otl_taxon_info.get_ott_id()} of the taxonomy "
+                f"{otl_taxon_info.get_taxon_source()}, which was merged, split or "
+                f"renamed in the taxonomy {self._offline_taxonomy.get_source()}."
+            )
+        # An entry of a previous version, resolved by a remote service lagging
+        # behind the offline taxonomy, is refreshed at the start of the next round.
+        if (
+            self._offline_taxonomy is not None
+            and otl_taxon_info.get_taxon_source() != self._offline_taxonomy.get_source()
+        ):
+            self._refreshed_taxonomy_version = None
+        # We create a new entry in the open_tree_of_life table
+        # with the taxon_id of the enrichable class, which is
+        # written in a batch with the entries of the other tasks.
+        self._store_result(
+            task,
+            OpenTreeOfLifeEntry,
+            dict(
+                ott_id=otl_taxon_info.get_ott_id(),
+                taxon_id=enrichable.id,
+                domain=otl_taxon_info.get_otol_domain(),
+                kingdom=otl_taxon_info.get_otol_kingdom(),
+                phylum=otl_taxon_info.get_otol_phylum(),
+                class_=otl_taxon_info.get_otol_class(),
+                order=otl_taxon_info.get_otol_order(),
+                family=otl_taxon_info.get_otol_family(),
+                tribe=otl_taxon_info.get_otol_tribe(),
+                genus=otl_taxon_info.get_otol_genus(),
+                species=otl_taxon_info.get_otol_species(),
+                version=otl_taxon_info.get_taxon_source(),
+                resolved_taxon_name=otl_taxon_info.get_matched_name(),
+                is_synonym=otl_taxon_info.get_is_synonym(),
+                is_approximated_match=otl_taxon_info.get_is_approximate_match(),
+            ),
+        )
+
+    def _enrich(self, enrichable: Taxon, task: Task) -> Dict:
+        """Enrich the metadata of a enrichable class.
+
+        Parameters
+        ----------
+        enrichable
+            enrichable class to enrich.
+
+        Returns
+        -------
+        The retrieved taxonomic information, which is cached.
+        """
+        # We retrieve from open tree the ott_id of the taxon, using the response
+        # of the batch resolution of its name, of the offline taxonomy or of the
+        # response cache, if any.
+        taxon_name = normalize_taxon_name(enrichable.name)
+        tnrs_response = self._tnrs_responses.pop(taxon_name, None)
+        if tnrs_response is None:
+            tnrs_response = self._resolve_locally([taxon_name]).get(taxon_name)
+        if tnrs_response is None:
+            # A name missing from the response of the service has no match.
+            tnrs_response = self._resolve_remotely([taxon_name]).get(
+                taxon_name, {"results": [], "unmatched_names": [taxon_name]}
+            )
+        otl_taxon_info = otl_taxon_lineage_appender(
+            enrichable.name,
+            tnrs_response=tnrs_response,
+            get_lineages=self._get_lineages,
+        )
+        self._store_entry(enrichable, task, otl_taxon_info)
+        return otl_taxon_info.to_dict()
+
+    def _enrich_from_cache(self, enrichable: Taxon, task: Task, result: Dict) -> Dict:
+        """Enrich the metadata of a enrichable class from a cached lookup.
+
+        Parameters
+        ----------
+        enrichable
+            enrichable class to enrich.
+        result
+            cached taxonomic information of a taxon with the same name.
+        """
+        self._store_entry(enrichable, task, OTLTaxonInfo.from_dict(result))
+        return result
+
+
+# The ranks of the ancestors of a taxon which are stored, with the attribute storing them.
+LINEAGE_RANKS = {
+    "domain": "otol_domain",
+    "kingdom": "otol_kingdom",
+    "phylum": "otol_phylum",
+    "class": "otol_class",
+    "order": "otol_order",
+    "family": "otol_family",
+    "tribe": "otol_tribe",
+    "genus": "otol_genus",
+}
+
+
+class OTLTaxonInfo:
+    __slots__ = (
+        "ott_id",
+        "otol_domain",
+        "otol_kingdom",
+        "otol_phylum",
+        "otol_class",
+        "otol_order",
+        "otol_family",
+        "otol_tribe",
+        "otol_genus",
+        "otol_species",
+        "taxon_source",
+        "taxon_rank",
+        "search_string",
+        "score",
+        "matched_name",
+        "is_synonym",
+        "is_approximate_match",
+    )
+
+    def __init__(
+        self,
+        ott_id: int,
+        otol_domain: str,
+        otol_kingdom: str,
+        otol_phylum: str,
+        otol_class: str,
+        otol_order: str,
+        otol_family: str,
+        otol_tribe: str,
+        otol_genus: str,
+        otol_species: str,
+        taxon_source: str,
+        taxon_rank: str,
+        search_string: str,
+        score: float,
+        matched_name: str,
+        is_synonym: bool,
+        is_approximate_match: bool,
+    ):
+        self.ott_id = ott_id
+        self.otol_domain = otol_domain
+        self.otol_kingdom = otol_kingdom
+        self.otol_phylum = otol_phylum
+        self.otol_class = otol_class
+        self.otol_order = otol_order
+        self.otol_family = otol_family
+        self.otol_tribe = otol_tribe
+        self.otol_genus = otol_genus
+        self.otol_species = otol_species
+        self.taxon_source = taxon_source
+        self.taxon_rank = taxon_rank
+        self.search_string = search_string
+        self.score = score
+        self.matched_name = matched_name
+        self.is_synonym = is_synonym
+        self.is_approximate_match = is_approximate_match
+
+    def to_dict(self) -> Dict:
+        """
+        Returns the taxonomic information as a JSON-serializable dictionary.
+        """
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    @staticmethod
+    def from_dict(taxon_info: Dict) -> "OTLTaxonInfo":
+        """
+        Returns the taxonomic information from a dictionary created by to_dict.
+        """
+        return OTLTaxonInfo(**taxon_info)
+
+    def get_ott_id(self) -> int:
+        """
+        Returns the OpenTree of Life ID of the sample.
+        """
+        return self.ott_id
+
+    def get_otol_domain(self) -> str:
+        """
+        Returns the OpenTree of Life domain of the sample.
+        """
+        return self.otol_domain
+
+    def get_otol_kingdom(self) -> str:
+        """
+        Returns the OpenTree of Life kingdom of the sample.
+        """
+        return self.otol_kingdom
+
+    def get_otol_phylum(self) -> str:
+        """
+        Returns the OpenTree of Life phylum of the sample.
+        """
+        return self.otol_phylum
+
+    def get_otol_class(self) -> str:
+        """
+        Returns the OpenTree of Life class of the sample.
+        """
+        return self.otol_class
+
+    def get_otol_order(self) -> str:
+        """
+        Returns the OpenTree of Life order of the sample.
+        """
+        return self.otol_order
+
+    def get_otol_family(self) -> str:
+        """
+        Returns the OpenTree of Life family of the sample.
+        """
+        return self.otol_family
+
+    def get_otol_tribe(self) -> str:
+        """
+        Returns the OpenTree of Life tribe of the sample.
+        """
+        return self.otol_tribe
+
+    def get_otol_genus(self) -> str:
+        """
+        Returns the OpenTree of Life genus of the sample.
+        """
+        return self.otol_genus
+
+    def get_otol_species(self) -> str:
+        """
+        Returns the OpenTree of Life species of the sample.
+        """
+        return self.otol_species
+
+    def get_taxon_source(self) -> str:
+        """
+        Returns the taxon source of the sample.
+        """
+        return self.taxon_source
+
+    def get_taxon_rank(self) -> str:
+        """
+        Returns the taxon rank of the sample.
+        """
+        return self.taxon_rank
+
+    def get_search_string(self) -> str:
+        """
+        Returns the search string of the sample.
+        """
+        return self.search_string
+
+    def get_score(self) -> float:
+        """
+        Returns the score of the sample.
+        """
+        return self.score
+
+    def get_matched_name(self) -> str:
+        """
+        Returns the matched name of the sample.
+        """
+        return self.matched_name
+
+    def get_is_synonym(self) -> bool:
+        """
+        Returns whether the sample is a synonym.
+        """
+        return self.is_synonym
+
+    def get_is_approximate_match(self) -> bool:
+        """
+        Returns whether the sample is an approximate match.
+        """
+        return self.is_approximate_match
+
+
+def tnrs_lookup(taxon_name: str) -> Dict:
+    """Fetches the taxonomic information for a given taxon name using the OpenTree Taxonomic Name Resolution Service.
+
+    Parameters
+    ----------
+    taxon_name : str
+        The taxon to be resolved.
+
+    Returns
+    -------
+    taxon_tnrs_matched.response_dict : dict
+        The response of the OT call.
+    """
+
+    # Taxonomic Name Resolution Service lookup
+    with time_remote_call(OTLEnricher.repository(), "tnrs_match"):
+        taxon_tnrs_matched = OT.tnrs_match(
+            names=[taxon_name],
+            context_name=None,
+            do_approximate_matching=True,
+            include_suppressed=False,
+        )
+
+    # The client returns the error message, instead of raising,
+    # when the service is degraded, which is worth a retry.
+    if "results" not in taxon_tnrs_matched.response_dict:
+        raise ConnectionError(
+            "The Taxonomic Name Resolution Service did not return any result: "
+            f"{taxon_tnrs_matched.response_dict}"
+        )
+
+    # The response of the OT call is returned
+    return taxon_tnrs_matched.response_dict
+
+
+def tnrs_batch_lookup(
+    taxon_names: List[str], approximate_matching: bool = True
+) -> Dict[str, Dict]:
+    """Fetches the taxonomic information for several taxon names using the OpenTree Taxonomic Name Resolution Service.
+
+    Parameters
+    ----------
+    taxon_names : List[str]
+        The taxa to be resolved.
+    approximate_matching : bool
+        Whether the names without an exact or synonym match are matched approximately.
+
+    Returns
+    -------
+    taxon_tnrs_responses : Dict[str, Dict]
+        The response of the OT calls split per taxon name, each in the format
+        returned by tnrs_lookup. The names reported as unmatched by the service
+        have an empty response, while the names missing from the responses are
+        omitted.
+    """
+    unique_names = list(dict.fromkeys(taxon_names))
+    taxon_tnrs_responses = {}
+
+    for start in range(0, len(unique_names), TNRS_MAXIMAL_NUMBER_OF_NAMES):
+        with time_remote_call(OTLEnricher.repository(), "tnrs_match_batch"):
+            taxon_tnrs_matched = OT.tnrs_match(
+                names=unique_names[start : start + TNRS_MAXIMAL_NUMBER_OF_NAMES],
+                context_name=None,
+                do_approximate_matching=approximate_matching,
+                include_suppressed=False,
+            )
+
+        # The client returns the error message, instead of raising,
+        # when the service is degraded.
+        if "results" not in taxon_tnrs_matched.response_dict:
+            raise ConnectionError(
+                "The Taxonomic Name Resolution Service did not return any result: "
+                f"{taxon_tnrs_matched.response_dict}"
+            )
+
+        # Each result holds the matches of one of the searched names.
+        for result in taxon_tnrs_matched.response_dict["results"]:
+            taxon_tnrs_responses[result["name"]] = {"results": [result]}
+
+        # The names without any match are only listed apart from the results.
+        for taxon_name in taxon_tnrs_matched.response_dict.get("unmatched_names", []):
+            taxon_tnrs_responses.setdefault(
+                taxon_name, {"results": [], "unmatched_names": [taxon_name]}
+            )
+
+    return taxon_tnrs_responses
+
+
+def get_best_match(result: Dict) -> Dict:
+    """Returns the match of a TNRS result used to enrich the taxon.
+
+    Parameters
+    ----------
+    result : Dict
+        One of the results of the TNRS response, with its matches.
+
+    Implementative details
+    ----------------------
+    As in otl_taxon_lineage_appender, the accepted names are preferred over the
+    synonyms, and otherwise the first match returned by the TNRS is used.
+    """
+    return min(result["matches"], key=lambda match: match["is_synonym"])
+
+
+def taxon_info_lookup(ott_id: int) -> Dict:
+    """Fetches the taxonomic information, including the lineage, of the provided ott id.
+
+    Parameters
+    ----------
+    ott_id : int
+        The Open Tree Taxonomy id of the taxon.
+
+    Returns
+    -------
+    taxon_info.response_dict : dict
+        The response of the OT call.
+    """
+    with time_remote_call(OTLEnricher.repository(), "taxon_info"):
+        taxon_info = OT.taxon_info(ott_id, include_lineage=True)
+
+    # The client returns the error message, instead of raising,
+    # when the service is degraded, which is worth a retry.
+    if "ott_id" not in taxon_info.response_dict:
+        raise ConnectionError(
+            f"The taxon_info endpoint did not return the node {ott_id}: "
+            f"{taxon_info.response_dict}"
+        )
+
+    return taxon_info.response_dict
+
+
+def get_lineage_names(taxon_info: Dict) -> Dict[str, str]:
+    """Returns the names of the ancestors of the taxon, by rank.
+
+    Parameters
+    ----------
+    taxon_info : Dict
+        The taxon information, in the format returned by taxon_info_lookup.
+
+    Implementative details
+    ----------------------
+    The lineage goes from the parent of the taxon up to the root, and when
+    several ancestors share a rank we keep the last one, i.e. the highest.
+    """
+    ranks = {}
+    for ancestor in taxon_info.get("lineage", ()):
+        ranks[ancestor["rank"]] = ancestor["name"]
+    return ranks
+
+
+def is_removed_from_taxonomy(
+    taxon_info: Optional[Dict], resolved_taxon_name: str, is_synonym: bool
+) -> bool:
+    """Returns whether the taxon of an entry was merged, split or renamed in a new taxonomy.
+
+    Parameters
+    ----------
+    taxon_info : Optional[Dict]
+        The taxon information of the node of the entry in the new taxonomy,
+        or None if the node is not part of it.
+    resolved_taxon_name : str
+        The name the taxon of the entry was resolved to.
+    is_synonym : bool
+        Whether the resolved name is a synonym, which is not the name of the node.
+    """
+    return taxon_info is None or (
+        not is_synonym
+        and normalize_taxon_name(taxon_info["name"])
+        != normalize_taxon_name(resolved_taxon_name)
+    )
+
+
+def otl_taxon_lineage_appender(
+    taxon_name: str,
+    tnrs_response: Optional[Dict] = None,
+    get_lineages: Optional[Callable[[List[int]], Dict[int, Dict]]] = None,
+) -> OTLTaxonInfo:
+    """Fetches the taxonomic information for a given taxon name using the OpenTree Taxonomic Name Resolution Service.
+
+    Parameters
+    ----------
+    taxon_name : str
+        The taxon to be resolved.
+    tnrs_response : Optional[Dict]
+        The response of the TNRS for the taxon, if it was already resolved
+        in batch, in the format returned by tnrs_lookup.
+    get_lineages : Optional[Callable[[List[int]], Dict[int, Dict]]]
+        The function returning the taxon information, with the lineage, of
+        the provided ott ids, such as the one assembling them from the cache.
+    """
+    jsondic = tnrs_lookup(taxon_name) if tnrs_response is None else tnrs_response
+
+    # We match with the accepted name instead of the synonym in case both are
+    # present, i.e. we use the first match ordered by search string and then by
+    # synonym status, as the matches of a single searched name are kept in order.
+    matches = [match for result in jsondic["results"] for match in result["matches"]]
+    if not matches:
+        raise ValueError(f"No match was found for the taxon name {taxon_name}.")
+    match = min(
+        matches, key=lambda match: (match["search_string"], match["is_synonym"])
+    )
+    ott_id = match["taxon"]["ott_id"]
+
+    if get_lineages is None:
+        taxon_info = taxon_info_lookup(ott_id)
+    else:
+        taxon_info = get_lineages([ott_id])[ott_id]
+
+    ranks = get_lineage_names(taxon_info)
+
+    return OTLTaxonInfo(
+        ott_id=ott_id,
+        **{attribute: ranks.get(rank) for rank, attribute in LINEAGE_RANKS.items()},
+        otol_species=taxon_info["unique_name"],
+        taxon_source=match["taxon"]["source"],
+        taxon_rank=match["taxon"]["rank"],
+        search_string=match["search_string"],
+        score=match["score"],
+        matched_name=match["matched_name"],
+        is_synonym=match["is_synonym"],
+        is_approximate_match=match["is_approximate_match"],
+    )
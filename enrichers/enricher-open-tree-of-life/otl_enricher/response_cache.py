@@ -0,0 +1,199 @@
+"""Submodule providing the on-disk cache of the responses of the Open Tree of Life services.
+
+Implementative details
+----------------------
+Re-enrichments, restarts and the recovery of crashed enrichers issue the same tnrs_match
+and taxon_info requests again. The responses are therefore stored in a local SQLite file,
+keyed by endpoint and by the SHA256 hash of the normalized payload of the request, as the
+result cache of the enrichers does, so that a warm restart makes no remote call at all.
+The file should be stored on a persistent volume for the cache to survive the container.
+
+Each entry expires after a time to live, and the number of entries is bounded: when the
+bound is exceeded, the least recently used entries are evicted.
+
+Each entry is also tagged with the version of the Open Tree Taxonomy of its response, as
+reported in the taxon source of the responses. When a response reports a new version of
+the taxonomy, the entries of the previous versions are outdated, and are not used anymore.
+The version may instead be pinned, such as to the version of the offline taxonomy, in which
+case the responses reporting another version are not stored at all.
+"""
+from typing import Any, Dict, Optional
+from threading import Lock
+import datetime
+import json
+import sqlite3
+from enrichers.result_cache import hash_cache_input
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS responses (
+    endpoint TEXT NOT NULL,
+    payload_hash TEXT NOT NULL,
+    taxonomy_version TEXT,
+    response TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (endpoint, payload_hash)
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+def get_taxonomy_version(response: Dict) -> Optional[str]:
+    """Returns the version of the taxonomy reported by the response, if any.
+
+    Parameters
+    ----------
+    response
+        response of the tnrs_match or of the taxon_info endpoint.
+    """
+    if "source" in response:
+        return response["source"]
+    for result in response.get("results", ()):
+        for match in result.get("matches", ()):
+            return match["taxon"]["source"]
+    return None
+
+
+class ResponseCache:
+    """Cache of the responses of the Open Tree of Life services, stored in a local SQLite file."""
+
+    def __init__(
+        self,
+        path: str,
+        time_to_live: datetime.timedelta = datetime.timedelta(days=30),
+        maximal_number_of_entries: int = 1_000_000,
+        taxonomy_version: Optional[str] = None,
+    ) -> None:
+        """Initialize the response cache.
+
+        Parameters
+        ----------
+        path
+            path of the SQLite file, created if it does not exist.
+        time_to_live
+            time after which a cached response is not used anymore.
+        maximal_number_of_entries
+            maximal number of cached responses.
+        taxonomy_version
+            version of the taxonomy of the cached responses, if pinned. By
+            default, the version of the last stored response reporting one.
+        """
+        self.time_to_live = time_to_live
+        self.maximal_number_of_entries = maximal_number_of_entries
+        # The connection is shared by the successive rounds of the
+        # enricher, which may run on different threads.
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.executescript(SCHEMA)
+            self._connection.commit()
+            row = self._connection.execute(
+                "SELECT value FROM metadata WHERE key = 'taxonomy_version'"
+            ).fetchone()
+        self._taxonomy_version: Optional[str] = None if row is None else row[0]
+        self._is_taxonomy_version_pinned = taxonomy_version is not None
+        if taxonomy_version is not None and taxonomy_version != self._taxonomy_version:
+            with self._lock:
+                self._set_taxonomy_version(taxonomy_version)
+                self._connection.commit()
+
+    def _set_taxonomy_version(self, taxonomy_version: str):
+        """Makes the provided version the current one, outdating the entries of the others.
+
+        The lock must be held by the caller, which commits the change.
+        """
+        self._connection.execute(
+            "INSERT OR REPLACE INTO metadata (key, value) "
+            "VALUES ('taxonomy_version', ?)",
+            (taxonomy_version,),
+        )
+        self._taxonomy_version = taxonomy_version
+
+    def get(self, endpoint: str, payload: Any) -> Optional[Dict]:
+        """Returns the cached response of the request, if any.
+
+        Parameters
+        ----------
+        endpoint
+            name of the requested endpoint.
+        payload
+            normalized JSON-serializable payload of the request.
+        """
+        now = datetime.datetime.now().timestamp()
+        payload_hash = hash_cache_input(payload)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response FROM responses WHERE endpoint = ? AND payload_hash = ? "
+                "AND expires_at > ? AND taxonomy_version IS ?",
+                (endpoint, payload_hash, now, self._taxonomy_version),
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed_at = ? "
+                "WHERE endpoint = ? AND payload_hash = ?",
+                (now, endpoint, payload_hash),
+            )
+            self._connection.commit()
+        return json.loads(row[0])
+
+    def put(self, endpoint: str, payload: Any, response: Dict):
+        """Stores the response of the request.
+
+        Parameters
+        ----------
+        endpoint
+            name of the requested endpoint.
+        payload
+            normalized JSON-serializable payload of the request.
+        response
+            JSON-serializable response of the request.
+        """
+        now = datetime.datetime.now()
+        taxonomy_version = get_taxonomy_version(response) or self._taxonomy_version
+        with self._lock:
+            if taxonomy_version != self._taxonomy_version:
+                if self._is_taxonomy_version_pinned:
+                    return
+                # The taxonomy was updated, so the previous entries are outdated.
+                self._set_taxonomy_version(taxonomy_version)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    endpoint,
+                    hash_cache_input(payload),
+                    taxonomy_version,
+                    json.dumps(response),
+                    (now + self.time_to_live).timestamp(),
+                    now.timestamp(),
+                ),
+            )
+            self._connection.commit()
+
+    def evict(self) -> int:
+        """Evicts the expired, outdated and least recently used responses.
+
+        Returns
+        -------
+        The number of evicted responses.
+        """
+        with self._lock:
+            evicted = self._connection.execute(
+                "DELETE FROM responses WHERE expires_at <= ? "
+                "OR taxonomy_version IS NOT ?",
+                (datetime.datetime.now().timestamp(), self._taxonomy_version),
+            ).rowcount
+            (number_of_entries,) = self._connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()
+            if number_of_entries > self.maximal_number_of_entries:
+                evicted += self._connection.execute(
+                    "DELETE FROM responses WHERE rowid IN ("
+                    " SELECT rowid FROM responses ORDER BY accessed_at LIMIT ?"
+                    ")",
+                    (number_of_entries - self.maximal_number_of_entries,),
+                ).rowcount
+            self._connection.commit()
+        return evicted
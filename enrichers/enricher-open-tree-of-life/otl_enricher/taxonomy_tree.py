@@ -0,0 +1,176 @@
+"""Submodule providing the queries on the tree of the Open Tree Taxonomy nodes.
+
+Implementative details
+----------------------
+The entries of the open_tree_of_life table store the lineage of each taxon as flat columns,
+so that finding, for instance, all the taxa under a family requires scanning the names of
+the families. The nodes of the taxonomy stored by the OTL enricher, in the
+open_tree_of_life_nodes table, carry instead their materialized path, i.e. the ids of the
+nodes from the root of the taxonomy down to the node itself, such as "/1/2/3/".
+
+The subtree of a node is then the set of the nodes whose path starts with the path of the
+node, and the lowest common ancestor of several nodes is the last node of the longest common
+prefix of their paths. The prefix is only a range of the index of the paths when the whole
+pattern is known to the planner, so the subtrees are always selected with the path of their
+root bound as a literal pattern, never with a pattern concatenated to a column: the clades
+are therefore counted with a query per clade, united in a single statement.
+
+The tree uses its own short-lived sessions, as the lineage cache does.
+"""
+from typing import Dict, List, Optional
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.sql.elements import ColumnElement
+from alchemy_wrapper.database import Session
+from .models import OpenTreeOfLifeEntry, OpenTreeOfLifeNode
+
+
+def get_subtree_condition(path: str) -> ColumnElement:
+    """Returns the condition selecting the stored nodes of the subtree with the provided path.
+
+    Parameters
+    ----------
+    path
+        materialized path of the root of the subtree, which is included.
+    """
+    # The paths only hold digits and slashes, so they never need escaping.
+    return OpenTreeOfLifeNode.path.like(f"{path}%")
+
+
+class TaxonomyTree:
+    """Queries on the tree of the stored nodes of the Open Tree Taxonomy."""
+
+    def _get_paths(self, ott_ids: List[int]) -> Dict[int, str]:
+        """Returns the paths of the provided stored nodes, by ott id."""
+        session = Session()
+        try:
+            return dict(
+                session.execute(
+                    select(OpenTreeOfLifeNode.ott_id, OpenTreeOfLifeNode.path).where(
+                        OpenTreeOfLifeNode.ott_id.in_(ott_ids)
+                    )
+                ).all()
+            )
+        finally:
+            session.close()
+
+    def is_in_subtree(self, ott_id: int, ancestor_ott_id: int) -> bool:
+        """Returns whether the node is the provided ancestor or one of its descendants.
+
+        Parameters
+        ----------
+        ott_id
+            id of the node.
+        ancestor_ott_id
+            id of the root of the subtree.
+        """
+        paths = self._get_paths([ott_id, ancestor_ott_id])
+        return (
+            ott_id in paths
+            and ancestor_ott_id in paths
+            and paths[ott_id].startswith(paths[ancestor_ott_id])
+        )
+
+    def get_subtree_ott_ids(self, ancestor_ott_id: int) -> List[int]:
+        """Returns the ids of the stored nodes of the subtree of the provided node.
+
+        Parameters
+        ----------
+        ancestor_ott_id
+            id of the root of the subtree, which is included.
+        """
+        path = self._get_paths([ancestor_ott_id]).get(ancestor_ott_id)
+        if path is None:
+            return []
+        session = Session()
+        try:
+            return list(
+                session.scalars(
+                    select(OpenTreeOfLifeNode.ott_id).where(get_subtree_condition(path))
+                )
+            )
+        finally:
+            session.close()
+
+    def get_taxon_ids_in_subtree(self, ancestor_ott_id: int) -> List[int]:
+        """Returns the ids of the taxa enriched with a node of the subtree of the provided node.
+
+        Parameters
+        ----------
+        ancestor_ott_id
+            id of the root of the subtree, which is included.
+        """
+        path = self._get_paths([ancestor_ott_id]).get(ancestor_ott_id)
+        if path is None:
+            return []
+        session = Session()
+        try:
+            return list(
+                session.scalars(
+                    select(OpenTreeOfLifeEntry.taxon_id)
+                    .join(
+                        OpenTreeOfLifeNode,
+                        OpenTreeOfLifeNode.ott_id == OpenTreeOfLifeEntry.ott_id,
+                    )
+                    .where(get_subtree_condition(path))
+                )
+            )
+        finally:
+            session.close()
+
+    def get_clade_counts(self, ott_ids: List[int]) -> Dict[int, int]:
+        """Returns the number of taxa enriched within the clade of each provided node.
+
+        Parameters
+        ----------
+        ott_ids
+            ids of the roots of the clades. The nodes which are not stored
+            are omitted from the counts.
+        """
+        paths = self._get_paths(ott_ids)
+        if not paths:
+            return {}
+        # The entries of the nodes of each clade are counted by a query
+        # selecting the clade on the literal prefix of its path.
+        clade_counts = [
+            select(
+                literal(ott_id).label("ott_id"),
+                func.count(OpenTreeOfLifeEntry.id).label("count"),
+            )
+            .select_from(OpenTreeOfLifeNode)
+            .outerjoin(
+                OpenTreeOfLifeEntry,
+                OpenTreeOfLifeEntry.ott_id == OpenTreeOfLifeNode.ott_id,
+            )
+            .where(get_subtree_condition(path))
+            for ott_id, path in paths.items()
+        ]
+        session = Session()
+        try:
+            return dict(session.execute(union_all(*clade_counts)).all())
+        finally:
+            session.close()
+
+    def get_lowest_common_ancestor(self, ott_ids: List[int]) -> Optional[int]:
+        """Returns the id of the lowest common ancestor of the provided nodes.
+
+        Parameters
+        ----------
+        ott_ids
+            ids of the nodes, which may include ancestors of the other ones.
+
+        Returns
+        -------
+        The id of the deepest node whose subtree includes all the provided nodes,
+        or None if some of the nodes are not stored, or no node was provided.
+        """
+        unique_ott_ids = list(dict.fromkeys(ott_ids))
+        paths = self._get_paths(unique_ott_ids)
+        if not unique_ott_ids or len(paths) < len(unique_ott_ids):
+            return None
+        lineages = [path.strip("/").split("/") for path in paths.values()]
+        common_ancestor = None
+        for ancestors in zip(*lineages):
+            if len(set(ancestors)) > 1:
+                break
+            common_ancestor = int(ancestors[0])
+        return common_ancestor
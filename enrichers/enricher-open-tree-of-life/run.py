@@ -1,4 +1,4 @@
-from src import OTLEnricher
+from otl_enricher import OTLEnricher
 
 if __name__ == "__main__":
     OTLEnricher().start_service()
@@ -0,0 +1,17 @@
+"""Module installing the Open Tree of Life enricher."""
+from setuptools import find_packages, setup
+
+setup(
+    name='otl_enricher',
+    version="0.0.1",
+    description='Enricher of the taxa with the Open Tree of Life taxonomy.',
+    author="Luca Cappelletti", # Other authors can be added here
+    license='MIT',
+    python_requires='>=3.8.0',
+    packages=find_packages(include=['otl_enricher', 'otl_enricher.*']),
+    install_requires=["alchemy-wrapper", "enrichers", "opentree"],
+    include_package_data=True,
+    entry_points={
+        "emikg.enrichers": ["otl = otl_enricher:OTLEnricher"],
+    },
+)
@@ -1,7 +0,0 @@
-from alchemy_wrapper.models.base import Base
-from alchemy_wrapper.database import engine
-from .otl_enricher import OTLEnricher
-
-Base.metadata.create_all(bind=engine)
-
-__all__ = ["OTLEnricher"]
\ No newline at end of file
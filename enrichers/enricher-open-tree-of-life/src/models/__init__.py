@@ -1,3 +0,0 @@
-from .open_tree_of_life_entry import OpenTreeOfLifeEntry
-
-__all__ = ["OpenTreeOfLifeEntry"]
\ No newline at end of file
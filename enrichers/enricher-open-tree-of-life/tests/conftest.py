@@ -0,0 +1,211 @@
+"""Fixtures shared by the tests of the OTL enricher, run against a temporary SQLite database."""
+from typing import Dict, List
+import os
+import tempfile
+
+# The database must be selected before the models are first imported.
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/otl.sqlite")
+
+# pylint: disable=wrong-import-position
+import pytest
+from alchemy_wrapper import Base, Session, engine
+from alchemy_wrapper.models import Taxon, User
+from enrichers.circuit_breaker import _CIRCUIT_BREAKERS
+from otl_enricher import otl_enricher
+from otl_enricher.offline_taxonomy import OfflineTaxonomy
+
+# The nodes of the test taxonomy, as uid, parent uid, name, rank and flags.
+TAXONOMY = [
+    (1, None, "life", "no rank", ""),
+    (2, 1, "eukaryota", "domain", ""),
+    (3, 2, "animalia", "kingdom", ""),
+    (4, 3, "chordata", "phylum", ""),
+    (5, 4, "mammalia", "class", ""),
+    (6, 5, "primates", "order", ""),
+    (7, 6, "hominidae", "family", ""),
+    (8, 7, "hominini", "tribe", ""),
+    (9, 8, "homo", "genus", ""),
+    (10, 9, "homo sapiens", "species", ""),
+    (11, 8, "pan", "genus", ""),
+    (12, 11, "pan troglodytes", "species", ""),
+    (13, 9, "homo environmental sample", "species", "environmental"),
+    # The rodents are not part of a tribe.
+    (14, 5, "rodentia", "order", ""),
+    (15, 14, "muridae", "family", ""),
+    (16, 15, "mus", "genus", ""),
+    (17, 16, "mus musculus", "species", ""),
+]
+
+# The remote taxonomy also includes a taxon missing from the offline one, and a
+# distinct taxon whose name is a single edit away from the name of another.
+REMOTE_TAXONOMY = TAXONOMY + [
+    (18, 11, "pan paniscus", "species", ""),
+    (19, 11, "pan troglodytas", "species", ""),
+]
+
+# The synonyms of the test taxonomy, as name and uid.
+SYNONYMS = [("pan niger", 12)]
+
+
+def write_taxonomy_dump(
+    directory: str, version: str, taxonomy=TAXONOMY, synonyms=SYNONYMS
+):
+    """Writes a dump of the Open Tree Taxonomy with the provided nodes and synonyms."""
+
+    def join(values: List[str]) -> str:
+        return "\t|\t".join(values) + "\t|\n"
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "taxonomy.tsv"), "w", encoding="utf8") as dump:
+        dump.write(
+            join(
+                ["uid", "parent_uid", "name", "rank", "sourceinfo", "uniqname", "flags"]
+            )
+        )
+        for uid, parent_uid, name, rank, flags in taxonomy:
+            dump.write(
+                join(
+                    [
+                        str(uid),
+                        "" if parent_uid is None else str(parent_uid),
+                        name,
+                        rank,
+                        "",
+                        "",
+                        flags,
+                    ]
+                )
+            )
+    with open(os.path.join(directory, "synonyms.tsv"), "w", encoding="utf8") as dump:
+        dump.write(join(["name", "uid", "type", "uniqname", "sourceinfo"]))
+        for name, uid in synonyms:
+            dump.write(join([name, str(uid), "synonym", "", ""]))
+    with open(os.path.join(directory, "version.txt"), "w", encoding="utf8") as dump:
+        dump.write(f"{version}\n")
+
+
+class FakeResponse:
+    """Response of the fake Open Tree of Life client."""
+
+    def __init__(self, response_dict: Dict) -> None:
+        self.response_dict = response_dict
+
+
+class FakeOpenTree:
+    """Open Tree of Life client answering from an offline taxonomy, and recording the calls."""
+
+    def __init__(self, offline_taxonomy: OfflineTaxonomy) -> None:
+        self.offline_taxonomy = offline_taxonomy
+        self.calls: List[str] = []
+        # Whether each call to the tnrs_match endpoint asked for approximate matches.
+        self.approximate_matching: List[bool] = []
+        # The error messages returned instead of the responses, by endpoint.
+        self.errors: Dict[str, Dict] = {}
+
+    def tnrs_match(
+        self, names: List[str], do_approximate_matching: bool = True, **kwargs
+    ) -> FakeResponse:
+        self.calls.append("tnrs_match")
+        self.approximate_matching.append(do_approximate_matching)
+        if "tnrs_match" in self.errors:
+            return FakeResponse(self.errors["tnrs_match"])
+        responses = self.offline_taxonomy.match_names(names)
+        # As the service, the names without any match are listed apart.
+        return FakeResponse(
+            {
+                "results": [
+                    responses[name]["results"][0] for name in names if name in responses
+                ],
+                "unmatched_names": [name for name in names if name not in responses],
+            }
+        )
+
+    def taxon_info(self, ott_id: int, **kwargs) -> FakeResponse:
+        self.calls.append("taxon_info")
+        if "taxon_info" in self.errors:
+            return FakeResponse(self.errors["taxon_info"])
+        taxon_info = self.offline_taxonomy.get_taxon_info(ott_id)
+        if taxon_info is None:
+            return FakeResponse({"message": f"Unrecognized OTT ID: {ott_id}"})
+        return FakeResponse(taxon_info)
+
+
+@pytest.fixture(autouse=True)
+def database():
+    """Recreates the tables, and the circuit breakers, before each test."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    _CIRCUIT_BREAKERS.clear()
+    yield
+    engine.dispose()
+
+
+@pytest.fixture
+def session():
+    """Returns a session of the test database."""
+    test_session = Session()
+    yield test_session
+    test_session.close()
+
+
+@pytest.fixture
+def offline_taxonomy_path(tmp_path) -> str:
+    """Returns the path of the offline index of the version 3.5 of the test taxonomy."""
+    write_taxonomy_dump(str(tmp_path / "ott3.5"), "3.5")
+    OfflineTaxonomy.build(str(tmp_path / "ott3.5"), str(tmp_path / "ott.sqlite"))
+    return str(tmp_path / "ott.sqlite")
+
+
+@pytest.fixture
+def offline_taxonomy(offline_taxonomy_path) -> OfflineTaxonomy:
+    """Returns the offline index of the version 3.5 of the test taxonomy."""
+    return OfflineTaxonomy(offline_taxonomy_path)
+
+
+@pytest.fixture
+def open_tree(tmp_path, monkeypatch) -> FakeOpenTree:
+    """Replaces the Open Tree of Life client with one answering from the test taxonomy."""
+    write_taxonomy_dump(str(tmp_path / "remote"), "3.5", taxonomy=REMOTE_TAXONOMY)
+    fake_open_tree = FakeOpenTree(
+        OfflineTaxonomy.build(str(tmp_path / "remote"), str(tmp_path / "remote.sqlite"))
+    )
+    monkeypatch.setattr(otl_enricher, "OT", fake_open_tree)
+    return fake_open_tree
+
+
+@pytest.fixture
+def make_enricher(tmp_path, monkeypatch, open_tree):
+    """Returns a function creating an OTL enricher, with or without the offline taxonomy."""
+    enrichers = []
+
+    def create(offline_taxonomy_path: str = None, response_cache: bool = True):
+        monkeypatch.setenv(
+            "OTL_RESPONSE_CACHE",
+            str(tmp_path / "responses.sqlite") if response_cache else "",
+        )
+        if offline_taxonomy_path is None:
+            monkeypatch.delenv("OTL_OFFLINE_TAXONOMY", raising=False)
+        else:
+            monkeypatch.setenv("OTL_OFFLINE_TAXONOMY", offline_taxonomy_path)
+        enrichers.append(otl_enricher.OTLEnricher())
+        return enrichers[-1]
+
+    yield create
+    for enricher in enrichers:
+        enricher._session.close()
+
+
+@pytest.fixture
+def add_taxa(session):
+    """Returns a function adding taxa with the provided names, submitted by a regular user."""
+    user = User(first_name="Jane", last_name="Doe", description="")
+    session.add(user)
+    session.commit()
+
+    def add(*names: str) -> List[Taxon]:
+        taxa = [Taxon(name=name, description="", user_id=user.id) for name in names]
+        session.add_all(taxa)
+        session.commit()
+        return taxa
+
+    return add
@@ -0,0 +1,29 @@
+"""Test the batched resolution of the taxon names by the OTL enricher."""
+from alchemy_wrapper.models import Task
+from otl_enricher.models import OpenTreeOfLifeEntry
+
+
+def test_unmatched_names_are_resolved_within_the_batch(
+    session, make_enricher, open_tree, add_taxa
+):
+    """Test that the names without any match are resolved by the batch, without further calls."""
+    add_taxa("Homo sapiens", "Quercus robur", "Pan troglodytes")
+    enricher = make_enricher()
+
+    enricher.enrich_all()
+
+    # The name without an exact match is matched approximately, and
+    # the name unmatched by both is not resolved again on its own.
+    assert open_tree.approximate_matching == [False, True]
+    assert [task.status for task in session.query(Task).order_by(Task.id)] == [
+        "SUCCESS",
+        "FAILURE",
+        "SUCCESS",
+    ]
+    assert sorted(entry.ott_id for entry in session.query(OpenTreeOfLifeEntry)) == [
+        10,
+        12,
+    ]
+    assert enricher._response_cache.get(
+        "tnrs_match", {"taxon_name": "quercus robur"}
+    ) == {"results": [], "unmatched_names": ["quercus robur"]}
@@ -0,0 +1,32 @@
+"""Test the batched eligibility check of the taxa enriched by the OTL enricher."""
+from sqlalchemy import event
+from alchemy_wrapper import engine
+
+
+def test_enriched_taxa_are_filtered_with_a_single_query(
+    make_enricher, offline_taxonomy_path, add_taxa
+):
+    """Test that the taxa already enriched are filtered out in order, with a single query."""
+    homo_sapiens, pan_troglodytes, mus_musculus = add_taxa(
+        "Homo sapiens", "Pan troglodytes", "Mus musculus"
+    )
+    enricher = make_enricher(offline_taxonomy_path)
+    assert enricher.enrich(homo_sapiens)
+
+    candidates = [mus_musculus, homo_sapiens, pan_troglodytes]
+    # The candidates are loaded by the discovery query before being checked.
+    for candidate in candidates:
+        assert candidate.id is not None
+    statements = []
+
+    def record_statement(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record_statement)
+    try:
+        eligible = enricher._select_enrichables(candidates)
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
+
+    assert eligible == [mus_musculus, pan_troglodytes]
+    assert len(statements) == 1
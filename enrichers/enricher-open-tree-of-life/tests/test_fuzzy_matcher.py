@@ -0,0 +1,113 @@
+"""Test the local fuzzy matching of the taxon names already resolved."""
+from otl_enricher.fuzzy_matcher import FuzzyMatcher, get_edit_distance
+from otl_enricher.models import OpenTreeOfLifeEntry
+
+
+def get_entry(ott_id: int, name: str):
+    """Returns an indexed entry of the provided node."""
+    return (ott_id, name, False, "species", "ott3.5")
+
+
+def get_matched_ott_id(fuzzy_matcher: FuzzyMatcher, taxon_name: str):
+    """Returns the ott id of the local match of the provided name, if any."""
+    tnrs_response = fuzzy_matcher.match(taxon_name)
+    if tnrs_response is None:
+        return None
+    return tnrs_response["results"][0]["matches"][0]["taxon"]["ott_id"]
+
+
+def test_edit_distance_counts_transpositions_as_single_edits():
+    """Test that the transpositions of adjacent characters are counted as single edits."""
+    assert get_edit_distance("homo sapiens", "homo sapiens") == 0
+    assert get_edit_distance("homo sapiens", "homo sapeins") == 1
+    assert get_edit_distance("homo sapiens", "homo sapien") == 1
+    assert get_edit_distance("kitten", "sitting") == 3
+
+
+def test_ambiguous_names_are_left_to_the_remote_service():
+    """Test that a name as close to the names of two taxa is not matched locally."""
+    fuzzy_matcher = FuzzyMatcher()
+    fuzzy_matcher._add("pan troglodytes", get_entry(12, "pan troglodytes"))
+    assert get_matched_ott_id(fuzzy_matcher, "Pan troglodytis") == 12
+
+    fuzzy_matcher._add("pan troglodytas", get_entry(99, "pan troglodytas"))
+    assert get_matched_ott_id(fuzzy_matcher, "Pan troglodytis") is None
+    assert get_matched_ott_id(fuzzy_matcher, "Homo sapiens") is None
+
+
+def test_index_evicts_the_least_recently_used_names():
+    """Test that the names neither indexed nor matched for the longest time are evicted."""
+    fuzzy_matcher = FuzzyMatcher(maximal_number_of_names=2)
+    fuzzy_matcher._add("homo sapiens", get_entry(10, "homo sapiens"))
+    fuzzy_matcher._add("pan troglodytes", get_entry(12, "pan troglodytes"))
+    assert get_matched_ott_id(fuzzy_matcher, "homo sapeins") == 10
+
+    fuzzy_matcher._add("mus musculus", get_entry(17, "mus musculus"))
+
+    assert len(fuzzy_matcher) == 2
+    assert get_matched_ott_id(fuzzy_matcher, "pan troglodytse") is None
+    assert get_matched_ott_id(fuzzy_matcher, "homo sapeins") == 10
+    assert get_matched_ott_id(fuzzy_matcher, "mus muscluus") == 17
+    # The postings of the evicted name are removed along with it.
+    assert all(len(posting) <= 2 for posting in fuzzy_matcher._postings.values())
+    assert "tro" not in fuzzy_matcher._postings
+
+
+def test_misspelled_names_are_matched_locally(
+    session, make_enricher, offline_taxonomy_path, open_tree, add_taxa
+):
+    """Test that a misspelling of a name already resolved makes no remote call."""
+    add_taxa("Pan paniscus")
+    assert make_enricher(offline_taxonomy_path, response_cache=False).enrich_all()
+    assert open_tree.calls == ["tnrs_match", "taxon_info"]
+
+    add_taxa("Pan paniscsu")
+    assert make_enricher(offline_taxonomy_path, response_cache=False).enrich_all()
+
+    assert open_tree.calls == ["tnrs_match", "taxon_info"]
+    entry = (
+        session.query(OpenTreeOfLifeEntry)
+        .order_by(OpenTreeOfLifeEntry.id.desc())
+        .first()
+    )
+    assert entry.ott_id == 18
+    assert entry.is_approximated_match
+
+
+def test_misspelled_names_are_matched_locally_after_an_exact_matching(
+    session, make_enricher, open_tree, add_taxa
+):
+    """Test that, without the offline taxonomy, a misspelling is matched locally once the service matched it exactly."""
+    add_taxa("Homo sapiens")
+    assert make_enricher(response_cache=False).enrich_all()
+    assert open_tree.approximate_matching == [False]
+
+    add_taxa("Homo sapeins")
+    assert make_enricher(response_cache=False).enrich_all()
+
+    # Only the exact matching of the service was asked for.
+    assert open_tree.calls == ["tnrs_match", "taxon_info", "tnrs_match"]
+    assert open_tree.approximate_matching == [False, False]
+    entry = (
+        session.query(OpenTreeOfLifeEntry)
+        .order_by(OpenTreeOfLifeEntry.id.desc())
+        .first()
+    )
+    assert entry.ott_id == 10
+    assert entry.is_approximated_match
+
+
+def test_valid_names_close_to_a_resolved_name_are_matched_exactly(
+    session, make_enricher, open_tree, add_taxa
+):
+    """Test that a valid name a single edit away from a resolved name is not matched to its taxon."""
+    add_taxa("Pan troglodytes")
+    assert make_enricher(response_cache=False).enrich_all()
+
+    add_taxa("Pan troglodytas")
+    assert make_enricher(response_cache=False).enrich_all()
+
+    assert [
+        (entry.ott_id, entry.is_approximated_match)
+        for entry in session.query(OpenTreeOfLifeEntry).order_by(OpenTreeOfLifeEntry.id)
+    ] == [(12, False), (19, False)]
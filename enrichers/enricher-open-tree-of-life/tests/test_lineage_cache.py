@@ -0,0 +1,90 @@
+"""Test the persistent cache of the nodes of the Open Tree Taxonomy."""
+from otl_enricher.lineage_cache import LineageCache
+from otl_enricher.models import OpenTreeOfLifeNode
+
+
+def test_lineages_are_assembled_from_the_cached_nodes(offline_taxonomy):
+    """Test that the nodes are fetched once, and the lineages then assembled from the cache."""
+    fetched = []
+
+    def fetch(ott_id: int):
+        fetched.append(ott_id)
+        return offline_taxonomy.get_taxon_info(ott_id)
+
+    lineage_cache = LineageCache()
+    lineages = lineage_cache.get_lineages([10, 12, 10], fetch)
+
+    assert fetched == [10, 12]
+    assert lineages[10]["unique_name"] == "homo sapiens"
+    assert [ancestor["ott_id"] for ancestor in lineages[12]["lineage"]] == [
+        11,
+        8,
+        7,
+        6,
+        5,
+        4,
+        3,
+        2,
+        1,
+    ]
+
+    # The genus is an ancestor of the species, so its lineage is already complete.
+    assert lineage_cache.get_lineages([9, 10, 12], fetch) == {
+        9: {**lineages[10]["lineage"][0], "lineage": lineages[10]["lineage"][1:]},
+        10: lineages[10],
+        12: lineages[12],
+    }
+    assert fetched == [10, 12]
+
+
+def test_stored_nodes_are_skipped(session, offline_taxonomy):
+    """Test that the nodes already stored are kept, while the other nodes of the batch are stored."""
+    session.add(
+        OpenTreeOfLifeNode(
+            ott_id=9,
+            name="homo",
+            unique_name="homo (stored)",
+            rank="genus",
+            parent_ott_id=8,
+            path="/1/2/3/4/5/6/7/8/9/",
+        )
+    )
+    session.commit()
+
+    LineageCache().store(
+        [offline_taxonomy.get_taxon_info(10), offline_taxonomy.get_taxon_info(12)]
+    )
+
+    session.expire_all()
+    assert session.query(OpenTreeOfLifeNode).count() == 12
+    assert session.get(OpenTreeOfLifeNode, 9).unique_name == "homo (stored)"
+    assert session.get(OpenTreeOfLifeNode, 10).path == "/1/2/3/4/5/6/7/8/9/10/"
+
+
+def test_stored_nodes_are_overwritten_and_removed(session, offline_taxonomy):
+    """Test that the stored nodes are replaced when overwriting, and fetched again once removed."""
+    lineage_cache = LineageCache()
+    lineage_cache.store([offline_taxonomy.get_taxon_info(10)])
+    renamed = offline_taxonomy.get_taxon_info(10)
+    renamed["lineage"][0]["unique_name"] = "homo (renamed)"
+
+    lineage_cache.store([renamed], overwrite=True)
+
+    session.expire_all()
+    assert session.get(OpenTreeOfLifeNode, 9).unique_name == "homo (renamed)"
+
+    lineage_cache.remove([9])
+    fetched = []
+
+    def fetch(ott_id: int):
+        fetched.append(ott_id)
+        return offline_taxonomy.get_taxon_info(ott_id)
+
+    # The lineage of the species is incomplete without its genus.
+    assert lineage_cache.get_lineages([10], fetch)[10]["lineage"][0] == {
+        "ott_id": 9,
+        "name": "homo",
+        "unique_name": "homo",
+        "rank": "genus",
+    }
+    assert fetched == [10]
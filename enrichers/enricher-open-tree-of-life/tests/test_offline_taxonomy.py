@@ -0,0 +1,110 @@
+"""Test the offline index of the Open Tree Taxonomy."""
+import pytest
+from alchemy_wrapper.models import Task
+from otl_enricher.models import OpenTreeOfLifeEntry
+from otl_enricher.offline_taxonomy import OfflineTaxonomy, main
+from .conftest import write_taxonomy_dump
+
+
+def test_offline_taxonomy_matches_names(offline_taxonomy):
+    """Test that the exact and synonym matches are found, but not the suppressed taxa."""
+    responses = offline_taxonomy.match_names(
+        ["Homo  Sapiens", "pan niger", "homo environmental sample", "homo sapeins"]
+    )
+
+    assert list(responses) == ["homo sapiens", "pan niger"]
+    (exact_match,) = responses["homo sapiens"]["results"][0]["matches"]
+    assert exact_match["taxon"]["ott_id"] == 10
+    assert exact_match["taxon"]["source"] == "ott3.5"
+    assert not exact_match["is_synonym"]
+    (synonym_match,) = responses["pan niger"]["results"][0]["matches"]
+    assert synonym_match["taxon"]["ott_id"] == 12
+    assert synonym_match["is_synonym"]
+
+
+def test_offline_taxonomy_assembles_lineages(offline_taxonomy):
+    """Test that the lineage goes from the parent of the taxon up to the root."""
+    taxon_info = offline_taxonomy.get_taxon_info(13)
+
+    assert taxon_info["name"] == "homo environmental sample"
+    assert taxon_info["flags"] == ["environmental"]
+    assert [ancestor["ott_id"] for ancestor in taxon_info["lineage"]] == [
+        9,
+        8,
+        7,
+        6,
+        5,
+        4,
+        3,
+        2,
+        1,
+    ]
+    assert offline_taxonomy.get_taxon_info(404) is None
+
+
+def test_offline_taxonomy_replaces_the_previous_version(
+    tmp_path, offline_taxonomy_path
+):
+    """Test that a new version of the taxonomy replaces the previous index."""
+    write_taxonomy_dump(str(tmp_path / "ott3.6"), "3.6", synonyms=[])
+
+    offline_taxonomy = OfflineTaxonomy.build(
+        str(tmp_path / "ott3.6"), offline_taxonomy_path
+    )
+
+    assert offline_taxonomy.get_source() == "ott3.6"
+    assert OfflineTaxonomy(offline_taxonomy_path).version == "3.6"
+    assert not offline_taxonomy.match_names(["pan niger"])
+    assert not (tmp_path / "ott.sqlite.partial").exists()
+
+
+def test_offline_taxonomy_is_ingested_from_the_command_line(tmp_path, caplog):
+    """Test that the command line ingests a dump, and logs the ingested version."""
+    write_taxonomy_dump(str(tmp_path / "ott3.6"), "3.6")
+
+    with caplog.at_level("INFO"):
+        main([str(tmp_path / "ott3.6"), str(tmp_path / "ott.sqlite")])
+
+    assert OfflineTaxonomy(str(tmp_path / "ott.sqlite")).version == "3.6"
+    assert "Ingested the version 3.6 of the Open Tree Taxonomy" in caplog.text
+
+
+def test_offline_taxonomy_requires_an_index(tmp_path):
+    """Test that opening a missing index explains how to build it."""
+    with pytest.raises(FileNotFoundError, match="python -m otl_enricher.offline_taxonomy"):
+        OfflineTaxonomy(str(tmp_path / "missing.sqlite"))
+
+
+def test_enricher_resolves_offline(
+    session, make_enricher, offline_taxonomy_path, open_tree, add_taxa
+):
+    """Test that the taxa of the offline taxonomy are enriched without any remote call."""
+    taxa = add_taxa("Homo sapiens", "Pan niger")
+    enricher = make_enricher(offline_taxonomy_path)
+
+    assert enricher.enrich_all()
+
+    assert open_tree.calls == []
+    entries = {entry.taxon_id: entry for entry in session.query(OpenTreeOfLifeEntry)}
+    assert entries[taxa[0].id].ott_id == 10
+    assert entries[taxa[0].id].genus == "homo"
+    assert entries[taxa[0].id].version == "ott3.5"
+    assert entries[taxa[1].id].ott_id == 12
+    assert entries[taxa[1].id].is_synonym
+    assert entries[taxa[1].id].tribe == "hominini"
+    assert session.query(Task).filter_by(status="SUCCESS").count() == 2
+
+
+def test_enricher_falls_back_to_the_remote_service(
+    session, make_enricher, offline_taxonomy_path, open_tree, add_taxa
+):
+    """Test that the names and nodes missing from the offline taxonomy are resolved remotely."""
+    taxa = add_taxa("Homo sapiens", "Pan paniscus")
+    enricher = make_enricher(offline_taxonomy_path)
+
+    assert enricher.enrich_all()
+
+    assert open_tree.calls == ["tnrs_match", "taxon_info"]
+    entry = session.query(OpenTreeOfLifeEntry).filter_by(taxon_id=taxa[1].id).one()
+    assert entry.ott_id == 18
+    assert entry.genus == "pan"
@@ -0,0 +1,172 @@
+"""Test that the responses of the OTL services are parsed as the previous pandas parser did."""
+from typing import Dict, List
+import random
+import pytest
+from otl_enricher.otl_enricher import OTLTaxonInfo, otl_taxon_lineage_appender
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+RANKS = ["domain", "kingdom", "phylum", "class", "order", "family", "tribe", "genus"]
+
+
+def parse_with_pandas(tnrs_response: Dict, taxon_infos: Dict[int, Dict]) -> Dict:
+    """Returns the taxonomic information parsed as by the pandas parser, before it was replaced."""
+    df_species_tnrs_matched = pd.json_normalize(
+        tnrs_response, record_path=["results", "matches"]
+    )
+    df_species_tnrs_matched.sort_values(
+        ["search_string", "is_synonym"], axis=0, inplace=True
+    )
+    merged_df = df_species_tnrs_matched.drop_duplicates("search_string", keep="first")
+    merged_df["taxon.ott_id"] = merged_df["taxon.ott_id"].astype("Int64")
+    ott_list = list(merged_df["taxon.ott_id"].dropna().astype("int"))
+    ott_resolved = [taxon_infos[ott_id] for ott_id in ott_list]
+
+    df_tax_lineage = pd.json_normalize(
+        ott_resolved,
+        record_path=["lineage"],
+        meta=["ott_id", "unique_name"],
+        record_prefix="sub_",
+        errors="ignore",
+    )
+    df_tax_lineage_filtered = df_tax_lineage.groupby(
+        ["ott_id", "sub_rank"], as_index=False
+    ).last()
+    df_tax_lineage_filtered_flat = df_tax_lineage_filtered.pivot(
+        index="ott_id", columns="sub_rank", values="sub_name"
+    )
+    df_tax_lineage_filtered_flat = pd.merge(
+        df_tax_lineage_filtered_flat,
+        df_tax_lineage_filtered[["ott_id", "unique_name"]],
+        how="left",
+        on="ott_id",
+    )
+    df_tax_lineage_filtered_flat.drop_duplicates(
+        subset=["ott_id", "unique_name"], inplace=True
+    )
+    df_tax_lineage_filtered_flat = df_tax_lineage_filtered_flat.reindex(
+        columns=["ott_id", *RANKS, "unique_name"], fill_value=np.nan
+    )
+    samples_metadata = pd.merge(
+        merged_df[pd.notnull(merged_df["taxon.ott_id"])],
+        df_tax_lineage_filtered_flat,
+        how="left",
+        left_on="taxon.ott_id",
+        right_on="ott_id",
+    ).iloc[0]
+
+    parsed = {
+        "ott_id": samples_metadata["taxon.ott_id"],
+        **{f"otol_{rank}": samples_metadata[rank] for rank in RANKS},
+        "otol_species": samples_metadata["unique_name"],
+        "taxon_source": samples_metadata["taxon.source"],
+        "taxon_rank": samples_metadata["taxon.rank"],
+        "search_string": samples_metadata["search_string"],
+        "score": samples_metadata["score"],
+        "matched_name": samples_metadata["matched_name"],
+        "is_synonym": samples_metadata["is_synonym"],
+        "is_approximate_match": samples_metadata["is_approximate_match"],
+    }
+    # As the previous OTLTaxonInfo.to_dict did, the missing values are None
+    # and the numpy scalars are converted to builtin types.
+    return {
+        key: (
+            None
+            if pd.isna(value)
+            else value.item() if isinstance(value, np.generic) else value
+        )
+        for key, value in parsed.items()
+    }
+
+
+def get_random_lineage(generator: random.Random) -> List[Dict]:
+    """Returns a random lineage, from the parent of a taxon up to the root."""
+    lineage = []
+    # Some ranks are missing, and others are shared by several ancestors.
+    for rank in reversed(RANKS):
+        for _ in range(generator.choice((0, 1, 1, 1, 2))):
+            ott_id = generator.randrange(1, 10**6)
+            lineage.append(
+                {
+                    "ott_id": ott_id,
+                    "name": f"{rank} {ott_id}",
+                    "unique_name": f"{rank} {ott_id}",
+                    "rank": rank,
+                }
+            )
+    lineage.append(
+        {"ott_id": 0, "name": "life", "unique_name": "life", "rank": "no rank"}
+    )
+    return lineage
+
+
+def get_random_response(generator: random.Random):
+    """Returns a random TNRS response for a single name, and the taxon information of its matches."""
+    search_string = generator.choice(("homo sapiens", "pan troglodytes"))
+    matches, taxon_infos = [], {}
+    for _ in range(generator.randint(1, 4)):
+        ott_id = generator.randrange(10**6, 2 * 10**6)
+        matched_name = f"species {ott_id}"
+        matches.append(
+            {
+                "is_approximate_match": generator.random() < 0.5,
+                "is_synonym": generator.random() < 0.5,
+                "matched_name": matched_name,
+                "score": generator.random(),
+                "search_string": search_string,
+                "taxon": {
+                    "ott_id": ott_id,
+                    "name": matched_name,
+                    "rank": "species",
+                    "source": "ott3.5",
+                },
+            }
+        )
+        taxon_infos[ott_id] = {
+            "ott_id": ott_id,
+            "name": matched_name,
+            "unique_name": matched_name,
+            "rank": "species",
+            "lineage": get_random_lineage(generator),
+        }
+    return {"results": [{"name": search_string, "matches": matches}]}, taxon_infos
+
+
+def test_parser_matches_the_pandas_parser():
+    """Test that the match and the lineage are selected as by the pandas parser."""
+    generator = random.Random(45)
+    for _ in range(200):
+        tnrs_response, taxon_infos = get_random_response(generator)
+        taxon_info = otl_taxon_lineage_appender(
+            "searched name",
+            tnrs_response=tnrs_response,
+            get_lineages=lambda ott_ids: {
+                ott_id: taxon_infos[ott_id] for ott_id in ott_ids
+            },
+        )
+        assert taxon_info.to_dict() == parse_with_pandas(tnrs_response, taxon_infos)
+
+
+def test_parsed_records_round_trip():
+    """Test that the parsed records are restored from their dictionaries."""
+    tnrs_response, taxon_infos = get_random_response(random.Random(0))
+    taxon_info = otl_taxon_lineage_appender(
+        "searched name",
+        tnrs_response=tnrs_response,
+        get_lineages=lambda ott_ids: {
+            ott_id: taxon_infos[ott_id] for ott_id in ott_ids
+        },
+    )
+
+    assert (
+        OTLTaxonInfo.from_dict(taxon_info.to_dict()).to_dict() == taxon_info.to_dict()
+    )
+
+
+def test_parser_rejects_unmatched_names():
+    """Test that a name without any match is reported as such."""
+    with pytest.raises(ValueError, match="No match was found"):
+        otl_taxon_lineage_appender(
+            "unknown", tnrs_response={"results": [{"name": "unknown", "matches": []}]}
+        )
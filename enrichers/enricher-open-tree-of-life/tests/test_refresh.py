@@ -0,0 +1,131 @@
+"""Test the refresh of the entries enriched with a previous version of the taxonomy."""
+import pytest
+from alchemy_wrapper.models import Task
+from enrichers.models import TaxonEnrichmentTask
+from otl_enricher.models import OpenTreeOfLifeEntry, OpenTreeOfLifeNode
+from otl_enricher.offline_taxonomy import OfflineTaxonomy
+from .conftest import TAXONOMY, write_taxonomy_dump
+
+# In the version 3.6 of the test taxonomy, the genus homo is not part of a tribe
+# anymore, and the chimpanzee is split into a new node.
+UPDATED_TAXONOMY = [
+    (uid, 7 if uid == 9 else parent_uid, name, rank, flags)
+    for uid, parent_uid, name, rank, flags in TAXONOMY
+    if uid != 12
+] + [(19, 11, "pan troglodytes", "species", "")]
+
+
+@pytest.fixture
+def updated_taxonomy_path(tmp_path) -> str:
+    """Returns the path of the offline index of the version 3.6 of the test taxonomy."""
+    write_taxonomy_dump(
+        str(tmp_path / "ott3.6"),
+        "3.6",
+        taxonomy=UPDATED_TAXONOMY,
+        synonyms=[("pan niger", 19)],
+    )
+    OfflineTaxonomy.build(str(tmp_path / "ott3.6"), str(tmp_path / "ott3.6.sqlite"))
+    return str(tmp_path / "ott3.6.sqlite")
+
+
+def get_entries(session):
+    """Returns the stored entries, by taxon id."""
+    session.expire_all()
+    return {entry.taxon_id: entry for entry in session.query(OpenTreeOfLifeEntry)}
+
+
+def test_refresh_converges_to_the_new_version(
+    session, make_enricher, offline_taxonomy_path, updated_taxonomy_path, add_taxa
+):
+    """Test that the outdated entries are updated or enriched again, without looping."""
+    homo_sapiens, pan_troglodytes, pan_niger, pan_paniscus = add_taxa(
+        "Homo sapiens", "Pan troglodytes", "Pan niger", "Pan paniscus"
+    )
+    assert make_enricher(offline_taxonomy_path).enrich_all()
+    assert {entry.version for entry in get_entries(session).values()} == {"ott3.5"}
+
+    enricher = make_enricher(updated_taxonomy_path)
+    # The responses and the entries of the previous version are not served anymore.
+    assert (
+        enricher._response_cache.get("tnrs_match", {"taxon_name": "pan paniscus"})
+        is None
+    )
+    assert enricher._fuzzy_matcher.refresh() == 0
+    enricher._refresh_outdated_entries()
+
+    # The entry whose new lineage lacks the tribe is kept, with its previous tribe.
+    entries = get_entries(session)
+    assert list(entries) == [homo_sapiens.id]
+    assert entries[homo_sapiens.id].version == "ott3.6"
+    assert entries[homo_sapiens.id].tribe == "hominini"
+    assert entries[homo_sapiens.id].genus == "homo"
+    assert session.get(OpenTreeOfLifeNode, 10).path == "/1/2/3/4/5/6/7/9/10/"
+    # The nodes of the merged or split taxa are not cached anymore.
+    assert session.get(OpenTreeOfLifeNode, 12) is None
+    assert session.get(OpenTreeOfLifeNode, 18) is None
+
+    assert enricher.enrich_all()
+
+    entries = get_entries(session)
+    assert entries[pan_troglodytes.id].ott_id == 19
+    assert entries[pan_niger.id].ott_id == 19
+    assert {entry.version for entry in entries.values()} == {"ott3.6"}
+    # The remote service still resolves the bonobo to a node missing from
+    # the new version, so its entry, which would be removed, is not stored.
+    assert pan_paniscus.id not in entries
+    assert (
+        session.query(Task.status)
+        .join(TaxonEnrichmentTask, TaxonEnrichmentTask.task_id == Task.id)
+        .filter(TaxonEnrichmentTask.taxon_id == pan_paniscus.id)
+        .order_by(Task.id.desc())
+        .first()
+        .status
+        == "FAILURE"
+    )
+
+    # The next refresh has nothing left to update nor to remove.
+    entry_ids = {entry.id for entry in entries.values()}
+    enricher._refresh_outdated_entries()
+    assert {entry.id for entry in get_entries(session).values()} == entry_ids
+
+
+def test_refresh_runs_once_per_taxonomy_version(
+    session, make_enricher, offline_taxonomy_path, updated_taxonomy_path, add_taxa
+):
+    """Test that the refresh is skipped once the entries were brought to the offline version."""
+    add_taxa("Homo sapiens")
+    assert make_enricher(offline_taxonomy_path).enrich_all()
+    enricher = make_enricher(updated_taxonomy_path)
+    refreshes = []
+    refresh_outdated_entries = enricher._refresh_outdated_entries
+
+    def record_refresh():
+        refreshes.append(enricher._offline_taxonomy.get_source())
+        refresh_outdated_entries()
+
+    enricher._refresh_outdated_entries = record_refresh
+    enricher.run_round()
+    enricher.run_round()
+
+    assert refreshes == ["ott3.6"]
+    assert {entry.version for entry in get_entries(session).values()} == {"ott3.6"}
+
+
+def test_refreshed_entries_are_indexed_again(
+    session, make_enricher, offline_taxonomy_path, updated_taxonomy_path, add_taxa
+):
+    """Test that the index of the resolved names is reset by a refresh, to load the refreshed entries."""
+    add_taxa("Homo sapiens")
+    assert make_enricher(offline_taxonomy_path).enrich_all()
+    enricher = make_enricher(updated_taxonomy_path)
+    # The index already loaded the entries up to the last one, of the
+    # previous version, as after enriching other taxa in the meantime.
+    enricher._fuzzy_matcher._last_entry_id = max(
+        entry.id for entry in get_entries(session).values()
+    )
+
+    enricher._refresh_outdated_entries()
+
+    assert enricher._fuzzy_matcher.refresh() == 1
+    matched = enricher._fuzzy_matcher.match("homo sapeins")
+    assert matched["results"][0]["matches"][0]["taxon"]["ott_id"] == 10
@@ -0,0 +1,113 @@
+"""Test the on-disk cache of the responses of the Open Tree of Life services."""
+import datetime
+from alchemy_wrapper.models import Task
+from enrichers.models import EnrichmentCacheEntry
+from otl_enricher.models import OpenTreeOfLifeEntry
+from otl_enricher.response_cache import ResponseCache
+
+DEGRADED = {"message": "The service is temporarily unavailable."}
+
+
+def get_tnrs_response(source: str):
+    """Returns a TNRS response reporting the provided taxonomy version."""
+    return {
+        "results": [
+            {
+                "name": "homo sapiens",
+                "matches": [{"taxon": {"ott_id": 10, "source": source}}],
+            }
+        ]
+    }
+
+
+def test_response_cache_stores_the_responses(tmp_path):
+    """Test that the cached responses survive the cache, until a new taxonomy version."""
+    path = str(tmp_path / "responses.sqlite")
+    ResponseCache(path).put(
+        "tnrs_match", {"taxon_name": "homo sapiens"}, get_tnrs_response("ott3.5")
+    )
+
+    response_cache = ResponseCache(path)
+    assert response_cache.get(
+        "tnrs_match", {"taxon_name": "homo sapiens"}
+    ) == get_tnrs_response("ott3.5")
+    assert response_cache.get("tnrs_match", {"taxon_name": "pan troglodytes"}) is None
+
+    response_cache.put("taxon_info", {"ott_id": 12}, {"ott_id": 12, "source": "ott3.6"})
+    assert response_cache.get("tnrs_match", {"taxon_name": "homo sapiens"}) is None
+    assert response_cache.evict() == 1
+
+
+def test_response_cache_evicts_the_expired_and_least_recently_used(tmp_path):
+    """Test that the expired responses, and the least recently used ones above the bound, are evicted."""
+    response_cache = ResponseCache(
+        str(tmp_path / "responses.sqlite"), maximal_number_of_entries=2
+    )
+    for ott_id in range(3):
+        response_cache.put("taxon_info", {"ott_id": ott_id}, {"ott_id": ott_id})
+    response_cache.get("taxon_info", {"ott_id": 0})
+
+    assert response_cache.evict() == 1
+    assert response_cache.get("taxon_info", {"ott_id": 1}) is None
+    assert response_cache.get("taxon_info", {"ott_id": 0}) is not None
+
+    response_cache.time_to_live = -datetime.timedelta(seconds=1)
+    response_cache.put("taxon_info", {"ott_id": 3}, {"ott_id": 3})
+    assert response_cache.get("taxon_info", {"ott_id": 3}) is None
+
+
+def test_degraded_lineages_are_retried_and_not_cached(
+    session, make_enricher, open_tree, add_taxa
+):
+    """Test that an error message of the taxon_info endpoint is retried, and never cached."""
+    add_taxa("Homo sapiens")
+    enricher = make_enricher()
+    open_tree.errors["taxon_info"] = DEGRADED
+
+    assert not enricher.enrich_all()
+    task = session.query(Task).one()
+    assert task.status == "PENDING"
+    assert enricher._response_cache.get("taxon_info", {"ott_id": 10}) is None
+
+    # Once the service recovers, the taxon is enriched at its next attempt.
+    del open_tree.errors["taxon_info"]
+    task.next_attempt_at = datetime.datetime.now()
+    session.commit()
+    assert enricher.enrich_all()
+    assert session.query(OpenTreeOfLifeEntry).one().ott_id == 10
+    assert enricher._response_cache.get("taxon_info", {"ott_id": 10})["ott_id"] == 10
+
+
+def test_degraded_name_resolution_is_retried_and_not_cached(
+    session, make_enricher, open_tree, add_taxa
+):
+    """Test that an error message of the tnrs_match endpoint is retried, and never cached."""
+    add_taxa("Homo sapiens")
+    enricher = make_enricher()
+    open_tree.errors["tnrs_match"] = DEGRADED
+
+    assert not enricher.enrich_all()
+
+    # The batch resolution failed, and so did the resolution of the single name.
+    assert open_tree.calls == ["tnrs_match", "tnrs_match"]
+    assert session.query(Task).one().status == "PENDING"
+    assert (
+        enricher._response_cache.get("tnrs_match", {"taxon_name": "homo sapiens"})
+        is None
+    )
+
+
+def test_warm_restart_makes_no_remote_call(session, make_enricher, open_tree, add_taxa):
+    """Test that the requests issued again after a restart are answered from the cache."""
+    add_taxa("Homo sapiens")
+    assert make_enricher().enrich_all()
+    assert open_tree.calls == ["tnrs_match", "taxon_info"]
+
+    # The same name is enriched again, without its cached result.
+    session.query(EnrichmentCacheEntry).delete()
+    session.commit()
+    add_taxa("Homo sapiens")
+    assert make_enricher().enrich_all()
+
+    assert open_tree.calls == ["tnrs_match", "taxon_info"]
+    assert session.query(OpenTreeOfLifeEntry).count() == 2
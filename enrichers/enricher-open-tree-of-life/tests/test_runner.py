@@ -0,0 +1,43 @@
+"""Test the loading of the OTL enricher by the runner hosting several enrichers."""
+from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import EntryPoint
+from threading import Event
+from enrichers import runner
+from enrichers.runner import ENTRY_POINT_GROUP, EnricherRunner, load_enricher_class
+from otl_enricher import OTLEnricher
+from otl_enricher.models import OpenTreeOfLifeEntry
+
+
+def test_the_enricher_is_hosted_by_the_runner(
+    session, monkeypatch, make_enricher, offline_taxonomy_path, add_taxa
+):
+    """Test that the entry point declared in the setup.py loads the enricher, and runs its rounds."""
+    monkeypatch.setattr(
+        runner,
+        "_get_registered_enrichers",
+        lambda: {
+            "otl": EntryPoint(
+                name="otl", value="otl_enricher:OTLEnricher", group=ENTRY_POINT_GROUP
+            )
+        },
+    )
+    assert load_enricher_class("otl") is OTLEnricher
+    assert load_enricher_class("otl_enricher:OTLEnricher") is OTLEnricher
+
+    add_taxa("Homo sapiens", "Pan troglodytes")
+    enricher = make_enricher(offline_taxonomy_path)
+    stop_requested = Event()
+    run_round = enricher.run_round
+
+    def run_single_round() -> bool:
+        some_success = run_round()
+        stop_requested.set()
+        return some_success
+
+    enricher.run_round = run_single_round
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        EnricherRunner([enricher], number_of_workers=1)._schedule_rounds(
+            pool, stop_requested
+        )
+
+    assert session.query(OpenTreeOfLifeEntry).count() == 2
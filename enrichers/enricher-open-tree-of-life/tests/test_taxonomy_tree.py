@@ -0,0 +1,106 @@
+"""Test the queries on the tree of the stored nodes of the Open Tree Taxonomy."""
+import pytest
+from sqlalchemy import event
+from alchemy_wrapper import engine
+from otl_enricher import TaxonomyTree
+from otl_enricher.lineage_cache import LineageCache
+from otl_enricher.models import OpenTreeOfLifeNode
+
+
+@pytest.fixture
+def taxonomy_tree(session, make_enricher, offline_taxonomy_path, add_taxa):
+    """Returns the tree of the nodes stored by enriching a few taxa offline."""
+    taxa = add_taxa("Homo sapiens", "Pan troglodytes")
+    assert make_enricher(offline_taxonomy_path).enrich_all()
+    # A stored clade within which no taxon was enriched.
+    session.add(
+        OpenTreeOfLifeNode(
+            ott_id=14,
+            name="rodentia",
+            unique_name="rodentia",
+            rank="order",
+            parent_ott_id=5,
+            path="/1/2/3/4/5/14/",
+        )
+    )
+    session.commit()
+    return TaxonomyTree(), taxa
+
+
+def test_nodes_are_stored_with_their_paths(session, taxonomy_tree):
+    """Test that the nodes of the enriched taxa are stored with their materialized paths."""
+    assert session.get(OpenTreeOfLifeNode, 12).path == "/1/2/3/4/5/6/7/8/11/12/"
+    assert session.get(OpenTreeOfLifeNode, 1).path == "/1/"
+
+
+def test_subtree_queries(taxonomy_tree):
+    """Test the membership, the nodes and the taxa of the subtrees."""
+    tree, (homo_sapiens, pan_troglodytes) = taxonomy_tree
+
+    assert tree.is_in_subtree(10, 8)
+    assert tree.is_in_subtree(10, 10)
+    assert not tree.is_in_subtree(10, 11)
+    assert not tree.is_in_subtree(999, 1)
+
+    assert sorted(tree.get_subtree_ott_ids(8)) == [8, 9, 10, 11, 12]
+    assert tree.get_subtree_ott_ids(999) == []
+    assert sorted(tree.get_taxon_ids_in_subtree(7)) == sorted(
+        [homo_sapiens.id, pan_troglodytes.id]
+    )
+    assert tree.get_taxon_ids_in_subtree(14) == []
+
+
+def test_clade_counts(taxonomy_tree):
+    """Test that the taxa enriched within each stored clade are counted, on literal prefixes."""
+    tree, _ = taxonomy_tree
+    statements = []
+
+    def record_statement(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record_statement)
+    try:
+        clade_counts = tree.get_clade_counts([1, 5, 8, 9, 12, 14, 999])
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
+
+    assert clade_counts == {1: 2, 5: 2, 8: 2, 9: 1, 12: 1, 14: 0}
+    # The prefixes are never concatenated to the paths of the clades.
+    assert not any("||" in statement for statement in statements)
+    assert tree.get_clade_counts([]) == {}
+
+
+def test_lowest_common_ancestor(taxonomy_tree):
+    """Test that the lowest common ancestor is the deepest node shared by the paths."""
+    tree, _ = taxonomy_tree
+
+    assert tree.get_lowest_common_ancestor([10, 12]) == 8
+    assert tree.get_lowest_common_ancestor([10, 9, 10]) == 9
+    assert tree.get_lowest_common_ancestor([10, 14]) == 5
+    assert tree.get_lowest_common_ancestor([10, 999]) is None
+    assert tree.get_lowest_common_ancestor([]) is None
+
+
+def test_moved_subtrees_are_rewritten(session, offline_taxonomy):
+    """Test that the stored descendants of a node moved by a new version follow it."""
+    lineage_cache = LineageCache()
+    lineage_cache.store(
+        [offline_taxonomy.get_taxon_info(10), offline_taxonomy.get_taxon_info(13)]
+    )
+    tree = TaxonomyTree()
+    assert tree.is_in_subtree(13, 8)
+
+    # In the new version, the genus homo is not part of a tribe anymore.
+    moved = offline_taxonomy.get_taxon_info(10)
+    moved["lineage"] = [
+        ancestor for ancestor in moved["lineage"] if ancestor["ott_id"] != 8
+    ]
+    lineage_cache.store([moved], overwrite=True)
+
+    session.expire_all()
+    assert session.get(OpenTreeOfLifeNode, 10).path == "/1/2/3/4/5/6/7/9/10/"
+    # The environmental sample of the genus was not part of the new lineages.
+    assert session.get(OpenTreeOfLifeNode, 13).path == "/1/2/3/4/5/6/7/9/13/"
+    assert not tree.is_in_subtree(13, 8)
+    assert tree.is_in_subtree(13, 7)
+    assert sorted(tree.get_subtree_ott_ids(9)) == [9, 10, 13]
@@ -2,7 +2,23 @@ from alchemy_wrapper.models.base import Base
 from alchemy_wrapper.database import engine
 from .taxon_enricher import TaxonEnricher
 from .enricher import Enricher
+from .retry_policy import RetryPolicy
+from .scheduler import FairScheduler
+from .result_cache import ResultCache
+from .result_writer import BufferedResultWriter
+from .circuit_breaker import CircuitBreaker
+from .runner import EnricherRunner, load_enricher_class
 
 Base.metadata.create_all(bind=engine)
 
-__all__ = ["Enricher", "TaxonEnricher"]
+__all__ = [
+    "Enricher",
+    "TaxonEnricher",
+    "RetryPolicy",
+    "FairScheduler",
+    "ResultCache",
+    "BufferedResultWriter",
+    "CircuitBreaker",
+    "EnricherRunner",
+    "load_enricher_class",
+]
@@ -0,0 +1,5 @@
+"""Run several enrichers in a single process, as in python -m enrichers."""
+from .runner import main
+
+if __name__ == "__main__":
+    main()
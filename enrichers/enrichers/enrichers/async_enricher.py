@@ -0,0 +1,469 @@
+"""Submodule providing the abstract AsyncEnricher class, for enrichers bound by remote calls.
+
+Implementative details
+----------------------
+Enrichers querying remote repositories, such as the Open Tree of Life one, spend almost
+all of their time waiting for the responses. Instead of dedicating a worker thread to each
+in-flight call, the AsyncEnricher enriches the candidates of each batch concurrently, as
+coroutines of an event loop owned by the enricher, and a semaphore bounds the number of
+enrichments in flight. The _enrich method of its subclasses is a coroutine, which should
+query the remote repository with an asyncio HTTP client, awaiting each call through the
+_call_remote_async method, which guards it with the circuit breaker of the repository.
+
+The database is accessed through the asyncio extension of SQLAlchemy, with an engine
+derived from the one of the alchemy wrapper by replacing its driver with an asyncio one,
+such as asyncpg. The candidates are streamed through an async discovery session, and the
+subclasses store their results through the sessions returned by async_session.
+
+The bookkeeping of each item, i.e. claiming its task, reading and writing the result cache,
+recording its outcome and flushing the buffered results, reuses the logic of the Enricher
+class on the session of the enricher, and so does the coroutine updating the heartbeats of
+all the in-flight tasks. These are blocking queries, and they are therefore executed in a
+dedicated bookkeeping thread, awaited by the coroutines, so that the event loop keeps serving
+the remote calls in the meantime. As the bookkeeping thread executes a single function at a
+time, the session of the enricher is never used concurrently, and it is only recycled between
+two batches, once all of their items are completed. The tasks handed to the coroutines are
+detached from the session, and each outcome is recorded on the task loaded again by id. As
+the coroutines share a thread, the resources consumed by each task are not accounted.
+
+The asyncio dependencies are optional, and are installed with the async extra:
+
+    pip install enrichers[async]
+
+which installs the asyncpg driver for Postgres, and the aiosqlite one for SQLite.
+
+Taxon enrichers may combine this class with the TaxonEnricher one:
+
+    class MyEnricher(AsyncEnricher, TaxonEnricher): ...
+"""
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Query
+from alchemy_wrapper.database import engine
+from alchemy_wrapper.models import Task
+from .enricher import Enricher
+from .shutdown import ShutdownRequested
+
+# The asyncio drivers replacing the synchronous ones of the alchemy wrapper engine.
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(url: URL) -> URL:
+    """Returns the provided database URL, using the asyncio driver of its backend.
+
+    Parameters
+    ----------
+    url
+        URL of the database, as used by the synchronous engine.
+
+    Raises
+    ------
+    ValueError
+        If no asyncio driver is known for the backend of the database.
+    """
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(
+            f"No asyncio driver is known for the {backend} database backend, "
+            f"the supported backends are {sorted(ASYNC_DRIVERS)}."
+        )
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+class AsyncEnricher(Enricher):
+    """Abstract Enricher class enriching several enrichables concurrently with asyncio."""
+
+    def __init__(self, verbose: bool = True) -> None:
+        """Initialize the enricher object."""
+        super().__init__(verbose=verbose)
+        self._in_flight_task_ids: Set[int] = set()
+        # The single thread executing the bookkeeping queries on the session.
+        self._bookkeeper = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"{self.name()} bookkeeping"
+        )
+        # The event loop, and the engine bound to it, are created upon the first round.
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_engine: Optional[AsyncEngine] = None
+        self._async_sessionmaker: Optional[async_sessionmaker] = None
+
+    def _get_maximal_concurrency(self) -> int:
+        """Returns the maximal number of enrichments in flight at once."""
+        return 200
+
+    def _get_discovery_chunk_size(self) -> int:
+        """Returns the number of candidates fetched at once, and enriched concurrently.
+
+        Implementative details
+        ----------------------
+        The items of a batch are enriched concurrently, and the next batch is only
+        started once all of them are completed, so the batches are larger than the
+        maximal concurrency in order to keep the semaphore saturated.
+        """
+        return 2 * self._get_maximal_concurrency()
+
+    def async_session(self) -> AsyncSession:
+        """Returns a new async session, to be used as an async context manager."""
+        if self._async_sessionmaker is None:
+            self._async_engine = create_async_engine(
+                get_async_database_url(engine.url),
+                pool_size=self._get_async_pool_size(),
+            )
+            self._async_sessionmaker = async_sessionmaker(
+                self._async_engine, expire_on_commit=False
+            )
+        return self._async_sessionmaker()
+
+    def _get_async_pool_size(self) -> int:
+        """Returns the number of connections of the async engine."""
+        return 10
+
+    async def _run_bookkeeping(self, function: Callable[..., Any], *args) -> Any:
+        """Runs the provided bookkeeping function in the bookkeeping thread, and returns its result.
+
+        Parameters
+        ----------
+        function
+            blocking function using the session of the enricher.
+        args
+            arguments of the function.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self._bookkeeper, function, *args
+        )
+
+    def _wait_for_bookkeeping(self, function: Callable[..., Any], *args) -> Any:
+        """Runs the provided bookkeeping function in the bookkeeping thread, outside of the event loop."""
+        return self._bookkeeper.submit(function, *args).result()
+
+    def _claim_and_start_task(self, enrichable) -> Optional[Task]:
+        """Claims and starts the task of the provided enrichable, returning it detached.
+
+        Implementative details
+        ----------------------
+        The task is detached from the session of the enricher, so that reading its
+        attributes from the event loop never emits a query on that session.
+        """
+        # The stop may have been requested while waiting for the bookkeeping thread.
+        if self.is_stopping():
+            return None
+        task = self._claim_task(enrichable)
+        if task is None:
+            return None
+        task.start(session=self._session)
+        self._get_task_type_name(task)
+        self._session.refresh(task)
+        self._session.expunge(task)
+        return task
+
+    def _complete_task(self, task_id: int):
+        """Completes the provided task, whose result and success are recorded with the batch."""
+        self._result_writer.complete(task_id)
+
+    def _fail_task(self, task_id: int, reason_for_failure: Exception):
+        """Defers, retries or fails the provided task, whose enrichment raised an exception."""
+        self._handle_failure(self._session.get(Task, task_id), reason_for_failure)
+
+    def _release_task_after_shutdown(self, task_id: int):
+        """Releases the provided task, whose enrichment was interrupted by a shutdown."""
+        self._release_interrupted_task(self._session.get(Task, task_id))
+
+    def _beat_tasks(self, task_ids: List[int]):
+        """Updates the heartbeats of the provided tasks."""
+        Task.record_heartbeats(task_ids, session=self._session)
+
+    def _select_batch(self, batch: List[Any]) -> List[Any]:
+        """Returns the eligible enrichables of the batch, after refreshing the admission budget."""
+        self._refresh_admission_budget()
+        return self._select_enrichables(batch)
+
+    def _complete_batch(self, number_of_items: int):
+        """Flushes the buffered results if needed, and releases the objects of the batch."""
+        if self._result_writer.should_flush():
+            self._flush_results()
+        self._complete_item(number_of_items=number_of_items)
+
+    async def _prepare_batch(self, enrichables: List[Any]):
+        """Prepares the enrichment of a batch of eligible enrichables.
+
+        Parameters
+        ----------
+        enrichables
+            batch of enrichables about to be enriched.
+        """
+
+    async def _enrich(self, enrichable, task: Task) -> Any:
+        """Enrich the metadata of a enrichable class.
+
+        Parameters
+        ----------
+        enrichable
+            enrichable class to enrich.
+
+        Returns
+        -------
+        Whether the enrichment was successful or not. Enrichers using the result
+        cache return instead the JSON-serializable result of a successful enrichment.
+        """
+        raise NotImplementedError(
+            "The enrich method of the AsyncEnricher class must be implemented by a subclass. "
+            f"This was not done for the {self.__class__.__name__} class. "
+            f"This class should retrieve the metadata relative to the repository {self.repository()}."
+        )
+
+    async def _stream_candidates(self, query: Query) -> AsyncIterator[Any]:
+        """Yields the elements selected by the query, up to the round budget.
+
+        Parameters
+        ----------
+        query
+            query selecting the elements to enrich, in the order in which they
+            should be enriched.
+        """
+        async with self.async_session() as discovery_session:
+            candidates = await discovery_session.stream_scalars(
+                query.limit(self._get_round_budget()).statement,
+                execution_options={"yield_per": self._get_discovery_chunk_size()},
+            )
+            async for candidate in candidates:
+                yield candidate
+
+    def _get_new_elements_to_enrich(self) -> AsyncIterator[Any]:
+        """Yields the elements to enrich in this round."""
+        raise NotImplementedError(
+            "The _get_new_elements_to_enrich method of the AsyncEnricher class must be implemented by a subclass. "
+            f"This was not done for the {self.__class__.__name__} class."
+        )
+
+    async def _call_remote_async(
+        self, function: Callable[..., Awaitable[Any]], *args
+    ) -> Any:
+        """Awaits a call to the remote repository, unless its circuit is open.
+
+        Parameters
+        ----------
+        function
+            coroutine function querying the remote repository.
+        args
+            arguments of the function.
+
+        Raises
+        ------
+        CircuitOpenError
+            If the circuit of the repository is open, in which case the function is not called.
+        """
+        self._acquire_circuit()
+        try:
+            result = await function(*args)
+        except BaseException as exception:
+            self._record_remote_failure(exception)
+            raise
+        self._circuit_breaker.record_success()
+        return result
+
+    async def _enrich_through_cache(self, enrichable, task: Task) -> Any:
+        """Enrich the metadata of a enrichable class, using the cached result if available."""
+        cache_input = self._get_cache_input(enrichable)
+        if cache_input is None:
+            return await self._enrich(enrichable, task)
+
+        result = await self._run_bookkeeping(
+            lambda: self.result_cache.get(
+                enricher=self.name(), version=self.version(), cache_input=cache_input
+            )
+        )
+        if result is not None:
+            self._logger.info(f"Enriching task {task.id} from a cached result.")
+            applied = await self._run_bookkeeping(
+                self._enrich_from_cache, enrichable, task, result
+            )
+            if applied is not None:
+                return applied
+            # The cached result cannot be applied anymore, so it is
+            # recomputed as if it were missing, and replaced.
+            self._logger.info(
+                f"The cached result of task {task.id} is stale, enriching it again."
+            )
+
+        result = await self._enrich(enrichable, task)
+        if result:
+            await self._run_bookkeeping(
+                lambda: self.result_cache.put(
+                    enricher=self.name(),
+                    version=self.version(),
+                    cache_input=cache_input,
+                    result=result,
+                )
+            )
+        return result
+
+    async def _enrich_eligible_async(
+        self, enrichable, semaphore: asyncio.Semaphore
+    ) -> bool:
+        """Enrich the metadata of an enrichable class whose eligibility was checked.
+
+        Parameters
+        ----------
+        enrichable
+            enrichable class to enrich.
+        semaphore
+            semaphore bounding the number of enrichments in flight.
+        """
+        async with semaphore:
+            # The stop may have been requested while this
+            # enrichment was waiting for the semaphore.
+            if self.is_stopping():
+                return False
+
+            task = await self._run_bookkeeping(self._claim_and_start_task, enrichable)
+            if task is None:
+                return False
+
+            task_id = task.id
+            self._in_flight_task_ids.add(task_id)
+            try:
+                with self._metrics.time_enrichment(self._get_task_type_name(task)):
+                    success = bool(await self._enrich_through_cache(enrichable, task))
+                await self._run_bookkeeping(self._complete_task, task_id)
+            except ShutdownRequested:
+                self._result_writer.discard(task_id)
+                await self._run_bookkeeping(self._release_task_after_shutdown, task_id)
+                raise
+            except Exception as reason_for_failure:
+                success = False
+                self._result_writer.discard(task_id)
+                await self._run_bookkeeping(
+                    self._fail_task, task_id, reason_for_failure
+                )
+            finally:
+                self._in_flight_task_ids.discard(task_id)
+
+            return success
+
+    async def _beat_in_flight_tasks(self):
+        """Update the heartbeats of all the in-flight tasks, until cancelled.
+
+        Implementative details
+        ----------------------
+        The heartbeats are updated through the session of the enricher, in the
+        bookkeeping thread, as all the other writes to the tasks table, so that a
+        write of the bookkeeping never waits for the row lock held by an async
+        heartbeat transaction.
+        """
+        while True:
+            await asyncio.sleep(self._get_heartbeat_interval())
+            if not self._in_flight_task_ids:
+                continue
+            try:
+                await self._run_bookkeeping(
+                    self._beat_tasks, list(self._in_flight_task_ids)
+                )
+            except Exception:
+                # A failed heartbeat must never interrupt the enrichment:
+                # at worst, the lease expires and the tasks are retried.
+                self._logger.exception(
+                    "Unable to update the heartbeats of the in-flight tasks."
+                )
+
+    async def _enrich_batch(
+        self, batch: List[Any], semaphore: asyncio.Semaphore
+    ) -> bool:
+        """Enrich concurrently the eligible enrichables of the batch.
+
+        Parameters
+        ----------
+        batch
+            batch of candidate enrichables.
+        semaphore
+            semaphore bounding the number of enrichments in flight.
+        """
+        eligible = await self._run_bookkeeping(self._select_batch, batch)
+        await self._prepare_batch(eligible)
+        successes = await asyncio.gather(
+            *(
+                self._enrich_eligible_async(enrichable, semaphore)
+                for enrichable in eligible
+            )
+        )
+        await self._run_bookkeeping(self._complete_batch, len(eligible))
+        return any(successes)
+
+    async def _enrich_all_async(self) -> bool:
+        """Enrich the metadata of all the enrichable classes, one batch at a time."""
+        some_success = False
+        # The semaphore is created within the event loop it is used in.
+        semaphore = asyncio.Semaphore(self._get_maximal_concurrency())
+        candidates = self._get_new_elements_to_enrich()
+        heartbeat = asyncio.ensure_future(self._beat_in_flight_tasks())
+        try:
+            batch = []
+            async for candidate in candidates:
+                batch.append(candidate)
+                if len(batch) == self._get_discovery_chunk_size():
+                    some_success |= await self._enrich_batch(batch, semaphore)
+                    batch = []
+                # No new work is claimed once a shutdown is requested.
+                if self.is_stopping():
+                    return some_success
+            if batch:
+                some_success |= await self._enrich_batch(batch, semaphore)
+        finally:
+            self._admission_budget = None
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+            await candidates.aclose()
+            await self._run_bookkeeping(self._flush_results)
+        return some_success
+
+    def enrich_all(self) -> bool:
+        """Enrich the metadata of all the enrichable classes."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        try:
+            return self._loop.run_until_complete(self._enrich_all_async())
+        except ShutdownRequested:
+            # The shutdown may have interrupted any of the in-flight
+            # enrichments, so we release all of them.
+            self._wait_for_bookkeeping(self._session.rollback)
+            self.release_in_flight_task()
+            raise
+
+    def enrich(self, enrichable) -> bool:
+        """Enrich the metadata of a enrichable class.
+
+        Parameters
+        ----------
+        enrichable
+            enrichable class to enrich.
+        """
+        if not self._wait_for_bookkeeping(self._select_enrichables, [enrichable]):
+            raise ValueError(
+                f"The enricher {self.name()} cannot "
+                f"enrich the {enrichable.__class__.__name__} class."
+            )
+
+        async def _enrich_alone() -> bool:
+            return await self._enrich_eligible_async(enrichable, asyncio.Semaphore(1))
+
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        try:
+            return self._loop.run_until_complete(_enrich_alone())
+        finally:
+            self._admission_budget = None
+            self._wait_for_bookkeeping(self._flush_results)
+
+    def release_in_flight_task(self):
+        """Releases the claims of all the in-flight tasks, so another replica can resume them."""
+        for task_id in list(self._in_flight_task_ids):
+            self._release_task(task_id)
@@ -0,0 +1,17 @@
+"""Submodule providing the offline benchmark harness of the enrichers."""
+from .stand_in_server import StandInServer
+from .synthetic import (
+    generate_taxon_names,
+    create_synthetic_taxa,
+    create_synthetic_payloads,
+)
+from .driver import run_benchmark, stub_dirty_pipeline
+
+__all__ = [
+    "StandInServer",
+    "generate_taxon_names",
+    "create_synthetic_taxa",
+    "create_synthetic_payloads",
+    "run_benchmark",
+    "stub_dirty_pipeline",
+]
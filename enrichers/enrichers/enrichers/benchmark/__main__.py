@@ -0,0 +1,5 @@
+"""Run the enrichers benchmark, as in python -m enrichers.benchmark."""
+from .driver import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Submodule providing the driver of the enrichers benchmark.
+
+Implementative details
+----------------------
+The driver populates the database with synthetic work items and runs rounds of the
+enricher until a round does not process any new item, measuring:
+
+* the throughput, in items enriched per second of wall time;
+* the median and 99th percentile of the latency of the enrichment of each item,
+  including the creation and the bookkeeping of its task;
+* the number of database queries per item, counted on the shared database engine,
+  which includes the queries of the discovery, of the heartbeats and of the cache.
+
+The Open Tree of Life enricher is run against the local stand-in server, so that the
+benchmark never hits the real APIs. The dirty pipeline enricher is run with its steps
+stubbed by a sleep of configurable duration and without downloading its databases,
+so that the overhead of the enricher itself is measured.
+
+The benchmark is meant to be run within the container of the enricher, against a
+development database, for instance as:
+
+    python -m enrichers.benchmark otl otl --taxa 500 --latency 0.05
+"""
+from typing import Any, Dict, List, Optional, Type
+from contextlib import contextmanager
+from time import perf_counter
+import argparse
+import json
+import math
+import os
+from sqlalchemy import event
+from alchemy_wrapper import Session
+from alchemy_wrapper.database import engine
+from ..enricher import Enricher
+from ..runner import load_enricher_class
+from .stand_in_server import StandInServer
+from .synthetic import create_synthetic_payloads, create_synthetic_taxa
+
+
+def get_percentile(values: List[float], percentile: float) -> float:
+    """Returns the nearest-rank percentile of the provided values.
+
+    Parameters
+    ----------
+    values
+        values whose percentile is computed.
+    percentile
+        percentile to compute, between 0 and 100.
+    """
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = math.ceil(percentile / 100 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+@contextmanager
+def count_queries():
+    """Context manager yielding a list whose length is the number of executed queries."""
+    queries = []
+
+    def _on_query(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _on_query)
+    try:
+        yield queries
+    finally:
+        event.remove(engine, "before_cursor_execute", _on_query)
+
+
+def stub_dirty_pipeline(
+    enricher_class: Type[Enricher], step_duration: float
+) -> Type[Enricher]:
+    """Returns the dirty pipeline enricher class with its steps and resources stubbed.
+
+    Parameters
+    ----------
+    enricher_class
+        dirty pipeline enricher class to stub.
+    step_duration
+        number of seconds each step of the pipeline sleeps for.
+    """
+
+    class StubbedDirtyPipelineEnricher(enricher_class):
+        """Dirty pipeline enricher whose steps only sleep."""
+
+        def _prepare_resources(self):
+            """The stubbed steps do not require any database."""
+
+        def _get_step_commands(self, extraction_path: str) -> List[str]:
+            return [
+                f"sleep {step_duration}"
+                for _ in super()._get_step_commands(extraction_path)
+            ]
+
+    return StubbedDirtyPipelineEnricher
+
+
+def run_benchmark(enricher: Enricher) -> Dict[str, float]:
+    """Returns the measurements of the enrichment of the pending items by the enricher.
+
+    Parameters
+    ----------
+    enricher
+        enricher to benchmark.
+    """
+    latencies = []
+    enrich_eligible = enricher._enrich_eligible
+
+    def _timed_enrich_eligible(enrichable: Any) -> bool:
+        start = perf_counter()
+        try:
+            return enrich_eligible(enrichable)
+        finally:
+            latencies.append(perf_counter() - start)
+
+    # We time each item by wrapping the method of this specific instance.
+    enricher._enrich_eligible = _timed_enrich_eligible
+
+    with count_queries() as queries:
+        start = perf_counter()
+        while True:
+            number_of_items = len(latencies)
+            enricher.enrich_all()
+            if len(latencies) == number_of_items:
+                break
+        wall_time = perf_counter() - start
+
+    number_of_items = len(latencies)
+    return {
+        "items": number_of_items,
+        "wall_time_seconds": wall_time,
+        "items_per_second": number_of_items / wall_time if wall_time else math.nan,
+        "p50_latency_seconds": get_percentile(latencies, 50),
+        "p99_latency_seconds": get_percentile(latencies, 99),
+        "queries_per_item": (
+            len(queries) / number_of_items if number_of_items else math.nan
+        ),
+    }
+
+
+def main(arguments: Optional[List[str]] = None):
+    """Run the benchmark of the enricher provided on the command line."""
+    parser = argparse.ArgumentParser(
+        prog="python -m enrichers.benchmark",
+        description="Measure the throughput of an enricher on synthetic work items.",
+    )
+    parser.add_argument(
+        "--users", type=int, default=10, help="number of synthetic users."
+    )
+    parser.add_argument(
+        "--output", default=None, help="path of the JSON file to store the report in."
+    )
+    subparsers = parser.add_subparsers(dest="workload", required=True)
+
+    otl_parser = subparsers.add_parser(
+        "otl", help="benchmark the Open Tree of Life enricher on synthetic taxa."
+    )
+    otl_parser.add_argument(
+        "enricher", help="entry point name or module:Class path of the enricher."
+    )
+    otl_parser.add_argument("--taxa", type=int, default=100)
+    otl_parser.add_argument("--duplicate-fraction", type=float, default=0.1)
+    otl_parser.add_argument("--latency", type=float, default=0.05)
+    otl_parser.add_argument("--error-rate", type=float, default=0.0)
+    otl_parser.add_argument(
+        "--recordings", default=None, help="JSON file of recorded responses."
+    )
+
+    dirty_pipeline_parser = subparsers.add_parser(
+        "dirty-pipeline",
+        help="benchmark the dirty pipeline enricher, with stubbed steps, on synthetic payloads.",
+    )
+    dirty_pipeline_parser.add_argument(
+        "enricher", help="entry point name or module:Class path of the enricher."
+    )
+    dirty_pipeline_parser.add_argument("--payloads", type=int, default=10)
+    dirty_pipeline_parser.add_argument("--step-duration", type=float, default=0.1)
+
+    parsed = parser.parse_args(arguments)
+
+    session = Session()
+    try:
+        if parsed.workload == "otl":
+            create_synthetic_taxa(
+                session,
+                number_of_taxa=parsed.taxa,
+                number_of_users=parsed.users,
+                duplicate_fraction=parsed.duplicate_fraction,
+            )
+        else:
+            create_synthetic_payloads(
+                session,
+                number_of_payloads=parsed.payloads,
+                number_of_users=parsed.users,
+            )
+    finally:
+        session.close()
+
+    if parsed.workload == "otl":
+        server_kwargs = dict(latency=parsed.latency, error_rate=parsed.error_rate)
+        with (
+            StandInServer.from_file(parsed.recordings, **server_kwargs)
+            if parsed.recordings
+            else StandInServer(**server_kwargs)
+        ) as server:
+            # The opentree client reads the endpoint when it is first imported,
+            # which happens when the enricher class is loaded.
+            os.environ["OVERRIDE_OT_PRODUCTION_API_ENDPOINT"] = server.address
+            # Responses cached on disk by a previous run would hide the
+            # remote calls, so the response cache is disabled by default.
+            os.environ.setdefault("OTL_RESPONSE_CACHE", "")
+            report = run_benchmark(load_enricher_class(parsed.enricher)())
+    else:
+        report = run_benchmark(
+            stub_dirty_pipeline(
+                load_enricher_class(parsed.enricher), parsed.step_duration
+            )()
+        )
+
+    for measurement, value in report.items():
+        print(f"{measurement:>22}: {value:.4g}")
+
+    if parsed.output is not None:
+        with open(parsed.output, "w", encoding="utf8") as output:
+            json.dump(report, output, indent=4)
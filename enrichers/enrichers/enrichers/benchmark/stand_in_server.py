@@ -0,0 +1,247 @@
+"""Submodule providing a local stand-in for the Open Tree of Life web services.
+
+Implementative details
+----------------------
+The stand-in server answers the tnrs/match_names and taxonomy/taxon_info endpoints of
+the Open Tree of Life v3 APIs, which are the ones called by the Open Tree of Life
+enricher. Responses are replayed from recordings, i.e. a JSON document mapping each
+endpoint to the recorded responses, keyed by the lowercase taxon name for the
+tnrs_match endpoint and by the OTT id for the taxon_info endpoint. The responses of
+the tnrs_match requests resolving several names are merged from the ones of each name:
+
+    {"tnrs_match": {"quercus robur": {...}}, "taxon_info": {"791115": {...}}}
+
+Names and ids missing from the recordings are answered with synthetic responses,
+derived deterministically from the name, so that synthetic taxa can be enriched.
+
+Each request is delayed by the configured latency and fails with an HTTP 503 with
+the configured probability, as the remote services do when they are degraded.
+
+The opentree client is pointed at the stand-in server by setting the environment
+variable OVERRIDE_OT_PRODUCTION_API_ENDPOINT to host:port before it is imported.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from time import sleep
+import hashlib
+import json
+import random
+
+LINEAGE_RANKS = (
+    "genus",
+    "tribe",
+    "family",
+    "order",
+    "class",
+    "phylum",
+    "kingdom",
+    "domain",
+)
+
+
+def get_synthetic_ott_id(name: str) -> int:
+    """Returns a deterministic synthetic OTT id for the provided taxon name."""
+    digest = hashlib.sha256(name.lower().encode("utf8")).hexdigest()
+    return 1_000_000 + int(digest[:12], 16) % 9_000_000
+
+
+def get_synthetic_tnrs_match(name: str) -> Dict[str, Any]:
+    """Returns a synthetic response of the tnrs_match endpoint for the provided name."""
+    ott_id = get_synthetic_ott_id(name)
+    return {
+        "context": "All life",
+        "governing_code": "undefined",
+        "includes_approximate_matches": False,
+        "includes_deprecated_taxa": False,
+        "includes_suppressed_names": False,
+        "matched_names": [name],
+        "unambiguous_names": [name],
+        "unmatched_names": [],
+        "results": [
+            {
+                "name": name,
+                "matches": [
+                    {
+                        "is_approximate_match": False,
+                        "is_synonym": False,
+                        "matched_name": name,
+                        "nomenclature_code": "undefined",
+                        "score": 1.0,
+                        "search_string": name.lower(),
+                        "taxon": {
+                            "flags": [],
+                            "is_suppressed": False,
+                            "is_suppressed_from_synth": False,
+                            "name": name,
+                            "ott_id": ott_id,
+                            "rank": "species",
+                            "source": "ott3.5",
+                            "synonyms": [],
+                            "tax_sources": [],
+                            "unique_name": name,
+                        },
+                    }
+                ],
+            }
+        ],
+    }
+
+
+def merge_tnrs_matches(responses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Returns the response of the tnrs_match endpoint for several names.
+
+    Parameters
+    ----------
+    responses
+        responses of the tnrs_match endpoint for each of the names.
+    """
+    merged = dict(responses[0])
+    for key in ("matched_names", "unambiguous_names", "unmatched_names", "results"):
+        merged[key] = [value for response in responses for value in response[key]]
+    return merged
+
+
+def get_synthetic_taxon_info(ott_id: int) -> Dict[str, Any]:
+    """Returns a synthetic response of the taxon_info endpoint for the provided id."""
+    lineage = []
+    for depth, rank in enumerate(LINEAGE_RANKS, start=1):
+        lineage.append(
+            {
+                "flags": [],
+                "is_suppressed": False,
+                "name": f"{rank.capitalize()}{ott_id % (10 ** (9 - depth))}",
+                "ott_id": ott_id - depth,
+                "rank": rank,
+                "source": "ott3.5",
+                "synonyms": [],
+                "tax_sources": [],
+                "unique_name": f"{rank.capitalize()}{ott_id % (10 ** (9 - depth))}",
+            }
+        )
+    return {
+        "flags": [],
+        "is_suppressed": False,
+        "lineage": lineage,
+        "name": f"Species{ott_id}",
+        "ott_id": ott_id,
+        "rank": "species",
+        "source": "ott3.5",
+        "synonyms": [],
+        "tax_sources": [],
+        "unique_name": f"Species{ott_id}",
+    }
+
+
+class StandInServer:
+    """Local HTTP server replaying the responses of the Open Tree of Life APIs."""
+
+    def __init__(
+        self,
+        recordings: Optional[Dict[str, Dict[str, Any]]] = None,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        random_state: int = 42,
+    ) -> None:
+        """Initialize the stand-in server.
+
+        Parameters
+        ----------
+        recordings
+            recorded responses, per endpoint, as described in the module.
+        latency
+            number of seconds by which each response is delayed.
+        error_rate
+            probability of each request to fail with an HTTP 503.
+        host
+            host on which the server listens.
+        port
+            port on which the server listens. By default, a free port is used.
+        random_state
+            seed of the random failures.
+        """
+        if not 0 <= error_rate <= 1:
+            raise ValueError(
+                f"The error rate must be between zero and one, but {error_rate} was provided."
+            )
+        if latency < 0:
+            raise ValueError(
+                f"The latency must not be negative, but {latency} was provided."
+            )
+        self.recordings = recordings or {}
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(random_state)
+        self._server = ThreadingHTTPServer((host, port), self._get_handler_class())
+        self._server.daemon_threads = True
+        self._thread = Thread(
+            target=self._server.serve_forever, name="stand-in-server", daemon=True
+        )
+
+    @staticmethod
+    def from_file(path: str, **kwargs) -> "StandInServer":
+        """Returns a stand-in server replaying the recordings stored in the provided file."""
+        with open(path, "r", encoding="utf8") as recordings:
+            return StandInServer(recordings=json.load(recordings), **kwargs)
+
+    @property
+    def address(self) -> str:
+        """Address of the server, as expected by OVERRIDE_OT_PRODUCTION_API_ENDPOINT."""
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def _respond(self, path: str, payload: Dict[str, Any]) -> Tuple[int, Dict]:
+        """Returns the status code and the body of the response to the request."""
+        if self._random.random() < self.error_rate:
+            return 503, {"message": "Service temporarily unavailable."}
+
+        if path.endswith("/tnrs/match_names"):
+            return 200, merge_tnrs_matches(
+                [
+                    self.recordings.get("tnrs_match", {}).get(name.lower())
+                    or get_synthetic_tnrs_match(name)
+                    for name in payload["names"]
+                ]
+            )
+
+        if path.endswith("/taxonomy/taxon_info"):
+            ott_id = int(payload["ott_id"])
+            recorded = self.recordings.get("taxon_info", {}).get(str(ott_id))
+            return 200, recorded or get_synthetic_taxon_info(ott_id)
+
+        return 404, {"message": f"The endpoint {path} is not provided by the stand-in."}
+
+    def _get_handler_class(self):
+        """Returns the request handler class bound to this server."""
+        stand_in = self
+
+        class StandInRequestHandler(BaseHTTPRequestHandler):
+            """Handler of the requests to the stand-in server."""
+
+            def do_POST(self):
+                length = int(self.headers.get("content-length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                sleep(stand_in.latency)
+                status, body = stand_in._respond(self.path, payload)
+                encoded = json.dumps(body).encode("utf8")
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, format, *args):
+                # The access log would dominate the output of the benchmark.
+                pass
+
+        return StandInRequestHandler
+
+    def __enter__(self) -> "StandInServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,164 @@
+"""Submodule providing the generation of synthetic taxa and data payloads.
+
+Implementative details
+----------------------
+The synthetic work items are owned by synthetic users, so that the fair scheduling
+across users is exercised as well. A fraction of the taxon names is duplicated, as
+it happens when several users describe samples of the same species, so that the
+effectiveness of the result cache can be measured.
+
+The data payloads are small tar.gz archives written at the unsafe path of each
+payload, created with a PENDING data payload processing task as done by the upload
+form of the website.
+"""
+from typing import List
+import io
+import os
+import random
+import tarfile
+from sqlalchemy.orm import Session
+from alchemy_wrapper.models import DataPayload, Taxon, User
+
+SYLLABLES = (
+    "ae an ba ca da el fi go hu ia lo ma ne or pa qu ri sa ta um va xi yo za".split()
+)
+
+
+def generate_taxon_names(
+    number_of_names: int, duplicate_fraction: float = 0.1, random_state: int = 42
+) -> List[str]:
+    """Returns synthetic binomial taxon names.
+
+    Parameters
+    ----------
+    number_of_names
+        number of names to generate.
+    duplicate_fraction
+        fraction of the names that repeat a previously generated name.
+    random_state
+        seed of the generation.
+    """
+    generator = random.Random(random_state)
+    names = []
+    for _ in range(number_of_names):
+        if names and generator.random() < duplicate_fraction:
+            names.append(generator.choice(names))
+            continue
+        genus = "".join(generator.choices(SYLLABLES, k=generator.randint(2, 4)))
+        species = "".join(generator.choices(SYLLABLES, k=generator.randint(2, 4)))
+        names.append(f"{genus.capitalize()} {species}")
+    return names
+
+
+def create_synthetic_users(session: Session, number_of_users: int) -> List[int]:
+    """Returns the ids of newly created synthetic users.
+
+    Parameters
+    ----------
+    session
+        session used to create the users.
+    number_of_users
+        number of users to create.
+    """
+    users = [
+        User(
+            first_name=f"Benchmark{index}",
+            last_name="McBenchFace",
+            description="Synthetic user created by the enrichers benchmark.",
+        )
+        for index in range(number_of_users)
+    ]
+    session.add_all(users)
+    session.commit()
+    return [user.id for user in users]
+
+
+def create_synthetic_taxa(
+    session: Session,
+    number_of_taxa: int,
+    number_of_users: int = 10,
+    duplicate_fraction: float = 0.1,
+    random_state: int = 42,
+) -> List[int]:
+    """Returns the ids of newly created synthetic taxa, spread across synthetic users.
+
+    Parameters
+    ----------
+    session
+        session used to create the taxa.
+    number_of_taxa
+        number of taxa to create.
+    number_of_users
+        number of synthetic users owning the taxa.
+    duplicate_fraction
+        fraction of the taxa repeating the name of another taxon.
+    random_state
+        seed of the generation.
+    """
+    generator = random.Random(random_state)
+    user_ids = create_synthetic_users(session, number_of_users)
+    taxa = [
+        Taxon(
+            name=name,
+            description="Synthetic taxon created by the enrichers benchmark.",
+            user_id=generator.choice(user_ids),
+        )
+        for name in generate_taxon_names(
+            number_of_taxa,
+            duplicate_fraction=duplicate_fraction,
+            random_state=random_state,
+        )
+    ]
+    session.add_all(taxa)
+    session.commit()
+    return [taxon.id for taxon in taxa]
+
+
+def _write_synthetic_archive(path: str, number_of_bytes: int, generator: random.Random):
+    """Write a tar.gz archive containing a file of random content at the provided path."""
+    content = generator.getrandbits(8 * number_of_bytes).to_bytes(
+        number_of_bytes, "little"
+    )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tarfile.open(path, "w:gz") as archive:
+        member = tarfile.TarInfo(name="msdata/processed/synthetic.mzML")
+        member.size = len(content)
+        archive.addfile(member, io.BytesIO(content))
+
+
+def create_synthetic_payloads(
+    session: Session,
+    number_of_payloads: int,
+    number_of_users: int = 10,
+    number_of_bytes: int = 1 << 16,
+    random_state: int = 42,
+) -> List[int]:
+    """Returns the ids of newly created synthetic data payloads, spread across synthetic users.
+
+    Parameters
+    ----------
+    session
+        session used to create the payloads.
+    number_of_payloads
+        number of payloads to create.
+    number_of_users
+        number of synthetic users owning the payloads.
+    number_of_bytes
+        size of the content of each payload.
+    random_state
+        seed of the generation.
+    """
+    generator = random.Random(random_state)
+    users = [
+        User.from_id(user_id, session=session)
+        for user_id in create_synthetic_users(session, number_of_users)
+    ]
+
+    payload_ids = []
+    for _ in range(number_of_payloads):
+        payload = DataPayload.new_data_payload(
+            user=generator.choice(users), extension="tar.gz", session=session
+        )
+        _write_synthetic_archive(payload.get_unsafe_path(), number_of_bytes, generator)
+        payload_ids.append(payload.id)
+    return payload_ids
@@ -0,0 +1,173 @@
+"""Submodule providing the circuit breakers guarding the remote repositories.
+
+Implementative details
+----------------------
+When a remote repository such as Open Tree of Life is down, every enrichment waits
+for its timeout and fails, wasting worker time and recording a failure for every
+task. The circuit breaker of a repository counts the consecutive failures of the
+calls to it, where a failure is an exception that the retry policy of the enricher
+considers retryable, and trips once they reach a threshold:
+
+* while the circuit is closed, the calls go through;
+* while the circuit is open, no call is attempted and the work is deferred until
+  the recovery timeout has elapsed;
+* once the recovery timeout has elapsed, the circuit is half-open: a limited number
+  of probe calls go through, and the circuit closes again upon the first success,
+  or opens again upon the first failure.
+
+There is a single circuit breaker per repository in each process, shared by all the
+enrichers querying it. The transitions are logged, and the state of each circuit
+breaker is exposed in the enricher_circuit_breaker_state metric.
+"""
+from typing import Dict
+from threading import Lock
+import datetime
+import logging
+from .metrics import set_circuit_breaker_state
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call to a remote repository is not attempted as its circuit is open."""
+
+
+class CircuitBreaker:
+    """Circuit breaker guarding the calls to a remote repository."""
+
+    def __init__(
+        self,
+        repository: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 60.0,
+        maximal_number_of_probes: int = 1,
+    ) -> None:
+        """Initialize the circuit breaker.
+
+        Parameters
+        ----------
+        repository
+            name of the guarded repository, as returned by Enricher.repository.
+        failure_threshold
+            number of consecutive failures after which the circuit opens.
+        recovery_timeout
+            number of seconds after which an open circuit lets probe calls through.
+        maximal_number_of_probes
+            number of concurrent probe calls let through while half-open.
+        """
+        if failure_threshold < 1:
+            raise ValueError(
+                "The failure threshold must be at least one, "
+                f"but {failure_threshold} was provided."
+            )
+        if maximal_number_of_probes < 1:
+            raise ValueError(
+                "The maximal number of probes must be at least one, "
+                f"but {maximal_number_of_probes} was provided."
+            )
+        self.repository = repository
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.maximal_number_of_probes = maximal_number_of_probes
+        self._logger = logging.getLogger(f"Circuit breaker of {repository}")
+        self._lock = Lock()
+        self._state = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = datetime.datetime.min
+        self._probes_in_flight = 0
+        set_circuit_breaker_state(repository, self._state)
+
+    def _transition(self, state: str):
+        """Move the circuit to the provided state. Must be called holding the lock."""
+        if state == self._state:
+            return
+        reason = (
+            f" after {self._consecutive_failures} consecutive failures"
+            if state == "open"
+            else ""
+        )
+        self._logger.warning(
+            f"The circuit of {self.repository} moves from {self._state} to {state}{reason}."
+        )
+        self._state = state
+        if state == "open":
+            self._opened_at = datetime.datetime.now()
+        self._probes_in_flight = 0
+        set_circuit_breaker_state(self.repository, state)
+
+    def get_retry_at(self) -> datetime.datetime:
+        """Returns the time after which the deferred work may be attempted again."""
+        return self._opened_at + datetime.timedelta(seconds=self.recovery_timeout)
+
+    def _update_state(self):
+        """Move the circuit to half-open once the recovery timeout has elapsed."""
+        if self._state == "open" and datetime.datetime.now() >= self.get_retry_at():
+            self._transition("half-open")
+
+    def is_open(self) -> bool:
+        """Returns whether the circuit is open, i.e. no call should be attempted."""
+        with self._lock:
+            self._update_state()
+            return self._state == "open"
+
+    def allow_request(self) -> bool:
+        """Returns whether a call may be attempted, registering it as a probe if half-open.
+
+        Implementative details
+        ----------------------
+        Each allowed call must be followed by a call to either record_success or
+        record_failure, which release the probe slot while the circuit is half-open.
+        """
+        with self._lock:
+            self._update_state()
+            if self._state == "closed":
+                return True
+            if (
+                self._state == "half-open"
+                and self._probes_in_flight < self.maximal_number_of_probes
+            ):
+                self._probes_in_flight += 1
+                return True
+            return False
+
+    def record_success(self):
+        """Record a successful call, which closes a half-open circuit."""
+        with self._lock:
+            self._consecutive_failures = 0
+            self._transition("closed")
+
+    def record_failure(self):
+        """Record a failed call, which may open the circuit."""
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == "half-open":
+                self._transition("open")
+            elif (
+                self._state == "closed"
+                and self._consecutive_failures >= self.failure_threshold
+            ):
+                self._transition("open")
+
+    def record_release(self):
+        """Record that an allowed call did not reach the repository, freeing its probe slot."""
+        with self._lock:
+            if self._state == "half-open" and self._probes_in_flight > 0:
+                self._probes_in_flight -= 1
+
+
+_CIRCUIT_BREAKERS: Dict[str, CircuitBreaker] = {}
+_CIRCUIT_BREAKERS_LOCK = Lock()
+
+
+def get_circuit_breaker(repository: str, **kwargs) -> CircuitBreaker:
+    """Returns the circuit breaker of the provided repository, creating it if needed.
+
+    Parameters
+    ----------
+    repository
+        name of the guarded repository, as returned by Enricher.repository.
+    kwargs
+        parameters of the circuit breaker, used when it is first created.
+    """
+    with _CIRCUIT_BREAKERS_LOCK:
+        if repository not in _CIRCUIT_BREAKERS:
+            _CIRCUIT_BREAKERS[repository] = CircuitBreaker(repository, **kwargs)
+        return _CIRCUIT_BREAKERS[repository]
@@ -17,17 +17,102 @@ Each task is initially set to the status of PENDING, as it may not be possible t
 Several tasks require us to query remote services, and it may be the case that we can only send a limited
 number of requests per second. When the task is started, the status is set to STARTED, and when it is
 finished, the status is set to SUCCESS or FAILURE depending on whether the task was successful or not.
+
+Tasks are created lazily, right before the enrichment begins, and an existing PENDING task of the
+enrichable, such as one awaiting a retry, is resumed instead of creating a new one. The number of
+outstanding, i.e. PENDING or STARTED, tasks of each enricher is capped: once the cap is reached, no
+new task is admitted until the outstanding ones complete, while the existing ones are still resumed.
+This applies backpressure when the remote service is slow, instead of filling the tasks table.
+
+The requests for the same enrichable are coalesced: each enricher holds at most one claim over each
+enrichable, enforced by a unique key in the enrichment_claims table, pointing to the latest task it
+created for it. A new request attaches to that task while it is PENDING, and is dropped while it is
+running or less than a cooldown after it failed, so that a failing enrichable does not spawn a new
+task at each round. When two replicas race to claim the same enrichable, only one of them succeeds.
+
+While a task is STARTED, the enricher periodically updates its heartbeat. At each round of the
+service, the tasks whose heartbeat has expired, i.e. tasks abandoned by an enricher that crashed
+or was killed, are put back to PENDING so that they can be resumed, or are marked as failed once
+they have been attempted too many times.
+
+Each enricher declares a retry policy. When the enrichment fails with an exception that the policy
+considers retryable, the task is put back to PENDING with the time of its next attempt, computed
+with an exponential backoff, instead of being marked as failed.
+
+The work items are claimed in the order given by the scheduler of the enricher, which interleaves
+the work items of the different users so that no user can starve the others.
+
+The enricher service exposes Prometheus metrics over HTTP, reporting the number of tasks per status,
+the number of enriched and failed items, the enrichment latency per task type, the latency of the
+calls to the remote repositories and the time spent idle between two rounds. The resources consumed
+by each attempt of a task, such as its CPU time and peak memory, are stored alongside the task.
+
+Enrichers whose results only depend on a normalized version of their input may declare it, in
+which case the result cache is consulted before enriching: a cached result is applied to the
+enrichable without recomputing it, and the task is still recorded as successful.
+
+The candidates of each round are streamed from the database with a server-side cursor, in chunks,
+through a dedicated discovery session, so that the commits of the enrichment do not close the
+cursor. Each round is capped at a budget of candidates, so that the memory of the service stays
+flat regardless of the size of the backlog and the first candidate is enriched right away.
+
+The session of the enricher lives for a bounded amount of work: the objects of each completed item
+are expunged from it, and it is replaced by a fresh session at the end of each round, after a given
+number of items, or as soon as the resident memory of the process exceeds a watermark. Only the
+ids of the bot user and of the task types are kept across sessions.
+
+Upon SIGTERM or SIGINT, the service stops claiming new work and lets the in-flight item finish,
+or checkpoint itself, within a deadline. If it does not, the in-flight task is released back to
+PENDING, without counting the interrupted attempt, so that another replica can resume it.
+
+The calls to the remote repository of each enricher, which the enrichers route through the
+_call_remote method, are guarded by a circuit breaker, shared by the enrichers querying the same
+repository. Once too many consecutive calls failed with retryable errors, the circuit opens: the
+calls to the repository are refused, and the tasks whose call was refused or failed are deferred
+until the recovery timeout has elapsed, without counting the attempt. Only the remote calls are
+guarded, so that the enrichments resolved locally or from a cache go on while the circuit is open.
+
+Enrichers may store the rows of their results through the buffered result writer, which writes
+the rows of several completed tasks at once, and marks these tasks as successful in the same
+transaction. By default, the writer is flushed as soon as each task completes.
 """
-from typing import List, Any
-from time import sleep
+from typing import List, Any, Callable, Dict, Iterator, Optional
+from contextlib import closing
+from itertools import islice
+from threading import Event
+import datetime
+import gc
 import logging
+from sqlalchemy import and_, exists, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query
 from alchemy_wrapper import Session
 from alchemy_wrapper.models import Task, User, Bot, TaskType
+from .heartbeat import Heartbeat
+from .resource_usage import ResourceAccounting
+from .reaper import reap_stale_tasks
+from .retry_policy import RetryPolicy
+from .scheduler import FairScheduler
+from .metrics import EnricherMetrics, serve_metrics, stop_metrics
+from .result_cache import ResultCache
+from .result_writer import BufferedResultWriter
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, get_circuit_breaker
+from .memory import get_resident_memory
+from .models import EnrichmentClaim
+from .shutdown import ShutdownRequested, handle_shutdown_signals
+from .__version__ import __version__
 
 
 class Enricher:
     """Abstract Enricher class for extending the metadata of a enrichable class."""
 
+    # Policy determining which failures are retried, and when.
+    retry_policy: RetryPolicy = RetryPolicy()
+    # Scheduler determining the order in which the work items are claimed.
+    scheduler: FairScheduler = FairScheduler()
+    # Cache of the results of the enrichers declaring a cache input.
+    result_cache: ResultCache = ResultCache()
+
     def __init__(self, verbose: bool = True) -> None:
         """Initialize the enricher object."""
         self._session = Session()
@@ -36,6 +121,21 @@ class Enricher:
         # identified by its name.
         self._verbose = verbose
         self._logger = logging.getLogger(self.name())
+        self._metrics = EnricherMetrics(self.name())
+        self._task_type_names: Dict[int, str] = {}
+        self._items_since_recycle = 0
+        self._stop_requested = Event()
+        self._in_flight_task_id: Optional[int] = None
+        self._admission_budget: Optional[int] = None
+        self._result_writer = BufferedResultWriter(
+            maximal_number_of_rows=self._get_result_batch_size(),
+            maximal_delay=self._get_result_flush_interval(),
+        )
+        self._circuit_breaker: CircuitBreaker = get_circuit_breaker(
+            self.repository(),
+            failure_threshold=self._get_circuit_breaker_failure_threshold(),
+            recovery_timeout=self._get_circuit_breaker_recovery_timeout(),
+        )
         enricher = self._session.query(User).filter_by(first_name=self.name()).first()
         if enricher is None:
             enricher = User(
@@ -61,13 +161,14 @@ class Enricher:
             self._session.add(task_type)
             self._session.commit()
 
-        self._task_type = task_type
-        self._enricher = enricher
+        # We only keep the ids, as the objects are detached when the session is recycled.
+        self._task_type_id: int = task_type.id
+        self._enricher_id: int = enricher.id
 
     @property
     def id(self) -> int:
         """Id of the enricher."""
-        return self._enricher.id
+        return self._enricher_id
 
     @classmethod
     def name(cls) -> str:
@@ -77,6 +178,11 @@ class Enricher:
             f"This was not done for the {cls.__class__.__name__} class."
         )
 
+    @classmethod
+    def version(cls) -> str:
+        """Version of the enricher, to be increased when its results change."""
+        return __version__
+
     @classmethod
     def repository(cls) -> str:
         """Name of the repository providing these specific metadata."""
@@ -85,20 +191,43 @@ class Enricher:
             f"This was not done for the {cls.__class__.__name__} class."
         )
 
-    def _can_enrich(self, enrichable) -> bool:
-        """Returns whether the Enricher can enrich the metadata of the enrichable class.
+    def _select_enrichables(self, enrichables: List[Any]) -> List[Any]:
+        """Returns the subset of the provided enrichables that can currently be enriched.
 
         Parameters
         ----------
-        enrichable
-            enrichable class to enrich.
+        enrichables
+            batch of candidate enrichables.
+
+        Implementative details
+        ----------------------
+        The eligibility of the whole batch must be checked with a single query, for
+        instance by selecting which of the taxa of the batch are already enriched,
+        instead of issuing one query per candidate. The order of the candidates
+        must be preserved.
         """
         raise NotImplementedError(
-            "The _can_enrich method of the Enricher class must be implemented by a subclass. "
+            "The _select_enrichables method of the Enricher class must be implemented by a subclass. "
             f"This was not done for the {self.__class__.__name__} class."
         )
 
-    def _enrich(self, enrichable, task: Task) -> bool:
+    def _prepare_batch(self, enrichables: List[Any]):
+        """Prepares the enrichment of a batch of eligible enrichables.
+
+        Parameters
+        ----------
+        enrichables
+            batch of enrichables about to be enriched.
+
+        Implementative details
+        ----------------------
+        Enrichers querying a remote repository that accepts several inputs per
+        request may fetch the data of the whole batch at once, to be used by the
+        _enrich method instead of one request per enrichable. By default, nothing
+        is prepared.
+        """
+
+    def _enrich(self, enrichable, task: Task) -> Any:
         """Enrich the metadata of a enrichable class.
 
         Parameters
@@ -108,7 +237,8 @@ class Enricher:
 
         Returns
         -------
-        Whether the enrichment was successful or not.
+        Whether the enrichment was successful or not. Enrichers using the result
+        cache return instead the JSON-serializable result of a successful enrichment.
         """
         raise NotImplementedError(
             "The enrich method of the Enricher class must be implemented by a subclass. "
@@ -116,13 +246,232 @@ class Enricher:
             f"This class should retrieve the metadata relative to the repository {self.repository()}."
         )
 
+    def _get_cache_input(self, enrichable) -> Optional[Any]:
+        """Returns the normalized input of the enrichment, used as key of the result cache.
+
+        Implementative details
+        ----------------------
+        Enrichers whose results only depend on a normalized version of their input,
+        such as the name of a taxon, may return it as a JSON-serializable object so
+        that identical work is not recomputed. Such enrichers must return from the
+        _enrich method a JSON-serializable result, which is cached, and implement the
+        _enrich_from_cache method. By default, the result cache is not used.
+        """
+        return None
+
+    def _enrich_from_cache(self, enrichable, task: Task, result: Any) -> Any:
+        """Enrich the metadata of a enrichable class from a cached result.
+
+        Parameters
+        ----------
+        enrichable
+            enrichable class to enrich.
+        task
+            task associated to the enrichment.
+        result
+            cached result of the enrichment of an identical input.
+
+        Returns
+        -------
+        The result of the enrichment, or None if the cached result cannot be
+        applied anymore, in which case the enrichable is enriched as if there
+        were no cached result, and the cached result is replaced.
+        """
+        raise NotImplementedError(
+            "The _enrich_from_cache method of the Enricher class must be implemented by a subclass "
+            "declaring a cache input. "
+            f"This was not done for the {self.__class__.__name__} class."
+        )
+
+    def _evict_cached_results(self):
+        """Evicts the expired, outdated and least recently used cached results of this enricher."""
+        evicted = self.result_cache.evict(enricher=self.name(), version=self.version())
+        if evicted > 0:
+            self._logger.info(f"Evicted {evicted} cached results.")
+
+    def _get_existing_task(self, enrichable) -> Optional[Task]:
+        """Returns the existing task to resume for the provided enrichable, if any.
+
+        Implementative details
+        ----------------------
+        Enrichers whose enrichables may already have a task, such as a PENDING task
+        waiting to be retried, or the task associated to a data payload, should
+        return it so that it is resumed instead of creating a new one. Resumed
+        tasks are not subject to the admission control. By default, a new task
+        is always created.
+        """
+        return None
+
+    def _get_enrichable_id(self, enrichable) -> int:
+        """Returns the id of the enrichable, used as key of the claims of the enricher."""
+        return enrichable.id
+
+    def _get_failure_cooldown(self) -> datetime.timedelta:
+        """Returns the time after a failure during which no new task is created for the enrichable."""
+        return datetime.timedelta(hours=6)
+
+    def _is_claimed(self, enrichable_id):
+        """Returns the SQL condition selecting the enrichables whose new requests are coalesced.
+
+        Parameters
+        ----------
+        enrichable_id
+            column of the query with the id of the enrichables.
+
+        Implementative details
+        ----------------------
+        An enrichable is claimed when the latest task of this enricher for it is
+        running, is waiting to be retried, or failed less than a cooldown ago.
+        """
+        return exists().where(
+            EnrichmentClaim.enricher == self.name(),
+            EnrichmentClaim.enrichable_id == enrichable_id,
+            EnrichmentClaim.task_id == Task.id,
+            or_(
+                Task.status == "STARTED",
+                and_(Task.status == "PENDING", ~Task.is_due()),
+                and_(
+                    Task.status == "FAILURE",
+                    Task.updated_at
+                    > datetime.datetime.now() - self._get_failure_cooldown(),
+                ),
+            ),
+        )
+
+    def _is_cooling_down(self, task: Task) -> bool:
+        """Returns whether the provided task failed less than the failure cooldown ago."""
+        return (
+            task.status == "FAILURE"
+            and task.updated_at > datetime.datetime.now() - self._get_failure_cooldown()
+        )
+
+    def _get_maximal_number_of_outstanding_tasks(self) -> int:
+        """Returns the number of PENDING or STARTED tasks above which no new task is admitted."""
+        return 1000
+
+    def _refresh_admission_budget(self):
+        """Updates the number of new tasks that may be created before reaching the cap.
+
+        Implementative details
+        ----------------------
+        The outstanding tasks are counted with a single query, once per batch of
+        candidates, and the budget is then decreased locally as new tasks are
+        created. The tasks created concurrently by other replicas are accounted
+        for at the next batch, so the cap may be slightly exceeded.
+        """
+        number_of_outstanding_tasks = (
+            self._session.query(func.count(Task.id))
+            .filter(
+                Task.task_type_id == self._task_type_id,
+                Task.status.in_(("PENDING", "STARTED")),
+            )
+            .scalar()
+        )
+        self._admission_budget = (
+            self._get_maximal_number_of_outstanding_tasks()
+            - number_of_outstanding_tasks
+        )
+        if self._admission_budget <= 0:
+            self._logger.warning(
+                f"Not admitting new tasks, as {number_of_outstanding_tasks} tasks are "
+                f"outstanding out of at most {self._get_maximal_number_of_outstanding_tasks()}."
+            )
+
+    def _claim_task(self, enrichable) -> Optional[Task]:
+        """Returns the task to execute for the provided enrichable, or None if not admitted.
+
+        Parameters
+        ----------
+        enrichable
+            enrichable class about to be enriched.
+
+        Implementative details
+        ----------------------
+        No task is returned when the request is coalesced with the task claiming the
+        enrichable, or when the cap of outstanding tasks is reached.
+        """
+        enrichable_id = self._get_enrichable_id(enrichable)
+        claim, claimed_task = (
+            self._session.query(EnrichmentClaim, Task)
+            .join(Task, Task.id == EnrichmentClaim.task_id)
+            .filter(
+                EnrichmentClaim.enricher == self.name(),
+                EnrichmentClaim.enrichable_id == enrichable_id,
+            )
+            .first()
+        ) or (None, None)
+
+        if claimed_task is not None:
+            # The request is attached to the task already claiming the enrichable.
+            if claimed_task.status == "PENDING":
+                return claimed_task
+            if claimed_task.status == "STARTED" or self._is_cooling_down(claimed_task):
+                self._logger.info(
+                    f"Coalescing the request for {enrichable_id} with the task "
+                    f"{claimed_task.id}, which is {claimed_task.status}."
+                )
+                self._metrics.record_outcome("coalesced")
+                return None
+
+        task = self._get_existing_task(enrichable)
+        if task is not None:
+            return task
+
+        if self._admission_budget is None:
+            self._refresh_admission_budget()
+        if self._admission_budget <= 0:
+            self._metrics.record_outcome("throttled")
+            return None
+        self._admission_budget -= 1
+
+        # The new task and its claim are committed together, so that a task
+        # is only created by the replica that wins the claim.
+        task = self._create_new_task(enrichable)
+        try:
+            if claim is None:
+                self._session.add(
+                    EnrichmentClaim(
+                        enricher=self.name(),
+                        enrichable_id=enrichable_id,
+                        task_id=task.id,
+                    )
+                )
+                self._session.flush()
+                claimed = True
+            else:
+                # The claim is only moved to the new task if no other replica moved it.
+                claimed = (
+                    self._session.query(EnrichmentClaim)
+                    .filter(
+                        EnrichmentClaim.id == claim.id,
+                        EnrichmentClaim.task_id == claimed_task.id,
+                    )
+                    .update({"task_id": task.id}, synchronize_session=False)
+                    == 1
+                )
+        except IntegrityError:
+            claimed = False
+
+        if not claimed:
+            self._session.rollback()
+            self._logger.info(
+                f"Coalescing the request for {enrichable_id}, "
+                "as it was claimed concurrently by another replica."
+            )
+            self._metrics.record_outcome("coalesced")
+            return None
+
+        self._session.commit()
+        return task
+
     def _create_new_task(self, enrichable) -> Task:
         """Create a new task for the enricher.
 
         Implementative details
         ----------------------
         This method creates a new entry in the tasks table and returns the corresponding
-        Task object. The status of the task is set to PENDING.
+        Task object. The status of the task is set to PENDING. The new entries are only
+        flushed, as they are committed along with the claim of the enrichable.
 
         In the child classes, this method may be extended so as to create a new entry in the
         enricher-specific table that may contain foreign keys, such as the taxon_tasks table.
@@ -130,39 +479,304 @@ class Enricher:
         # Create a new entry in the tasks table
         enrichment_task = Task(
             user_id=self.id,
-            task_type_id=self._task_type.id,
+            task_type_id=self._task_type_id,
         )
         self._session.add(enrichment_task)
-        self._session.commit()
+        self._session.flush()
         return enrichment_task
 
-    def _task_can_start(self, enrichable, task: Task) -> bool:
-        """Returns whether the task can be started.
+    def _get_task_type_ids(self) -> List[int]:
+        """Returns the ids of the task types of the tasks executed by this enricher.
 
         Implementative details
         ----------------------
-        This method checks whether the task can be started. For instance, for the taxon enrichers,
-        this method checks whether the taxon is already enriched or not.
+        These are the task types whose abandoned tasks are recovered by the reaper.
+        Enrichers executing tasks created elsewhere, such as the ones associated to
+        the data payloads, should extend this list.
         """
-        raise NotImplementedError(
-            "The _task_can_start method of the Enricher class must be implemented by a subclass. "
-            f"This was not done for the {self.__class__.__name__} class."
+        return [self._task_type_id]
+
+    def _get_heartbeat_interval(self) -> int:
+        """Returns the number of seconds between two heartbeats of a running task."""
+        return 30
+
+    def _get_lease_duration(self) -> datetime.timedelta:
+        """Returns the time without heartbeats after which a running task is considered abandoned."""
+        return datetime.timedelta(minutes=5)
+
+    def _get_maximal_number_of_attempts(self) -> int:
+        """Returns the number of attempts after which an abandoned task is marked as failed."""
+        return self.retry_policy.maximal_number_of_attempts
+
+    def _reap_stale_tasks(self):
+        """Recovers the tasks abandoned by crashed instances of this enricher."""
+        for task in reap_stale_tasks(
+            session=self._session,
+            task_type_ids=self._get_task_type_ids(),
+            lease_duration=self._get_lease_duration(),
+            maximal_number_of_attempts=self._get_maximal_number_of_attempts(),
+        ):
+            self._logger.warning(
+                f"Recovered the abandoned task {task.id}, now {task.status}."
+            )
+
+    def _get_circuit_breaker_failure_threshold(self) -> int:
+        """Returns the number of consecutive failures after which the circuit of the repository opens."""
+        return 5
+
+    def _get_circuit_breaker_recovery_timeout(self) -> float:
+        """Returns the number of seconds after which an open circuit lets a probe call through.
+
+        Implementative details
+        ----------------------
+        The circuit breaker is shared by the enrichers querying the same repository,
+        and is configured by the first of them to be initialized.
+        """
+        return 60.0
+
+    def _get_result_batch_size(self) -> int:
+        """Returns the number of buffered result rows above which they are written.
+
+        Implementative details
+        ----------------------
+        The completed tasks without any buffered row count as a single row. As the
+        buffered tasks are still STARTED until they are written, enrichers buffering
+        several rows must complete each of their tasks well within the lease duration.
+        """
+        return 1
+
+    def _get_result_flush_interval(self) -> float:
+        """Returns the number of seconds after which the buffered result rows are written."""
+        return 5.0
+
+    def _store_result(self, task: Task, table: Any, row: Dict[str, Any]):
+        """Stores a row of the result of the provided task, once the task completes.
+
+        Parameters
+        ----------
+        task
+            running task whose result includes the row.
+        table
+            table, or model, the row belongs to.
+        row
+            values of the columns of the row, by column key.
+        """
+        self._result_writer.add(task.id, table, row)
+
+    def _flush_results(self):
+        """Writes the buffered result rows, marking their tasks as successful."""
+        self._result_writer.flush(
+            self._session,
+            on_failure=self._handle_write_failure,
+            on_success=self._record_write_success,
         )
 
-    def _get_sleep_time_between_start_attempts(self) -> int:
-        """Returns the time in milliseconds to wait between two attempts of starting the task."""
-        raise NotImplementedError(
-            "The _get_sleep_time_between_start_attempts method of the Enricher class must be implemented by a subclass. "
-            f"This was not done for the {self.__class__.__name__} class."
+    def _record_write_success(self, task_id: int):
+        """Records the success of the provided task, once its result rows are committed."""
+        self._metrics.record_outcome("success")
+
+    def _handle_write_failure(self, task_id: int, reason_for_failure: Exception):
+        """Retries or fails the provided completed task, whose result rows could not be written."""
+        self._logger.warning(
+            f"Unable to store the result of task {task_id}: {reason_for_failure!r}."
         )
+        self._handle_failure(
+            Task.from_id(task_id, session=self._session), reason_for_failure
+        )
+
+    def _get_items_per_session(self) -> int:
+        """Returns the number of enriched items after which the session is recycled."""
+        return 100
+
+    def _get_memory_watermark(self) -> int:
+        """Returns the resident memory, in bytes, above which the session is recycled."""
+        return 1 << 30
+
+    def _recycle_session(self):
+        """Replaces the session of the enricher with a fresh one.
+
+        Implementative details
+        ----------------------
+        Closing the session releases its identity map, with all the tasks and
+        enrichables loaded since it was opened, and returns its connection to
+        the pool. All the work of the enricher is committed as each item is
+        completed, and the buffered results are held by the result writer,
+        so there is nothing pending in the closed session.
+        """
+        self._session.close()
+        self._session = Session()
+        self._items_since_recycle = 0
+        gc.collect()
+
+    def _complete_item(self, number_of_items: int = 1):
+        """Releases the objects of the completed items, recycling the session if needed.
+
+        Parameters
+        ----------
+        number_of_items
+            number of items completed since the last call.
+        """
+        self._session.expunge_all()
+        self._items_since_recycle += number_of_items
+
+        if self._items_since_recycle >= self._get_items_per_session():
+            self._recycle_session()
+            return
+
+        resident_memory = get_resident_memory()
+        if resident_memory > self._get_memory_watermark():
+            self._logger.info(
+                f"Recycling the session, as the resident memory of {resident_memory} "
+                f"bytes exceeds the watermark of {self._get_memory_watermark()} bytes."
+            )
+            self._recycle_session()
+
+    def _get_task_type_name(self, task: Task) -> str:
+        """Returns the name of the task type of the provided task."""
+        if task.task_type_id not in self._task_type_names:
+            self._task_type_names[task.task_type_id] = task.get_name(
+                session=self._session
+            )
+        return self._task_type_names[task.task_type_id]
+
+    def _update_queue_depth(self):
+        """Updates the metric reporting the number of tasks of this enricher per status."""
+        self._metrics.set_queue_depth(
+            dict(
+                self._session.query(Task.status, func.count(Task.id))
+                .filter(Task.task_type_id.in_(self._get_task_type_ids()))
+                .group_by(Task.status)
+                .all()
+            )
+        )
+
+    def _get_round_budget(self) -> int:
+        """Returns the maximal number of elements enriched in a single round of the service."""
+        return 1000
+
+    def _get_discovery_chunk_size(self) -> int:
+        """Returns the number of candidates fetched at once from the database."""
+        return 100
+
+    def _stream_candidates(self, query: Query) -> Iterator[Any]:
+        """Yields the elements selected by the query, up to the round budget.
+
+        Parameters
+        ----------
+        query
+            query selecting the elements to enrich, in the order in which they
+            should be enriched.
+
+        Implementative details
+        ----------------------
+        The query is executed in a dedicated session, with a server-side cursor
+        fetching the rows in chunks, as the session of the enricher is committed
+        while the candidates are enriched, which would close the cursor. The
+        elements are loaded in the discovery session and do not expire on those
+        commits, and the discovery session is closed once the round is over.
+        """
+        discovery_session = Session()
+        try:
+            yield from (
+                query.with_session(discovery_session)
+                .limit(self._get_round_budget())
+                .yield_per(self._get_discovery_chunk_size())
+            )
+        finally:
+            discovery_session.close()
 
-    def _get_new_elements_to_enrich(self) -> List[Any]:
-        """Returns list of elements to enrich."""
+    def _get_new_elements_to_enrich(self) -> Iterator[Any]:
+        """Yields the elements to enrich in this round."""
         raise NotImplementedError(
             "The _get_new_elements_to_enrich method of the Enricher class must be implemented by a subclass. "
             f"This was not done for the {self.__class__.__name__} class."
         )
 
+    def _call_remote(self, function: Callable[..., Any], *args) -> Any:
+        """Calls the remote repository through the provided function, unless its circuit is open.
+
+        Implementative details
+        ----------------------
+        The enrichers must route each call to their remote repository through this
+        method, and only those: the failures of the local work, such as reading a
+        file, say nothing about the health of the repository.
+
+        Parameters
+        ----------
+        function
+            function querying the remote repository.
+        args
+            arguments of the function.
+
+        Raises
+        ------
+        CircuitOpenError
+            If the circuit of the repository is open, in which case the function is not called.
+        """
+        self._acquire_circuit()
+        try:
+            result = function(*args)
+        except BaseException as exception:
+            self._record_remote_failure(exception)
+            raise
+        self._circuit_breaker.record_success()
+        return result
+
+    def _acquire_circuit(self):
+        """Checks that a call to the remote repository may be attempted.
+
+        Raises
+        ------
+        CircuitOpenError
+            If the circuit of the repository is open.
+        """
+        if not self._circuit_breaker.allow_request():
+            raise CircuitOpenError(
+                f"The circuit of the repository {self.repository()} is open "
+                f"until {self._circuit_breaker.get_retry_at()}."
+            )
+
+    def _record_remote_failure(self, exception: BaseException):
+        """Records in the circuit breaker the failure of a call to the remote repository."""
+        if isinstance(exception, Exception) and self.retry_policy.is_retryable(
+            exception
+        ):
+            self._circuit_breaker.record_failure()
+        else:
+            # Errors such as invalid inputs, or an interruption upon shutdown,
+            # say nothing about the health of the repository.
+            self._circuit_breaker.record_release()
+
+    def _enrich_through_cache(self, enrichable, task: Task) -> Any:
+        """Enrich the metadata of a enrichable class, using the cached result if available."""
+        cache_input = self._get_cache_input(enrichable)
+        if cache_input is None:
+            return self._enrich(enrichable, task)
+
+        result = self.result_cache.get(
+            enricher=self.name(), version=self.version(), cache_input=cache_input
+        )
+        if result is not None:
+            self._logger.info(f"Enriching task {task.id} from a cached result.")
+            applied = self._enrich_from_cache(enrichable, task, result)
+            if applied is not None:
+                return applied
+            # The cached result cannot be applied anymore, so it is
+            # recomputed as if it were missing, and replaced.
+            self._logger.info(
+                f"The cached result of task {task.id} is stale, enriching it again."
+            )
+
+        result = self._enrich(enrichable, task)
+        if result:
+            self.result_cache.put(
+                enricher=self.name(),
+                version=self.version(),
+                cache_input=cache_input,
+                result=result,
+            )
+        return result
+
     def enrich(self, enrichable) -> bool:
         """Enrich the metadata of a enrichable class.
 
@@ -171,45 +785,278 @@ class Enricher:
         enrichable
             enrichable class to enrich.
         """
-        if not self._can_enrich(enrichable):
+        if not self._select_enrichables([enrichable]):
             raise ValueError(
                 f"The enricher {self.name()} cannot "
                 f"enrich the {enrichable.__class__.__name__} class."
             )
 
-        task = self._create_new_task(enrichable)
+        try:
+            return self._enrich_eligible(enrichable)
+        finally:
+            self._admission_budget = None
+            self._flush_results()
 
-        while not self._task_can_start(enrichable, task):
-            sleep(self._get_sleep_time_between_start_attempts())
+    def _enrich_eligible(self, enrichable) -> bool:
+        """Enrich the metadata of an enrichable class whose eligibility was checked.
+
+        Parameters
+        ----------
+        enrichable
+            enrichable class to enrich.
+        """
+        task = self._claim_task(enrichable)
+        if task is None:
+            return False
 
         task.start(session=self._session)
+        self._in_flight_task_id = task.id
         try:
-            success = self._enrich(enrichable, task)
-            task.success(session=self._session)
+            with Heartbeat(
+                task_id=task.id,
+                interval=self._get_heartbeat_interval(),
+                logger=self._logger,
+            ), ResourceAccounting(
+                task_id=task.id, attempt=task.attempts, logger=self._logger
+            ), self._metrics.time_enrichment(
+                self._get_task_type_name(task)
+            ):
+                success = bool(self._enrich_through_cache(enrichable, task))
+            # The success is only recorded once the result is written.
+            self._result_writer.complete(task.id)
+        except ShutdownRequested:
+            self._result_writer.discard(task.id)
+            self._release_interrupted_task(task)
+            raise
         except Exception as reason_for_failure:
             success = False
-            task.failure(session=self._session, reason=reason_for_failure)
+            self._result_writer.discard(task.id)
+            self._handle_failure(task, reason_for_failure)
+        finally:
+            self._in_flight_task_id = None
 
+        if self._result_writer.should_flush():
+            self._flush_results()
         return success
 
+    def _release_interrupted_task(self, task: Task):
+        """Releases the provided task, whose enrichment was interrupted by a shutdown."""
+        # The shutdown may have interrupted a query, so we first discard
+        # the pending changes of the session before releasing the task.
+        self._session.rollback()
+        self._logger.warning(
+            f"Releasing task {task.id}, as the enricher is shutting down."
+        )
+        task.release(session=self._session, count_attempt=False)
+        self._metrics.record_outcome("released")
+
+    def _handle_failure(self, task: Task, reason_for_failure: Exception):
+        """Defers, retries or fails the provided task, whose enrichment raised an exception.
+
+        Parameters
+        ----------
+        task
+            task whose enrichment failed.
+        reason_for_failure
+            exception raised by the enrichment.
+        """
+        if isinstance(reason_for_failure, CircuitOpenError) or (
+            self.retry_policy.is_retryable(reason_for_failure)
+            and self._circuit_breaker.is_open()
+        ):
+            next_attempt_at = self._circuit_breaker.get_retry_at()
+            self._logger.warning(
+                f"Deferring task {task.id} after {reason_for_failure!r}, "
+                f"as the circuit of the repository {self.repository()} is open, "
+                f"until {next_attempt_at}."
+            )
+            task.retry(
+                session=self._session,
+                next_attempt_at=next_attempt_at,
+                count_attempt=False,
+            )
+            self._metrics.record_outcome("deferred")
+        elif self.retry_policy.should_retry(reason_for_failure, task.attempts):
+            next_attempt_at = self.retry_policy.get_next_attempt_at(task.attempts)
+            self._logger.warning(
+                f"Attempt {task.attempts} of task {task.id} failed with "
+                f"{reason_for_failure!r}, retrying after {next_attempt_at}."
+            )
+            task.retry(session=self._session, next_attempt_at=next_attempt_at)
+            self._metrics.record_outcome("retry")
+        else:
+            task.failure(session=self._session, reason=reason_for_failure)
+            self._metrics.record_outcome("failure")
+
     def enrich_all(self) -> bool:
         """Enrich the metadata of all the enrichable classes."""
         some_success = False
-        for enrichable in self._get_new_elements_to_enrich():
-            some_success |= self.enrich(enrichable)
+        with closing(self._get_new_elements_to_enrich()) as enrichables:
+            try:
+                while True:
+                    # The eligibility of the candidates is checked one chunk at a time.
+                    batch = list(islice(enrichables, self._get_discovery_chunk_size()))
+                    if not batch:
+                        break
+                    # And so is the number of new tasks that may be admitted.
+                    self._refresh_admission_budget()
+                    eligible = self._select_enrichables(batch)
+                    self._prepare_batch(eligible)
+                    for enrichable in eligible:
+                        # Once a shutdown is requested, no new work is claimed.
+                        if self.is_stopping():
+                            return some_success
+                        some_success |= self._enrich_eligible(enrichable)
+                        self._complete_item()
+            finally:
+                self._admission_budget = None
+                self._flush_results()
         return some_success
 
-    def start_service(self):
-        """Start the enricher service."""
+    def get_shutdown_deadline(self) -> int:
+        """Returns the number of seconds granted to the in-flight item upon shutdown.
+
+        Implementative details
+        ----------------------
+        The deadline must be shorter than the grace period of the container,
+        after which the container is killed without releasing its claims.
+        """
+        return 20
+
+    def request_stop(self):
+        """Request the enricher to stop claiming new work."""
+        self._stop_requested.set()
+
+    def is_stopping(self) -> bool:
+        """Returns whether the enricher was requested to stop."""
+        return self._stop_requested.is_set()
+
+    def release_in_flight_task(self):
+        """Releases the claim of the in-flight task, if any, so another replica can resume it.
+
+        Implementative details
+        ----------------------
+        This method is meant to be called from a thread other than the one executing
+        the in-flight task, and therefore uses its own session.
+        """
+        task_id = self._in_flight_task_id
+        if task_id is not None:
+            self._release_task(task_id)
+
+    def flush_pending_results(self):
+        """Writes the buffered results of the completed items, using its own session.
+
+        Implementative details
+        ----------------------
+        As release_in_flight_task, this method is meant to be called from a thread
+        other than the one executing the round, when the round is abandoned upon
+        shutdown, so that the items it already completed are not enriched again.
+        The tasks whose results cannot be written are released instead.
+        """
+        session = Session()
+        try:
+            self._result_writer.flush(
+                session,
+                on_failure=self._release_unwritten_task,
+                on_success=self._record_write_success,
+            )
+        finally:
+            session.close()
+
+    def _release_unwritten_task(self, task_id: int, reason_for_failure: Exception):
+        """Releases the provided completed task, whose result rows could not be written upon shutdown."""
+        self._logger.warning(
+            f"Unable to store the result of task {task_id}: {reason_for_failure!r}."
+        )
+        self._release_task(task_id)
+        self._metrics.record_outcome("released")
+
+    def _release_task(self, task_id: int):
+        """Releases the claim of the provided task, if it is still running, using its own session."""
+        session = Session()
+        try:
+            task = Task.from_id(task_id, session=session)
+            if task.status == "STARTED":
+                self._logger.warning(
+                    f"Releasing task {task_id}, as the enricher is shutting down."
+                )
+                task.release(session=session, count_attempt=False)
+        finally:
+            session.close()
+
+    def get_next_sleep_time(self, sleep_time: float, some_success: bool) -> float:
+        """Returns the number of seconds to sleep before the next round.
+
+        Parameters
+        ----------
+        sleep_time
+            number of seconds slept before the round that just completed.
+        some_success
+            whether the round that just completed enriched some element.
+
+        Implementative details
+        ----------------------
+        The sleep time is halved after a productive round and doubled after
+        an idle one, between one second and one minute.
+        """
         minimal_sleep_time = 1
         maximal_sleep_time = 60
-        sleep_time_seconds = minimal_sleep_time
-        self._logger.info(f"Starting the {self.name()} enricher service.")
-        while True:
-            some_success = self.enrich_all()
-            if some_success:
-                self._logger.info("Completed a round of enrichment.")
-                sleep_time_seconds = max(minimal_sleep_time, sleep_time_seconds / 2)
-            else:
-                sleep_time_seconds = min(2 * sleep_time_seconds, maximal_sleep_time)
-            sleep(sleep_time_seconds)
+        if some_success:
+            return max(minimal_sleep_time, sleep_time / 2)
+        return min(2 * sleep_time, maximal_sleep_time)
+
+    def run_round(self) -> bool:
+        """Run a single round of the enricher service.
+
+        Returns
+        -------
+        Whether some element was enriched in this round.
+        """
+        self._reap_stale_tasks()
+        self._evict_cached_results()
+        self._update_queue_depth()
+        some_success = self.enrich_all()
+        self._recycle_session()
+        if some_success:
+            self._logger.info("Completed a round of enrichment.")
+        return some_success
+
+    def record_idle_time(self, seconds: float):
+        """Record the time the enricher spent sleeping between two rounds."""
+        self._metrics.record_idle_time(seconds)
+
+    def start_service(self, metrics_port: Optional[int] = None):
+        """Start the enricher service.
+
+        Parameters
+        ----------
+        metrics_port
+            port on which the Prometheus metrics are exposed. By default,
+            the ENRICHER_METRICS_PORT environment variable is used, or 9100
+            if it is not set.
+        """
+        metrics_port = serve_metrics(metrics_port)
+        sleep_time_seconds = 1
+        self._logger.info(
+            f"Starting the {self.name()} enricher service, "
+            f"exposing metrics on port {metrics_port}."
+        )
+        with handle_shutdown_signals(
+            on_stop=self.request_stop,
+            deadline=self.get_shutdown_deadline(),
+            logger=self._logger,
+        ):
+            try:
+                while not self.is_stopping():
+                    some_success = self.run_round()
+                    sleep_time_seconds = self.get_next_sleep_time(
+                        sleep_time_seconds, some_success
+                    )
+                    # The sleep is interrupted as soon as a shutdown is requested.
+                    self._stop_requested.wait(sleep_time_seconds)
+                    self.record_idle_time(sleep_time_seconds)
+            except ShutdownRequested as shutdown:
+                self._logger.warning(f"Interrupted the in-flight work: {shutdown}")
+        self._session.close()
+        stop_metrics(metrics_port)
+        self._logger.info(f"Stopped the {self.name()} enricher service.")
@@ -0,0 +1,68 @@
+"""Submodule providing the background heartbeat of running enrichment tasks.
+
+Implementative details
+----------------------
+While an enricher is executing a task, a daemon thread periodically updates the
+heartbeat_at column of the task. The thread uses its own database session, as
+SQLAlchemy sessions must not be shared across threads, and it only ever touches
+the heartbeat of the task it was started for.
+
+If the enricher container is killed, the heartbeat stops being updated and the
+task lease eventually expires, so that the reaper can recover the task.
+"""
+from threading import Event, Thread
+import logging
+from alchemy_wrapper import Session
+from alchemy_wrapper.models import Task
+
+
+class Heartbeat:
+    """Context manager periodically recording that a task is still running."""
+
+    def __init__(self, task_id: int, interval: float, logger: logging.Logger) -> None:
+        """Initialize the heartbeat.
+
+        Parameters
+        ----------
+        task_id
+            id of the task whose heartbeat should be updated.
+        interval
+            number of seconds between two heartbeats.
+        logger
+            logger to report heartbeat failures to.
+        """
+        self._task_id = task_id
+        self._interval = interval
+        self._logger = logger
+        self._stopped = Event()
+        self._thread = Thread(
+            target=self._run, name=f"heartbeat-task-{task_id}", daemon=True
+        )
+
+    def _beat(self):
+        """Update the heartbeat of the task."""
+        session = Session()
+        try:
+            Task.from_id(self._task_id, session=session).heartbeat(session=session)
+        finally:
+            session.close()
+
+    def _run(self):
+        """Update the heartbeat of the task until stopped."""
+        while not self._stopped.wait(self._interval):
+            try:
+                self._beat()
+            except Exception:
+                # A failed heartbeat must never interrupt the enrichment:
+                # at worst, the lease expires and the task is retried.
+                self._logger.exception(
+                    f"Unable to update the heartbeat of task {self._task_id}."
+                )
+
+    def __enter__(self) -> "Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stopped.set()
+        self._thread.join()
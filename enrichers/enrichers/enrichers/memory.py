@@ -0,0 +1,52 @@
+"""Submodule providing the measurement of the memory used by the enricher process.
+
+Implementative details
+----------------------
+The resident set size is read from /proc/self/statm, which is available in the
+Linux containers in which the enrichers run. On other platforms, the memory usage
+is reported as zero, so that the memory watermark of the enrichers is never hit.
+"""
+from typing import Optional
+import os
+
+
+def get_resident_memory() -> int:
+    """Returns the number of bytes of memory currently resident for this process."""
+    try:
+        with open("/proc/self/statm", "r", encoding="utf8") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return 0
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def reset_peak_resident_memory() -> bool:
+    """Resets the peak resident memory of this process to its current resident memory.
+
+    Implementative details
+    ----------------------
+    Writing 5 to /proc/self/clear_refs resets the peak resident set size reported
+    as VmHWM, which is supported since Linux 4.0.
+
+    Returns
+    -------
+    Whether the peak resident memory could be reset.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="utf8") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def get_peak_resident_memory() -> Optional[int]:
+    """Returns the peak number of bytes of memory resident for this process, if known."""
+    try:
+        with open("/proc/self/status", "r", encoding="utf8") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
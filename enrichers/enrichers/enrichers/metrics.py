@@ -0,0 +1,186 @@
+"""Submodule providing the Prometheus metrics of the enrichers.
+
+Implementative details
+----------------------
+The metrics are registered once per process in the default Prometheus registry, and
+are labelled by enricher, so that several enrichers hosted in the same process share
+the same metrics endpoint. The endpoint is an HTTP server running in a daemon thread,
+which exposes the metrics in the Prometheus text format, and is stopped along with
+the service hosting the enrichers.
+
+The following metrics are exposed:
+
+* enricher_queue_depth: number of tasks handled by the enricher, per status.
+* enricher_items_total: number of enriched items, per outcome (success, failure, retry,
+  released upon shutdown, deferred by the circuit breaker, throttled by the admission
+  control or coalesced with an existing task).
+* enricher_enrichment_duration_seconds: histogram of the enrichment latency, per task type.
+* enricher_remote_call_duration_seconds: histogram of the latency of the calls to the
+  remote repositories, per endpoint.
+* enricher_idle_seconds_total: time spent sleeping between two rounds of enrichment.
+* enricher_circuit_breaker_state: state of the circuit breaker of each remote repository,
+  0 when closed, 1 when half-open and 2 when open.
+"""
+from typing import Any, Dict, Optional
+from threading import Lock
+import os
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+# Enrichment latencies range from milliseconds, for a cached remote lookup,
+# to hours, for a complete run of the dirty pipeline.
+ENRICHMENT_BUCKETS = (
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+    900.0,
+    3600.0,
+    4 * 3600.0,
+    12 * 3600.0,
+)
+
+QUEUE_DEPTH = Gauge(
+    "enricher_queue_depth",
+    "Number of tasks handled by the enricher, per status.",
+    ["enricher", "status"],
+)
+ITEMS = Counter(
+    "enricher_items",
+    "Number of items processed by the enricher, per outcome.",
+    ["enricher", "outcome"],
+)
+ENRICHMENT_DURATION = Histogram(
+    "enricher_enrichment_duration_seconds",
+    "Time required to enrich an item, per task type.",
+    ["enricher", "task_type"],
+    buckets=ENRICHMENT_BUCKETS,
+)
+REMOTE_CALL_DURATION = Histogram(
+    "enricher_remote_call_duration_seconds",
+    "Time required by the calls to the remote repositories, per endpoint.",
+    ["repository", "endpoint"],
+)
+IDLE_TIME = Counter(
+    "enricher_idle_seconds",
+    "Time spent sleeping between two rounds of enrichment.",
+    ["enricher"],
+)
+
+CIRCUIT_BREAKER_STATE = Gauge(
+    "enricher_circuit_breaker_state",
+    "State of the circuit breaker of the repository: 0 closed, 1 half-open, 2 open.",
+    ["repository"],
+)
+CIRCUIT_BREAKER_STATES = {"closed": 0, "half-open": 1, "open": 2}
+
+# The HTTP servers exposing the metrics, by port.
+_SERVERS: Dict[int, Any] = {}
+_SERVERS_LOCK = Lock()
+
+
+def serve_metrics(port: Optional[int] = None) -> int:
+    """Start the metrics HTTP endpoint on the provided port, unless already started.
+
+    Parameters
+    ----------
+    port
+        port on which the metrics are exposed. By default, the
+        ENRICHER_METRICS_PORT environment variable is used, or 9100
+        if it is not set.
+
+    Returns
+    -------
+    The port on which the metrics are exposed.
+    """
+    if port is None:
+        port = int(os.environ.get("ENRICHER_METRICS_PORT", 9100))
+    with _SERVERS_LOCK:
+        if port not in _SERVERS:
+            # Versions of the client before 0.17 do not return the server.
+            started = start_http_server(port)
+            _SERVERS[port] = started[0] if started else None
+    return port
+
+
+def stop_metrics(port: int):
+    """Stop the metrics HTTP endpoint started on the provided port, if any.
+
+    Parameters
+    ----------
+    port
+        port on which the metrics are exposed, as returned by serve_metrics.
+    """
+    with _SERVERS_LOCK:
+        server = _SERVERS.pop(port, None)
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+
+def time_remote_call(repository: str, endpoint: str):
+    """Returns a context manager measuring the latency of a call to a remote repository.
+
+    Parameters
+    ----------
+    repository
+        name of the remote repository, as returned by Enricher.repository.
+    endpoint
+        name of the called endpoint of the repository.
+    """
+    return REMOTE_CALL_DURATION.labels(repository=repository, endpoint=endpoint).time()
+
+
+def set_circuit_breaker_state(repository: str, state: str):
+    """Set the state of the circuit breaker of the provided repository.
+
+    Parameters
+    ----------
+    repository
+        name of the remote repository, as returned by Enricher.repository.
+    state
+        state of the circuit breaker, one of closed, half-open and open.
+    """
+    CIRCUIT_BREAKER_STATE.labels(repository=repository).set(
+        CIRCUIT_BREAKER_STATES[state]
+    )
+
+
+class EnricherMetrics:
+    """Metrics of a specific enricher."""
+
+    def __init__(self, enricher_name: str) -> None:
+        """Initialize the metrics of the enricher.
+
+        Parameters
+        ----------
+        enricher_name
+            name of the enricher, used as the value of the enricher label.
+        """
+        self._enricher_name = enricher_name
+
+    def set_queue_depth(self, tasks_per_status: Dict[str, int]):
+        """Set the number of tasks handled by the enricher, per status."""
+        for status in ("PENDING", "STARTED", "SUCCESS", "FAILURE"):
+            QUEUE_DEPTH.labels(enricher=self._enricher_name, status=status).set(
+                tasks_per_status.get(status, 0)
+            )
+
+    def record_outcome(self, outcome: str):
+        """Record the outcome of the enrichment of an item."""
+        ITEMS.labels(enricher=self._enricher_name, outcome=outcome).inc()
+
+    def time_enrichment(self, task_type: str):
+        """Returns a context manager measuring the enrichment latency of the task type."""
+        return ENRICHMENT_DURATION.labels(
+            enricher=self._enricher_name, task_type=task_type
+        ).time()
+
+    def record_idle_time(self, seconds: float):
+        """Record the time spent sleeping between two rounds of enrichment."""
+        IDLE_TIME.labels(enricher=self._enricher_name).inc(seconds)
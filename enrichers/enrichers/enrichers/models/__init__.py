@@ -1,4 +1,6 @@
 """Submodule providing table interfaces associated to the enrichers service."""
 from .taxon_enrichment_task import TaxonEnrichmentTask
+from .enrichment_cache_entry import EnrichmentCacheEntry
+from .enrichment_claim import EnrichmentClaim
 
-__all__ = ["TaxonEnrichmentTask"]
+__all__ = ["TaxonEnrichmentTask", "EnrichmentCacheEntry", "EnrichmentClaim"]
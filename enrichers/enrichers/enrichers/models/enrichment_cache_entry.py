@@ -0,0 +1,32 @@
+"""SQLAlchemy table for the results cached by the enrichers."""
+
+from sqlalchemy import Column, DateTime, Integer, JSON, String, UniqueConstraint
+from sqlalchemy.sql import func
+from alchemy_wrapper.models.base import Base
+
+
+class EnrichmentCacheEntry(Base):
+    """Define the EnrichmentCacheEntry model."""
+
+    __tablename__ = "enrichment_cache"
+
+    id = Column(Integer, primary_key=True)
+    # The name of the enricher that produced the result.
+    enricher = Column(String(255), nullable=False)
+    # The version of the enricher that produced the result, so that
+    # the results of previous versions are not used anymore.
+    version = Column(String(80), nullable=False)
+    # The SHA256 hash of the normalized input of the enrichment.
+    input_hash = Column(String(64), nullable=False)
+    result = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=func.now())
+    # The last time the entry was used, used for the least recently used eviction.
+    accessed_at = Column(DateTime, nullable=False, default=func.now())
+    expires_at = Column(DateTime, nullable=False)
+
+    # The combination of enricher, version and input hash has to be unique.
+    __table_args__ = (UniqueConstraint("enricher", "version", "input_hash"),)
+
+    def __repr__(self):
+        """Represent instance as a unique string."""
+        return f"<EnrichmentCacheEntry({self.enricher!r}, {self.input_hash!r})>"
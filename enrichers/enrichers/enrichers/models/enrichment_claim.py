@@ -0,0 +1,33 @@
+"""SQLAlchemy table for the claims of the enrichers over their enrichables."""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.sql import func
+from alchemy_wrapper.models.base import Base
+
+
+class EnrichmentClaim(Base):
+    """Define the EnrichmentClaim model."""
+
+    __tablename__ = "enrichment_claims"
+
+    id = Column(Integer, primary_key=True)
+    # The name of the enricher holding the claim.
+    enricher = Column(String(255), nullable=False)
+    # The id of the claimed enrichable, such as the id of a taxon.
+    enrichable_id = Column(Integer, nullable=False)
+    # The latest task created for the enrichable by the enricher, to which
+    # the new requests for the same enrichable are attached.
+    task_id = Column(
+        Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False
+    )
+    created_at = Column(DateTime, nullable=False, default=func.now())
+    updated_at = Column(
+        DateTime, nullable=False, default=func.now(), onupdate=func.now()
+    )
+
+    # An enricher holds at most one claim over each enrichable.
+    __table_args__ = (UniqueConstraint("enricher", "enrichable_id"),)
+
+    def __repr__(self):
+        """Represent instance as a unique string."""
+        return f"<EnrichmentClaim({self.enricher!r}, {self.enrichable_id!r})>"
@@ -0,0 +1,75 @@
+"""Submodule providing the reaper of tasks abandoned by crashed enrichers.
+
+Implementative details
+----------------------
+When an enricher starts a task, it takes a lease on it which it renews through
+periodic heartbeats. If the enricher container is killed mid-run, the heartbeats
+stop and the task would otherwise remain STARTED forever.
+
+The reaper looks for STARTED tasks whose last heartbeat (or, for tasks started
+before heartbeats were introduced, whose start time) is older than the lease
+duration. Such tasks are put back to PENDING so that they are picked up again,
+unless they have already been attempted the maximal number of times, in which
+case they are marked as failed.
+
+The stale tasks are locked, skipping the ones locked by another replica, and they are all
+updated before a single commit: committing after each task would release the locks of the
+remaining ones, which another replica could then reap concurrently.
+"""
+from typing import List, Type
+import datetime
+from sqlalchemy import func
+from alchemy_wrapper import Session
+from alchemy_wrapper.models import Task
+
+
+def reap_stale_tasks(
+    session: Type[Session],
+    task_type_ids: List[int],
+    lease_duration: datetime.timedelta,
+    maximal_number_of_attempts: int,
+) -> List[Task]:
+    """Recover the tasks whose lease has expired, returning them.
+
+    Parameters
+    ----------
+    session
+        session to use to query and update the tasks.
+    task_type_ids
+        ids of the task types whose tasks should be reaped.
+    lease_duration
+        time after the last heartbeat after which a task is considered abandoned.
+    maximal_number_of_attempts
+        number of attempts after which an abandoned task is marked as failed
+        instead of being put back to PENDING.
+    """
+    expiration = datetime.datetime.now() - lease_duration
+
+    # We lock the stale tasks so that two replicas of the same enricher
+    # do not reap the same task concurrently.
+    stale_tasks = (
+        session.query(Task)
+        .filter(
+            Task.status == "STARTED",
+            Task.task_type_id.in_(task_type_ids),
+            func.coalesce(Task.heartbeat_at, Task.started_at) < expiration,
+        )
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    for task in stale_tasks:
+        if task.attempts >= maximal_number_of_attempts:
+            task.failure(
+                session=session,
+                reason=(
+                    f"The lease of task {task.id} expired after {task.attempts} "
+                    "attempts, as the enricher executing it stopped responding."
+                ),
+                commit=False,
+            )
+        else:
+            task.release(session=session, commit=False)
+    session.commit()
+
+    return stale_tasks
@@ -0,0 +1,156 @@
+"""Submodule providing the accounting of the resources consumed by the tasks.
+
+Implementative details
+----------------------
+The resources consumed by each attempt of a task are measured as the difference
+between two snapshots, taken before and after the attempt, and stored in the
+task_resource_usage table:
+
+* the wall time;
+* the user and system CPU time of the thread executing the task, where supported,
+  and of the child processes reaped in the meantime, such as the steps of the
+  dirty pipeline;
+* the peak resident memory of the process, and the peak resident memory of the
+  largest child process, when a child larger than the ones reaped before the
+  attempt was reaped during it;
+* the bytes read from and written to the storage by the process and its children.
+
+The memory and I/O counters are process-wide, so when several enrichers are hosted
+in the same process they include the concurrent work of the other enrichers. In
+particular, the peak resident memory can only be reset for the whole process: it is
+reset when an attempt begins while no other attempt is measured, so that it is never
+lowered under the feet of a concurrent attempt. The peak of an attempt is therefore
+the peak of the process since the earliest of the attempts overlapping with it began,
+which is an upper bound of the memory the attempt itself required.
+
+The usage is stored with its own short-lived session, and a failure to store it is
+only logged, as the accounting must never interrupt the enrichment.
+"""
+from typing import Dict, Optional
+from threading import Lock
+from time import perf_counter
+import logging
+import resource
+from alchemy_wrapper import Session
+from alchemy_wrapper.models import TaskResourceUsage
+from .memory import get_peak_resident_memory, reset_peak_resident_memory
+
+# The CPU time of the thread executing the task is only available on Linux.
+RUSAGE_TASK = getattr(resource, "RUSAGE_THREAD", resource.RUSAGE_SELF)
+
+# The number of attempts currently measured in the process, and whether
+# the peak resident memory was reset when the first of them began.
+_ACTIVE_ATTEMPTS_LOCK = Lock()
+_number_of_active_attempts = 0
+_peak_rss_was_reset = False
+
+
+def read_io_counters() -> Dict[str, Optional[int]]:
+    """Returns the number of bytes read from and written to the storage by the process."""
+    counters = {"read_bytes": None, "write_bytes": None}
+    try:
+        with open("/proc/self/io", "r", encoding="utf8") as io_counters:
+            for line in io_counters:
+                key, value = line.split(":")
+                if key in counters:
+                    counters[key] = int(value)
+    except (OSError, ValueError):
+        pass
+    return counters
+
+
+def _get_difference(after: Optional[int], before: Optional[int]) -> Optional[int]:
+    """Returns the difference between the two counters, if both are known."""
+    if after is None or before is None:
+        return None
+    return after - before
+
+
+class ResourceAccounting:
+    """Context manager measuring and storing the resources consumed by a task attempt."""
+
+    def __init__(self, task_id: int, attempt: int, logger: logging.Logger) -> None:
+        """Initialize the accounting of the task attempt.
+
+        Parameters
+        ----------
+        task_id
+            id of the task whose attempt is measured.
+        attempt
+            number of the attempt of the task, starting from one.
+        logger
+            logger to report storage failures to.
+        """
+        self._task_id = task_id
+        self._attempt = attempt
+        self._logger = logger
+
+    def __enter__(self) -> "ResourceAccounting":
+        global _number_of_active_attempts, _peak_rss_was_reset
+        with _ACTIVE_ATTEMPTS_LOCK:
+            if _number_of_active_attempts == 0:
+                _peak_rss_was_reset = reset_peak_resident_memory()
+            _number_of_active_attempts += 1
+            self._peak_rss_was_reset = _peak_rss_was_reset
+        self._task_usage = resource.getrusage(RUSAGE_TASK)
+        self._children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        self._io_counters = read_io_counters()
+        self._started_at = perf_counter()
+        return self
+
+    def _measure(self) -> TaskResourceUsage:
+        """Returns the resources consumed since the beginning of the attempt."""
+        wall_time = perf_counter() - self._started_at
+        task_usage = resource.getrusage(RUSAGE_TASK)
+        children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        io_counters = read_io_counters()
+
+        # The maximal resident set sizes are reported in kilobytes on Linux.
+        peak_rss = get_peak_resident_memory() if self._peak_rss_was_reset else None
+        if peak_rss is None:
+            peak_rss = task_usage.ru_maxrss * 1024
+        children_peak_rss = (
+            children_usage.ru_maxrss * 1024
+            if children_usage.ru_maxrss > self._children_usage.ru_maxrss
+            else None
+        )
+
+        return TaskResourceUsage(
+            task_id=self._task_id,
+            attempt=self._attempt,
+            wall_time=wall_time,
+            user_cpu_time=task_usage.ru_utime - self._task_usage.ru_utime,
+            system_cpu_time=task_usage.ru_stime - self._task_usage.ru_stime,
+            children_user_cpu_time=children_usage.ru_utime
+            - self._children_usage.ru_utime,
+            children_system_cpu_time=children_usage.ru_stime
+            - self._children_usage.ru_stime,
+            peak_rss=peak_rss,
+            children_peak_rss=children_peak_rss,
+            read_bytes=_get_difference(
+                io_counters["read_bytes"], self._io_counters["read_bytes"]
+            ),
+            written_bytes=_get_difference(
+                io_counters["write_bytes"], self._io_counters["write_bytes"]
+            ),
+        )
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _number_of_active_attempts
+        try:
+            usage = self._measure()
+        finally:
+            with _ACTIVE_ATTEMPTS_LOCK:
+                _number_of_active_attempts -= 1
+
+        session = Session()
+        try:
+            session.add(usage)
+            session.commit()
+        except Exception:
+            session.rollback()
+            self._logger.exception(
+                f"Unable to store the resource usage of task {self._task_id}."
+            )
+        finally:
+            session.close()
@@ -0,0 +1,218 @@
+"""Submodule providing the result cache shared by all the enrichers.
+
+Implementative details
+----------------------
+Several enrichment requests may involve identical work: for instance, two users may
+create a taxon with the same name, or the same data payload may be uploaded twice.
+Enrichers whose results only depend on a normalized version of their input may store
+their results in the enrichment_cache table, keyed by the name and version of the
+enricher and by the SHA256 hash of the normalized input.
+
+Each entry expires after a time to live, and the number of entries of each enricher is
+bounded: when the bound is exceeded, the least recently used entries are evicted.
+
+The cache uses its own short-lived sessions, so that a failure of the cache, such as
+two replicas storing the same result concurrently, never affects the session used for
+the enrichment itself.
+"""
+from typing import Any, List, Optional
+import datetime
+import hashlib
+import json
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from alchemy_wrapper import Session
+from .models import EnrichmentCacheEntry
+
+
+def hash_cache_input(cache_input: Any) -> str:
+    """Returns the SHA256 hash of the provided JSON-serializable input.
+
+    Parameters
+    ----------
+    cache_input
+        normalized input of the enrichment.
+    """
+    return hashlib.sha256(
+        json.dumps(cache_input, sort_keys=True, separators=(",", ":")).encode("utf8")
+    ).hexdigest()
+
+
+class ResultCache:
+    """Cache of the enrichment results, stored in the enrichment_cache table."""
+
+    def __init__(
+        self,
+        time_to_live: datetime.timedelta = datetime.timedelta(days=30),
+        maximal_number_of_entries: int = 100_000,
+    ) -> None:
+        """Initialize the result cache.
+
+        Parameters
+        ----------
+        time_to_live
+            time after which a cached result is not used anymore.
+        maximal_number_of_entries
+            maximal number of cached results per enricher.
+        """
+        self.time_to_live = time_to_live
+        self.maximal_number_of_entries = maximal_number_of_entries
+
+    def get(self, enricher: str, version: str, cache_input: Any) -> Optional[Any]:
+        """Returns the cached result for the provided input, if any.
+
+        Parameters
+        ----------
+        enricher
+            name of the enricher.
+        version
+            version of the enricher.
+        cache_input
+            normalized input of the enrichment.
+        """
+        session = Session()
+        try:
+            entry = (
+                session.query(EnrichmentCacheEntry)
+                .filter(
+                    EnrichmentCacheEntry.enricher == enricher,
+                    EnrichmentCacheEntry.version == version,
+                    EnrichmentCacheEntry.input_hash == hash_cache_input(cache_input),
+                    EnrichmentCacheEntry.expires_at > datetime.datetime.now(),
+                )
+                .first()
+            )
+            if entry is None:
+                return None
+            entry.accessed_at = datetime.datetime.now()
+            result = entry.result
+            session.commit()
+            return result
+        finally:
+            session.close()
+
+    def put(self, enricher: str, version: str, cache_input: Any, result: Any):
+        """Stores the result of the enrichment of the provided input.
+
+        Parameters
+        ----------
+        enricher
+            name of the enricher.
+        version
+            version of the enricher.
+        cache_input
+            normalized input of the enrichment.
+        result
+            JSON-serializable result of the enrichment.
+        """
+        now = datetime.datetime.now()
+        session = Session()
+        try:
+            input_hash = hash_cache_input(cache_input)
+            entry = (
+                session.query(EnrichmentCacheEntry)
+                .filter_by(enricher=enricher, version=version, input_hash=input_hash)
+                .first()
+            )
+            if entry is None:
+                entry = EnrichmentCacheEntry(
+                    enricher=enricher,
+                    version=version,
+                    input_hash=input_hash,
+                )
+                session.add(entry)
+            entry.result = result
+            entry.accessed_at = now
+            entry.expires_at = now + self.time_to_live
+            session.commit()
+        except IntegrityError:
+            # Another replica stored the same result in the meantime.
+            session.rollback()
+        finally:
+            session.close()
+
+    def invalidate(self, enricher: str, version: str, cache_inputs: List[Any]) -> int:
+        """Removes the cached results of the provided inputs, which are outdated.
+
+        Parameters
+        ----------
+        enricher
+            name of the enricher.
+        version
+            version of the enricher.
+        cache_inputs
+            normalized inputs of the enrichments.
+
+        Returns
+        -------
+        The number of removed entries.
+        """
+        if not cache_inputs:
+            return 0
+        session = Session()
+        try:
+            removed = (
+                session.query(EnrichmentCacheEntry)
+                .filter(
+                    EnrichmentCacheEntry.enricher == enricher,
+                    EnrichmentCacheEntry.version == version,
+                    EnrichmentCacheEntry.input_hash.in_(
+                        [hash_cache_input(cache_input) for cache_input in cache_inputs]
+                    ),
+                )
+                .delete(synchronize_session=False)
+            )
+            session.commit()
+            return removed
+        finally:
+            session.close()
+
+    def evict(self, enricher: str, version: str) -> int:
+        """Evicts the expired, outdated and least recently used entries of the enricher.
+
+        Parameters
+        ----------
+        enricher
+            name of the enricher.
+        version
+            current version of the enricher.
+
+        Returns
+        -------
+        The number of evicted entries.
+        """
+        session = Session()
+        try:
+            evicted = (
+                session.query(EnrichmentCacheEntry)
+                .filter(
+                    EnrichmentCacheEntry.enricher == enricher,
+                    (EnrichmentCacheEntry.version != version)
+                    | (EnrichmentCacheEntry.expires_at <= datetime.datetime.now()),
+                )
+                .delete(synchronize_session=False)
+            )
+
+            number_of_entries = (
+                session.query(func.count(EnrichmentCacheEntry.id))
+                .filter(EnrichmentCacheEntry.enricher == enricher)
+                .scalar()
+            )
+
+            if number_of_entries > self.maximal_number_of_entries:
+                least_recently_used = (
+                    session.query(EnrichmentCacheEntry.id)
+                    .filter(EnrichmentCacheEntry.enricher == enricher)
+                    .order_by(EnrichmentCacheEntry.accessed_at)
+                    .limit(number_of_entries - self.maximal_number_of_entries)
+                )
+                evicted += (
+                    session.query(EnrichmentCacheEntry)
+                    .filter(EnrichmentCacheEntry.id.in_(least_recently_used))
+                    .delete(synchronize_session=False)
+                )
+
+            session.commit()
+            return evicted
+        finally:
+            session.close()
@@ -0,0 +1,181 @@
+"""Submodule providing the buffered writer of the results of the enrichers.
+
+Implementative details
+----------------------
+Storing the result of each enriched item in its own transaction costs a round trip and a
+commit per row, which dominates the enrichment of the items resolved locally or from a
+cache. The BufferedResultWriter instead accumulates the rows of the results of the completed
+tasks, and flushes them at once, with a multi-row INSERT per table, once enough rows are
+buffered or the oldest of them has been buffered for long enough.
+
+The rows conflicting with existing ones, such as the result of the same enrichable stored
+concurrently by another replica, are skipped with ON CONFLICT DO NOTHING, so that a flush
+is idempotent. The completed tasks are marked as successful in the same transaction as the
+rows of their results: until the flush, the tasks are still STARTED, so that if the enricher
+crashes in the meantime, the tasks are recovered by the reaper and their results are never
+lost nor half-stored.
+
+Should a flush fail, the rows of each task are written again in their own transaction, so
+that only the tasks whose rows cannot be stored are reported as failed. The tasks are only
+reported as successful once their transaction is committed.
+
+The buffer is guarded by a lock, as the rows may be buffered by the coroutines of the async
+enrichers while their bookkeeping thread completes the tasks and flushes the buffer.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import defaultdict
+from threading import Lock
+from time import monotonic
+from sqlalchemy import Table
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from alchemy_wrapper.models import Task
+
+# The INSERT constructs supporting ON CONFLICT DO NOTHING, per backend.
+INSERT_CONSTRUCTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+class BufferedResultWriter:
+    """Buffer of the result rows of the completed tasks, written in batches."""
+
+    def __init__(
+        self,
+        maximal_number_of_rows: int = 500,
+        maximal_delay: float = 5.0,
+    ) -> None:
+        """Initialize the buffered result writer.
+
+        Parameters
+        ----------
+        maximal_number_of_rows
+            number of buffered rows of completed tasks above which the buffer
+            should be flushed, counting the tasks without rows as one row. With
+            one row, every completed task is flushed.
+        maximal_delay
+            number of seconds after which a completed task should be flushed.
+        """
+        self.maximal_number_of_rows = maximal_number_of_rows
+        self.maximal_delay = maximal_delay
+        self._lock = Lock()
+        # The rows of the tasks still running, which are only written
+        # once the task is completed, and discarded if it fails.
+        self._running: Dict[int, List[Tuple[Table, Dict[str, Any]]]] = defaultdict(list)
+        # The rows of the completed tasks, by task id, in order of completion.
+        self._completed: Dict[int, List[Tuple[Table, Dict[str, Any]]]] = {}
+        self._number_of_completed_rows = 0
+        self._oldest_completion: Optional[float] = None
+
+    def __len__(self) -> int:
+        """Returns the number of completed tasks waiting to be flushed."""
+        return len(self._completed)
+
+    def add(self, task_id: int, table: Any, row: Dict[str, Any]):
+        """Buffers a row of the result of the provided running task.
+
+        Parameters
+        ----------
+        task_id
+            id of the task whose result includes the row.
+        table
+            table, or model, the row belongs to.
+        row
+            values of the columns of the row, by column key.
+        """
+        with self._lock:
+            self._running[task_id].append((getattr(table, "__table__", table), row))
+
+    def complete(self, task_id: int):
+        """Marks the provided task as completed, to be flushed along with its rows."""
+        with self._lock:
+            rows = self._running.pop(task_id, [])
+            self._completed[task_id] = rows
+            self._number_of_completed_rows += max(len(rows), 1)
+            if self._oldest_completion is None:
+                self._oldest_completion = monotonic()
+
+    def discard(self, task_id: int):
+        """Discards the rows of the provided task, which did not complete."""
+        with self._lock:
+            self._running.pop(task_id, None)
+
+    def should_flush(self) -> bool:
+        """Returns whether the completed tasks should be flushed."""
+        with self._lock:
+            return bool(self._completed) and (
+                self._number_of_completed_rows >= self.maximal_number_of_rows
+                or monotonic() - self._oldest_completion >= self.maximal_delay
+            )
+
+    def _write(self, session: Session, completed: Dict[int, List[Tuple[Table, Dict]]]):
+        """Writes the rows of the provided completed tasks, and marks the tasks as successful."""
+        insert = INSERT_CONSTRUCTS[session.get_bind().dialect.name]
+        rows_by_table: Dict[Table, List[Dict[str, Any]]] = defaultdict(list)
+        for rows in completed.values():
+            for table, row in rows:
+                rows_by_table[table].append(row)
+        # The tables are written in the order their rows were buffered,
+        # so that the rows referred to by foreign keys are written first.
+        for table, rows in rows_by_table.items():
+            session.execute(insert(table).values(rows).on_conflict_do_nothing())
+        session.query(Task).filter(Task.id.in_(list(completed))).update(
+            {"status": "SUCCESS"}, synchronize_session=False
+        )
+
+    def flush(
+        self,
+        session: Session,
+        on_failure: Callable[[int, Exception], None],
+        on_success: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """Writes the rows of the completed tasks, and marks the tasks as successful.
+
+        Parameters
+        ----------
+        session
+            session to write with, which must not have pending changes.
+        on_failure
+            callback receiving the id of each task whose rows could not be
+            written, with the exception raised, after the rollback.
+        on_success
+            callback receiving the id of each task marked as successful,
+            after the commit.
+
+        Returns
+        -------
+        The number of tasks marked as successful.
+        """
+        with self._lock:
+            completed = self._completed
+            self._completed = {}
+            self._number_of_completed_rows = 0
+            self._oldest_completion = None
+        if not completed:
+            return 0
+
+        try:
+            self._write(session, completed)
+            session.commit()
+        except Exception:
+            session.rollback()
+        else:
+            if on_success is not None:
+                for task_id in completed:
+                    on_success(task_id)
+            return len(completed)
+
+        number_of_written_tasks = 0
+        for task_id, rows in completed.items():
+            try:
+                self._write(session, {task_id: rows})
+                session.commit()
+            except Exception as reason_for_failure:
+                session.rollback()
+                on_failure(task_id, reason_for_failure)
+            else:
+                number_of_written_tasks += 1
+                if on_success is not None:
+                    on_success(task_id)
+        return number_of_written_tasks
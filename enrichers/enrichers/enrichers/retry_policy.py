@@ -0,0 +1,107 @@
+"""Submodule providing the retry policy of the enrichers.
+
+Implementative details
+----------------------
+When the enrichment of a task fails with an exception that the enricher declares
+as retryable, such as a connection error towards a remote repository, the task is
+not marked as failed but put back to PENDING, with the time of its next attempt
+stored on the task row. The delay before the next attempt grows exponentially with
+the number of attempts, up to a maximal delay, and is randomized by a jitter so that
+tasks that failed together, for instance because of a remote service outage, are not
+all retried at the same instant.
+"""
+from typing import Tuple, Type
+import datetime
+import random
+
+
+class RetryPolicy:
+    """Declarative retry policy of an enricher."""
+
+    def __init__(
+        self,
+        maximal_number_of_attempts: int = 3,
+        initial_delay: float = 30.0,
+        maximal_delay: float = 3600.0,
+        multiplier: float = 2.0,
+        jitter: float = 0.5,
+        retryable_exceptions: Tuple[Type[Exception], ...] = (OSError,),
+    ) -> None:
+        """Initialize the retry policy.
+
+        Parameters
+        ----------
+        maximal_number_of_attempts
+            number of attempts after which a task is marked as failed.
+        initial_delay
+            number of seconds to wait before the second attempt.
+        maximal_delay
+            maximal number of seconds to wait between two attempts.
+        multiplier
+            factor by which the delay grows after each attempt.
+        jitter
+            fraction of the delay that is randomly removed, between 0 and 1.
+        retryable_exceptions
+            exception types that justify a retry. By default, only the
+            operating system errors are retried, which include the connection
+            errors and timeouts raised when querying remote services.
+        """
+        if maximal_number_of_attempts < 1:
+            raise ValueError(
+                "The maximal number of attempts must be at least one, "
+                f"but {maximal_number_of_attempts} was provided."
+            )
+        if not 0 <= jitter <= 1:
+            raise ValueError(
+                f"The jitter must be between zero and one, but {jitter} was provided."
+            )
+        self.maximal_number_of_attempts = maximal_number_of_attempts
+        self.initial_delay = initial_delay
+        self.maximal_delay = maximal_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.retryable_exceptions = retryable_exceptions
+
+    def is_retryable(self, exception: Exception) -> bool:
+        """Returns whether the provided exception is a transient failure justifying a retry."""
+        return isinstance(exception, self.retryable_exceptions)
+
+    def should_retry(self, exception: Exception, attempts: int) -> bool:
+        """Returns whether a task that failed with the provided exception should be retried.
+
+        Parameters
+        ----------
+        exception
+            exception raised by the failed attempt.
+        attempts
+            number of attempts executed so far, including the failed one.
+        """
+        return attempts < self.maximal_number_of_attempts and self.is_retryable(
+            exception
+        )
+
+    def get_delay(self, attempts: int) -> float:
+        """Returns the number of seconds to wait before the next attempt.
+
+        Parameters
+        ----------
+        attempts
+            number of attempts executed so far.
+        """
+        delay = min(
+            self.maximal_delay,
+            self.initial_delay * self.multiplier ** max(attempts - 1, 0),
+        )
+        return delay * (1.0 - self.jitter * random.random())
+
+    def get_next_attempt_at(self, attempts: int) -> datetime.datetime:
+        """Returns the time after which the next attempt may be executed.
+
+        Parameters
+        ----------
+        attempts
+            number of attempts executed so far.
+        """
+        return datetime.datetime.now() + datetime.timedelta(
+            seconds=self.get_delay(attempts)
+        )
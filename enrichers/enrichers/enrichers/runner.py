@@ -0,0 +1,278 @@
+"""Submodule providing the runner hosting several enrichers in a single process.
+
+Implementative details
+----------------------
+Each enricher used to be shipped as its own container, with its own interpreter,
+database connection pool and polling loop, even when it is a light enricher which
+spends most of its time sleeping. The runner instead loads a configured set of
+enrichers and schedules their rounds cooperatively over a shared pool of worker
+threads: whenever the sleep time of an enricher has elapsed, a round of that
+enricher is submitted to the pool, and its next round is scheduled according to
+the backoff of the enricher once the round completes. At most one round of each
+enricher runs at any time, as the session of an enricher is not thread-safe.
+
+Upon SIGTERM or SIGINT, the runner stops scheduling new rounds and asks each enricher
+to stop claiming new work, waiting for the rounds in progress. As the worker threads
+cannot be interrupted, when the shortest shutdown deadline of the hosted enrichers
+expires, the results the rounds already completed are written, the claims of their
+in-flight tasks are released, and the metrics endpoint is stopped as upon a regular
+stop, before the process exits without waiting for the worker threads.
+
+The enrichers hosted in the same process share the connection pool of the database
+engine and the Prometheus metrics endpoint, whose metrics are labelled by enricher.
+
+The enrichers are loaded by name from the plugin registry, i.e. the entry points of
+the emikg.enrichers group, so that packages providing new enrichers only need to
+declare them in their setup.py, for instance:
+
+    entry_points={"emikg.enrichers": ["otl = otl_enricher:OTLEnricher"]}
+
+The Open Tree of Life and the dirty pipeline enrichers are registered as otl and
+dirty_pipeline by their packages. Enrichers not registered as entry points may be
+loaded with the module:Class syntax.
+"""
+from typing import Dict, List, Optional, Type
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from importlib import import_module
+from importlib.metadata import EntryPoint, entry_points
+from threading import Event
+from time import monotonic
+import argparse
+import logging
+import os
+from .enricher import Enricher
+from .metrics import serve_metrics, stop_metrics
+from .shutdown import ShutdownRequested, handle_shutdown_signals
+
+ENTRY_POINT_GROUP = "emikg.enrichers"
+
+
+def _get_registered_enrichers() -> Dict[str, EntryPoint]:
+    """Returns the entry points of the registered enrichers, by name."""
+    discovered = entry_points()
+    if hasattr(discovered, "select"):
+        registered = discovered.select(group=ENTRY_POINT_GROUP)
+    else:
+        # Python versions before 3.10 return a dictionary of groups.
+        registered = discovered.get(ENTRY_POINT_GROUP, ())
+    return {entry_point.name: entry_point for entry_point in registered}
+
+
+def load_enricher_class(name: str) -> Type[Enricher]:
+    """Returns the enricher class with the provided name.
+
+    Parameters
+    ----------
+    name
+        name of an enricher registered in the emikg.enrichers entry points
+        group, or path of the enricher class in the module:Class syntax.
+
+    Raises
+    ------
+    ValueError
+        If the enricher is not registered or is not an Enricher subclass.
+    """
+    registered = _get_registered_enrichers()
+    if name in registered:
+        enricher_class = registered[name].load()
+    elif ":" in name:
+        module_name, class_name = name.split(":", 1)
+        enricher_class = getattr(import_module(module_name), class_name)
+    else:
+        raise ValueError(
+            f"The enricher {name} is not registered in the {ENTRY_POINT_GROUP} "
+            f"entry points, which provide the enrichers {sorted(registered)}. "
+            "Enrichers that are not registered can be loaded with the module:Class syntax."
+        )
+
+    if not isinstance(enricher_class, type) or not issubclass(enricher_class, Enricher):
+        raise ValueError(
+            f"The object {enricher_class!r} loaded as the enricher {name} "
+            "is not a subclass of the Enricher class."
+        )
+
+    return enricher_class
+
+
+class EnricherRunner:
+    """Runner scheduling the rounds of several enrichers over a shared worker pool."""
+
+    def __init__(self, enrichers: List[Enricher], number_of_workers: int = 4) -> None:
+        """Initialize the runner.
+
+        Parameters
+        ----------
+        enrichers
+            enrichers hosted by the runner.
+        number_of_workers
+            number of threads executing the rounds of the enrichers.
+        """
+        if not enrichers:
+            raise ValueError("At least one enricher must be provided to the runner.")
+        if number_of_workers < 1:
+            raise ValueError(
+                "The number of workers must be at least one, "
+                f"but {number_of_workers} was provided."
+            )
+        self._enrichers = enrichers
+        self._number_of_workers = number_of_workers
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+    def start_service(self, metrics_port: Optional[int] = None):
+        """Start the service running all the hosted enrichers.
+
+        Parameters
+        ----------
+        metrics_port
+            port on which the Prometheus metrics are exposed. By default,
+            the ENRICHER_METRICS_PORT environment variable is used, or 9100
+            if it is not set.
+        """
+        metrics_port = serve_metrics(metrics_port)
+        self._logger.info(
+            f"Starting the enrichers {[enricher.name() for enricher in self._enrichers]} "
+            f"over {self._number_of_workers} workers, "
+            f"exposing metrics on port {metrics_port}."
+        )
+
+        stop_requested = Event()
+
+        def _request_stop():
+            stop_requested.set()
+            for enricher in self._enrichers:
+                enricher.request_stop()
+
+        pool = ThreadPoolExecutor(
+            max_workers=self._number_of_workers, thread_name_prefix="enricher"
+        )
+        with handle_shutdown_signals(
+            on_stop=_request_stop,
+            deadline=min(
+                enricher.get_shutdown_deadline() for enricher in self._enrichers
+            ),
+            logger=self._logger,
+        ):
+            interrupted = False
+            try:
+                self._schedule_rounds(pool, stop_requested)
+            except ShutdownRequested as shutdown:
+                self._logger.warning(f"Interrupted the in-flight work: {shutdown}")
+                interrupted = True
+                # The rounds still running in the worker threads cannot be
+                # interrupted, so we write the results of the items they
+                # already completed, and release the claims of the others.
+                for enricher in self._enrichers:
+                    enricher.flush_pending_results()
+                    enricher.release_in_flight_task()
+        pool.shutdown(wait=not interrupted)
+        stop_metrics(metrics_port)
+        self._logger.info("Stopped the enrichers.")
+        if interrupted:
+            # The interpreter would otherwise wait for the worker
+            # threads still running the interrupted rounds upon exit.
+            logging.shutdown()
+            os._exit(1)
+
+    def _schedule_rounds(self, pool: ThreadPoolExecutor, stop_requested: Event):
+        """Schedule the rounds of the enrichers until a stop is requested.
+
+        Parameters
+        ----------
+        pool
+            pool of threads executing the rounds of the enrichers.
+        stop_requested
+            event set when the runner must stop claiming new work. The rounds
+            in progress are then awaited before returning.
+        """
+        sleep_times = [1.0 for _ in self._enrichers]
+        next_round_at = [monotonic() for _ in self._enrichers]
+        rounds: Dict[Future, int] = {}
+
+        while not (stop_requested.is_set() and not rounds):
+            now = monotonic()
+            running = set(rounds.values())
+            for index, enricher in enumerate(self._enrichers):
+                if (
+                    not stop_requested.is_set()
+                    and index not in running
+                    and next_round_at[index] <= now
+                ):
+                    rounds[pool.submit(enricher.run_round)] = index
+
+            # We wait until a round completes or the next round is due.
+            running = set(rounds.values())
+            pending = [
+                next_round_at[index]
+                for index in range(len(self._enrichers))
+                if index not in running
+            ]
+            timeout = max(0.0, min(pending) - monotonic()) if pending else None
+            if not rounds:
+                stop_requested.wait(timeout)
+                continue
+            completed, _ = wait(
+                list(rounds), timeout=timeout, return_when=FIRST_COMPLETED
+            )
+
+            for future in completed:
+                index = rounds.pop(future)
+                enricher = self._enrichers[index]
+                try:
+                    some_success = future.result()
+                except Exception as exception:
+                    self._logger.exception(
+                        f"The round of the enricher {enricher.name()} failed "
+                        f"with {exception!r}."
+                    )
+                    some_success = False
+                sleep_times[index] = enricher.get_next_sleep_time(
+                    sleep_times[index], some_success
+                )
+                next_round_at[index] = monotonic() + sleep_times[index]
+                enricher.record_idle_time(sleep_times[index])
+
+
+def main(arguments: Optional[List[str]] = None):
+    """Run the enrichers provided on the command line, or in the ENRICHERS variable."""
+    parser = argparse.ArgumentParser(
+        prog="enrichers",
+        description="Run several enrichers in a single process.",
+    )
+    parser.add_argument(
+        "enrichers",
+        nargs="*",
+        default=[
+            name for name in os.environ.get("ENRICHERS", "").split(",") if name.strip()
+        ],
+        help=(
+            f"names of the enrichers registered in the {ENTRY_POINT_GROUP} entry points, "
+            "or paths of the enricher classes in the module:Class syntax. "
+            "By default, the comma-separated ENRICHERS environment variable is used."
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("ENRICHER_WORKERS", 4)),
+        help="number of threads executing the rounds of the enrichers.",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="port on which the Prometheus metrics are exposed.",
+    )
+    parsed = parser.parse_args(arguments)
+
+    if not parsed.enrichers:
+        parser.error(
+            "No enricher was provided. The registered enrichers are "
+            f"{sorted(_get_registered_enrichers())}."
+        )
+
+    logging.basicConfig(level=logging.INFO)
+
+    EnricherRunner(
+        enrichers=[load_enricher_class(name.strip())() for name in parsed.enrichers],
+        number_of_workers=parsed.workers,
+    ).start_service(metrics_port=parsed.metrics_port)
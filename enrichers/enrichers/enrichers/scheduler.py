@@ -0,0 +1,85 @@
+"""Submodule providing the fair scheduling of the work items of the enrichers.
+
+Implementative details
+----------------------
+Without an explicit ordering, the database returns the pending work items in an
+arbitrary order, and a single user uploading hundreds of payloads may starve the
+other users of the platform.
+
+The scheduler orders the work items with weighted fair queuing across the users
+who own them. Within each priority level, the work items of each user are numbered
+by age, and each item is given the virtual finish time position / weight, where the
+weight of the administrators is boosted. Sorting by virtual finish time interleaves
+the users in a round-robin fashion: the oldest item of every user comes before the
+second oldest item of any user, so the queueing latency of a user with a single item
+is bounded by the number of active users, and not by the size of the backlog.
+
+The ordering is expressed in SQL, so that it is applied by the database when the
+enricher claims its next work items.
+"""
+from sqlalchemy import Float, case, cast, func, select
+from sqlalchemy.orm import Query
+from alchemy_wrapper.models import Administrator
+
+
+class FairScheduler:
+    """Weighted fair queuing of the work items across their owners."""
+
+    def __init__(self, administrator_weight: float = 1.0) -> None:
+        """Initialize the scheduler.
+
+        Parameters
+        ----------
+        administrator_weight
+            weight of the work items owned by administrators, relative to the
+            ones owned by the other users. With a weight of 2, administrators
+            get two work items scheduled for every work item of another user.
+        """
+        if administrator_weight <= 0:
+            raise ValueError(
+                "The administrator weight must be strictly positive, "
+                f"but {administrator_weight} was provided."
+            )
+        self.administrator_weight = administrator_weight
+
+    def order(
+        self,
+        query: Query,
+        user_id,
+        created_at,
+        priority=None,
+    ) -> Query:
+        """Returns the provided query ordered by priority and fair share.
+
+        Parameters
+        ----------
+        query
+            query selecting the work items.
+        user_id
+            column of the query identifying the owner of each work item.
+        created_at
+            column of the query with the creation time of each work item.
+        priority
+            optional column of the query with the priority of each work item.
+            Work items with higher priority are always scheduled first.
+        """
+        priorities = () if priority is None else (priority.desc(),)
+
+        position = func.row_number().over(
+            partition_by=(*((priority,) if priority is not None else ()), user_id),
+            order_by=created_at,
+        )
+
+        weight = case(
+            (
+                user_id.in_(select(Administrator.user_id)),
+                self.administrator_weight,
+            ),
+            else_=1.0,
+        )
+
+        return query.order_by(
+            *priorities,
+            cast(position, Float) / weight,
+            created_at,
+        )
@@ -0,0 +1,81 @@
+"""Submodule providing the graceful shutdown of the enrichers.
+
+Implementative details
+----------------------
+When a container is stopped, as during a rolling deploy, it first receives a SIGTERM,
+and is killed after a grace period. Upon SIGTERM or SIGINT, the enricher stops claiming
+new work and lets the in-flight item finish, or checkpoint itself, within a deadline.
+When the deadline expires, a SIGALRM interrupts the main thread by raising the
+ShutdownDeadlineExceeded exception, upon which the claim of the in-flight task is
+released so that another replica can resume it. A second signal interrupts the
+in-flight item immediately.
+
+The shutdown exceptions derive from BaseException, as KeyboardInterrupt does, so that
+they are not swallowed by the handlers of the enrichment failures.
+"""
+from typing import Callable
+from contextlib import contextmanager
+import logging
+import signal
+
+
+class ShutdownRequested(BaseException):
+    """Raised to interrupt the enrichment of an item when the enricher is shutting down."""
+
+
+class ShutdownDeadlineExceeded(ShutdownRequested):
+    """Raised in the main thread when the in-flight item did not complete in time."""
+
+
+@contextmanager
+def handle_shutdown_signals(
+    on_stop: Callable[[], None], deadline: int, logger: logging.Logger
+):
+    """Context manager handling SIGTERM and SIGINT as graceful shutdown requests.
+
+    Parameters
+    ----------
+    on_stop
+        callback invoked upon the first signal, which must stop claiming new work.
+    deadline
+        number of seconds after the first signal after which the main thread
+        is interrupted by the ShutdownDeadlineExceeded exception.
+    logger
+        logger to report the received signals to.
+
+    Implementative details
+    ----------------------
+    The signal handlers can only be installed from the main thread.
+    """
+    stop_requested = False
+
+    def _on_signal(signum, frame):
+        nonlocal stop_requested
+        if stop_requested:
+            raise ShutdownDeadlineExceeded(
+                f"Received {signal.Signals(signum).name} while already shutting down."
+            )
+        stop_requested = True
+        logger.warning(
+            f"Received {signal.Signals(signum).name}, stopping to claim new work "
+            f"and draining the in-flight work within {deadline} seconds."
+        )
+        on_stop()
+        signal.alarm(deadline)
+
+    def _on_deadline(signum, frame):
+        raise ShutdownDeadlineExceeded(
+            f"The in-flight work did not complete within {deadline} seconds."
+        )
+
+    previous_handlers = {
+        signal.SIGTERM: signal.signal(signal.SIGTERM, _on_signal),
+        signal.SIGINT: signal.signal(signal.SIGINT, _on_signal),
+        signal.SIGALRM: signal.signal(signal.SIGALRM, _on_deadline),
+    }
+    try:
+        yield
+    finally:
+        signal.alarm(0)
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
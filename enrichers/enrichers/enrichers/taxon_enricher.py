@@ -1,5 +1,7 @@
 """Abstract Enricher class for extending the metadata of a taxon class."""
 
+from typing import Optional
+from sqlalchemy import exists
 from alchemy_wrapper.models import Taxon, Task
 from .enricher import Enricher
 from .models import TaxonEnrichmentTask
@@ -8,12 +10,45 @@ from .models import TaxonEnrichmentTask
 class TaxonEnricher(Enricher):
     """Abstract Enricher class for extending the metadata of a taxon class."""
 
+    def _is_awaiting_retry(self):
+        """Returns the SQL condition selecting the taxa whose enrichment awaits a retry.
+
+        Implementative details
+        ----------------------
+        A taxon awaits a retry when it has a PENDING task of this enricher whose
+        next attempt is not due yet. Such taxa must not be enriched before the
+        next attempt time, so as not to hammer a remote service that is degraded.
+        """
+        return exists().where(
+            TaxonEnrichmentTask.taxon_id == Taxon.id,
+            TaxonEnrichmentTask.task_id == Task.id,
+            Task.task_type_id == self._task_type_id,
+            Task.status == "PENDING",
+            ~Task.is_due(),
+        )
+
+    def _get_existing_task(self, enrichable: Taxon) -> Optional[Task]:
+        # If there is already a PENDING task for this taxon, such as one
+        # abandoned by a crashed enricher and recovered by the reaper or one
+        # waiting to be retried, we resume it instead of creating a new one.
+        return (
+            self._session.query(Task)
+            .join(TaxonEnrichmentTask, TaxonEnrichmentTask.task_id == Task.id)
+            .filter(
+                TaxonEnrichmentTask.taxon_id == enrichable.id,
+                Task.task_type_id == self._task_type_id,
+                Task.status == "PENDING",
+            )
+            .order_by(Task.created_at.desc())
+            .first()
+        )
+
     def _create_new_task(self, enrichable: Taxon) -> Task:
         enrichment_task = super()._create_new_task(enrichable)
         # Create a new entry in the taxon_tasks table
         taxon_enrichment_task = TaxonEnrichmentTask(
-            taxon_id=enrichable.id, enrichment_task_id=enrichment_task.id
+            taxon_id=enrichable.id, task_id=enrichment_task.id
         )
         self._session.add(taxon_enrichment_task)
-        self._session.commit()
+        self._session.flush()
         return enrichment_task
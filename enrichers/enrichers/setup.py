@@ -10,6 +10,14 @@ setup(
     python_requires='>=3.8.0',
     packages=find_packages(
         exclude=['contrib', 'docs', 'tests*', 'notebooks*']),
-    install_requires=["alchemy-wrapper"],
+    install_requires=["alchemy-wrapper", "prometheus_client"],
+    extras_require={
+        # Dependencies of the AsyncEnricher class, with the asyncio
+        # drivers of Postgres and of SQLite.
+        "async": ["sqlalchemy[asyncio]", "asyncpg", "aiosqlite"],
+    },
     include_package_data=True,
+    entry_points={
+        "console_scripts": ["enrichers = enrichers.runner:main"],
+    },
 )
@@ -0,0 +1,135 @@
+"""Fixtures shared by the tests of the enrichers, run against a temporary SQLite database."""
+from typing import List
+import os
+import tempfile
+
+# The database must be selected before the models are first imported.
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/enrichers.sqlite"
+)
+
+# pylint: disable=wrong-import-position
+import pytest
+from sqlalchemy import exists
+from alchemy_wrapper import Base, Session, engine
+from alchemy_wrapper.models import Taxon, Task, User, core
+from enrichers import TaxonEnricher
+from enrichers.circuit_breaker import _CIRCUIT_BREAKERS
+from enrichers.models import TaxonEnrichmentTask
+
+
+class DummyTaxonEnricher(TaxonEnricher):
+    """Taxon enricher whose outcome is given by the failures it is configured to raise."""
+
+    def __init__(self, failures: List[Exception] = (), verbose: bool = True) -> None:
+        """Initialize the enricher, which raises the provided failures in order."""
+        super().__init__(verbose=verbose)
+        self.failures = list(failures)
+        self.enriched: List[int] = []
+
+    @classmethod
+    def name(cls) -> str:
+        return "Dummy taxon enricher"
+
+    @classmethod
+    def repository(cls) -> str:
+        return "Dummy repository"
+
+    def _select_enrichables(self, enrichables: List[Taxon]) -> List[Taxon]:
+        return enrichables
+
+    def _get_new_elements_to_enrich(self):
+        # As the concrete taxon enrichers, the taxa already enriched, awaiting
+        # a retry or claimed by a running task are not candidates.
+        return self._stream_candidates(
+            self.scheduler.order(
+                self._session.query(Taxon).filter(
+                    ~exists().where(
+                        TaxonEnrichmentTask.taxon_id == Taxon.id,
+                        TaxonEnrichmentTask.task_id == Task.id,
+                        Task.task_type_id == self._task_type_id,
+                        Task.status == "SUCCESS",
+                    ),
+                    ~self._is_awaiting_retry(),
+                    ~self._is_claimed(Taxon.id),
+                ),
+                user_id=Taxon.user_id,
+                created_at=Taxon.created_at,
+            )
+        )
+
+    def _query_repository(self):
+        if self.failures:
+            raise self.failures.pop(0)
+
+    def _enrich(self, enrichable: Taxon, task: Task) -> bool:
+        # As the concrete enrichers, only the calls to the repository
+        # are guarded by its circuit breaker.
+        self._call_remote(self._query_repository)
+        self.enriched.append(enrichable.id)
+        return True
+
+
+@pytest.fixture(autouse=True)
+def database():
+    """Recreates the tables, and the circuit breakers, before each test."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    # The candidates are streamed while the enricher writes, which SQLite
+    # only allows in WAL mode, as a server-side cursor does in Postgres.
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA journal_mode = WAL")
+    _CIRCUIT_BREAKERS.clear()
+    yield
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def failure_logs(tmp_path, monkeypatch):
+    """Writes the failure logs of the tasks, usually stored in /app/safe, in a temporary directory."""
+    makedirs = os.makedirs
+
+    def redirect(path: str) -> str:
+        return f"{tmp_path}{path}" if path.startswith("/app/") else path
+
+    monkeypatch.setattr(
+        os, "makedirs", lambda path, **kwargs: makedirs(redirect(path), **kwargs)
+    )
+    monkeypatch.setattr(
+        core,
+        "open",
+        lambda path, *args, **kwargs: open(redirect(path), *args, **kwargs),
+        raising=False,
+    )
+    return tmp_path
+
+
+@pytest.fixture
+def session():
+    """Returns a session of the test database."""
+    test_session = Session()
+    yield test_session
+    test_session.close()
+
+
+@pytest.fixture
+def enricher():
+    """Returns a dummy taxon enricher."""
+    dummy_enricher = DummyTaxonEnricher()
+    yield dummy_enricher
+    dummy_enricher._session.close()
+
+
+@pytest.fixture
+def taxa(session) -> List[Taxon]:
+    """Returns three taxa, submitted by a regular user."""
+    user = User(first_name="Jane", last_name="Doe", description="")
+    session.add(user)
+    session.flush()
+    new_taxa = [
+        Taxon(name=name, description="", user_id=user.id)
+        for name in ("Homo sapiens", "Mus musculus", "Danio rerio")
+    ]
+    session.add_all(new_taxa)
+    session.commit()
+    return new_taxa
@@ -0,0 +1,23 @@
+"""Test the cap on the outstanding tasks of an enricher."""
+import datetime
+from alchemy_wrapper.models import Task
+
+
+def test_admission_control_caps_the_new_tasks(session, enricher, taxa, monkeypatch):
+    """Test that no new task is admitted once the cap of outstanding tasks is reached."""
+    monkeypatch.setattr(enricher, "_get_maximal_number_of_outstanding_tasks", lambda: 2)
+    enricher.failures = [ConnectionError("Slow service.")] * 2
+
+    assert not enricher.enrich_all()
+    assert session.query(Task).count() == 2
+    assert enricher.enriched == []
+
+    # The outstanding tasks are still resumed once due, and free the budget.
+    session.query(Task).update({"next_attempt_at": datetime.datetime.now()})
+    session.commit()
+    assert enricher.enrich_all()
+    assert enricher.enriched == [taxa[0].id, taxa[1].id]
+
+    assert enricher.enrich_all()
+    assert enricher.enriched == [taxon.id for taxon in taxa]
+    assert session.query(Task).filter_by(status="SUCCESS").count() == 3
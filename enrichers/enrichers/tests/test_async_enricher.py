@@ -0,0 +1,79 @@
+"""Test the concurrent enrichment of the AsyncEnricher class."""
+import asyncio
+import threading
+import pytest
+from alchemy_wrapper.models import Task
+from .conftest import DummyTaxonEnricher
+
+pytest.importorskip("aiosqlite")
+
+# pylint: disable=wrong-import-position
+from enrichers.async_enricher import AsyncEnricher
+
+
+class DummyAsyncTaxonEnricher(AsyncEnricher, DummyTaxonEnricher):
+    """Dummy taxon enricher, enriching up to two taxa concurrently."""
+
+    def __init__(self, verbose: bool = True) -> None:
+        """Initialize the enricher, recording the enrichments in flight."""
+        super().__init__(verbose=verbose)
+        self.in_flight = 0
+        self.maximal_in_flight = 0
+        self.bookkeeping_threads = set()
+
+    # The candidates are selected as by the synchronous dummy enricher,
+    # and streamed through the async discovery session.
+    _get_new_elements_to_enrich = DummyTaxonEnricher._get_new_elements_to_enrich
+
+    def _get_maximal_concurrency(self) -> int:
+        return 2
+
+    def _claim_task(self, enrichable):
+        self.bookkeeping_threads.add(threading.current_thread())
+        return super()._claim_task(enrichable)
+
+    async def _enrich(self, enrichable, task: Task) -> bool:
+        self.in_flight += 1
+        self.maximal_in_flight = max(self.maximal_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            return DummyTaxonEnricher._enrich(self, enrichable, task)
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def async_enricher():
+    """Returns a dummy async taxon enricher."""
+    dummy_enricher = DummyAsyncTaxonEnricher()
+    yield dummy_enricher
+    dummy_enricher._wait_for_bookkeeping(dummy_enricher._session.close)
+    if dummy_enricher._loop is not None:
+        dummy_enricher._loop.run_until_complete(dummy_enricher._async_engine.dispose())
+        dummy_enricher._loop.close()
+
+
+def test_async_enricher_enriches_concurrently(session, async_enricher, taxa):
+    """Test that the taxa are enriched concurrently, with the bookkeeping off the event loop."""
+    assert async_enricher.enrich_all()
+
+    assert sorted(async_enricher.enriched) == [taxon.id for taxon in taxa]
+    assert async_enricher.maximal_in_flight == 2
+    assert session.query(Task).filter_by(status="SUCCESS").count() == 3
+    assert threading.main_thread() not in async_enricher.bookkeeping_threads
+
+
+def test_async_enricher_records_failures(session, async_enricher, taxa, failure_logs):
+    """Test that the failed enrichments are retried or failed with their traceback."""
+    async_enricher.failures = [
+        ConnectionError("Connection reset."),
+        ValueError("Malformed taxon name."),
+    ]
+
+    assert async_enricher.enrich_all()
+
+    tasks = session.query(Task).order_by(Task.id).all()
+    assert sorted(task.status for task in tasks) == ["FAILURE", "PENDING", "SUCCESS"]
+    failed = next(task for task in tasks if task.status == "FAILURE")
+    failure_log = failure_logs / f"app/safe/tasks/{failed.id}/failure.txt"
+    assert "ValueError: Malformed taxon name." in failure_log.read_text()
@@ -0,0 +1,184 @@
+"""Test the offline benchmark harness of the enrichers."""
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+import json
+import math
+import tarfile
+import pytest
+from alchemy_wrapper.models import DataPayload, Taxon, Task, User
+from enrichers.benchmark import (
+    StandInServer,
+    create_synthetic_payloads,
+    create_synthetic_taxa,
+    generate_taxon_names,
+    run_benchmark,
+    stub_dirty_pipeline,
+)
+from enrichers.benchmark.driver import get_percentile, main
+from enrichers.benchmark.stand_in_server import get_synthetic_ott_id
+from .conftest import DummyTaxonEnricher
+
+
+def post(server: StandInServer, endpoint: str, payload: dict) -> dict:
+    """Returns the decoded response of the stand-in server to the provided request."""
+    request = Request(
+        f"http://{server.address}/v3/{endpoint}",
+        data=json.dumps(payload).encode("utf8"),
+        headers={"content-type": "application/json"},
+    )
+    with urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def test_percentiles():
+    """Test that the percentiles are computed with the nearest-rank method."""
+    values = [float(value) for value in range(100, 0, -1)]
+    assert get_percentile(values, 50) == 50.0
+    assert get_percentile(values, 99) == 99.0
+    assert get_percentile(values, 0) == 1.0
+    assert get_percentile([3.0], 99) == 3.0
+    assert math.isnan(get_percentile([], 50))
+
+
+def test_synthetic_taxon_names():
+    """Test that the names are reproducible, and repeated with the provided fraction."""
+    names = generate_taxon_names(50, duplicate_fraction=0.0)
+    assert names == generate_taxon_names(50, duplicate_fraction=0.0)
+    assert len(set(names)) == 50
+    assert all(len(name.split(" ")) == 2 for name in names)
+
+    assert len(set(generate_taxon_names(50, duplicate_fraction=1.0))) == 1
+    assert len(set(generate_taxon_names(200, duplicate_fraction=0.5))) < 150
+
+
+def test_synthetic_taxa_and_payloads(session, tmp_path, monkeypatch):
+    """Test that the synthetic work items are spread across the synthetic users."""
+    taxon_ids = create_synthetic_taxa(session, number_of_taxa=20, number_of_users=3)
+    assert len(taxon_ids) == 20
+    assert session.query(User).count() == 3
+    assert len({session.get(Taxon, taxon_id).user_id for taxon_id in taxon_ids}) > 1
+
+    monkeypatch.setattr(
+        DataPayload,
+        "get_unsafe_path",
+        lambda payload: str(tmp_path / "unsafe" / f"{payload.id}.tar.gz"),
+    )
+    payload_ids = create_synthetic_payloads(
+        session, number_of_payloads=2, number_of_users=2, number_of_bytes=128
+    )
+    assert len(payload_ids) == 2
+    for payload_id in payload_ids:
+        payload = session.get(DataPayload, payload_id)
+        assert session.get(Task, payload.task_id).status == "PENDING"
+        with tarfile.open(payload.get_unsafe_path(), "r:gz") as archive:
+            assert archive.getmember("msdata/processed/synthetic.mzML").size == 128
+
+
+def test_stand_in_server_replays_the_recordings():
+    """Test that the recorded responses are replayed, and the other ones synthesized."""
+    recorded_match = {
+        "matched_names": ["Quercus robur"],
+        "unambiguous_names": ["Quercus robur"],
+        "unmatched_names": [],
+        "results": [{"name": "Quercus robur", "matches": []}],
+    }
+    recorded_info = {"ott_id": 791115, "name": "Quercus robur", "lineage": []}
+    with StandInServer(
+        recordings={
+            "tnrs_match": {"quercus robur": recorded_match},
+            "taxon_info": {"791115": recorded_info},
+        }
+    ) as server:
+        match = post(server, "tnrs/match_names", {"names": ["Quercus robur", "Aa bb"]})
+        assert [result["name"] for result in match["results"]] == [
+            "Quercus robur",
+            "Aa bb",
+        ]
+        assert match["results"][0] == recorded_match["results"][0]
+        synthetic_taxon = match["results"][1]["matches"][0]["taxon"]
+        assert synthetic_taxon["ott_id"] == get_synthetic_ott_id("aa bb")
+
+        assert post(server, "taxonomy/taxon_info", {"ott_id": 791115}) == recorded_info
+        synthetic_info = post(server, "taxonomy/taxon_info", {"ott_id": 1234567})
+        assert synthetic_info["ott_id"] == 1234567
+        assert [node["rank"] for node in synthetic_info["lineage"]][:2] == [
+            "genus",
+            "tribe",
+        ]
+
+        with pytest.raises(HTTPError) as unknown_endpoint:
+            post(server, "tree_of_life/about", {})
+        assert unknown_endpoint.value.code == 404
+
+
+def test_stand_in_server_degradation():
+    """Test that the stand-in server fails with the configured error rate."""
+    with StandInServer(error_rate=1.0) as server:
+        with pytest.raises(HTTPError) as unavailable:
+            post(server, "taxonomy/taxon_info", {"ott_id": 1234567})
+        assert unavailable.value.code == 503
+
+    with pytest.raises(ValueError, match="error rate"):
+        StandInServer(error_rate=1.5)
+    with pytest.raises(ValueError, match="latency"):
+        StandInServer(latency=-1)
+
+
+def test_benchmark_report(taxa):
+    """Test that the benchmark enriches all the pending items, and measures them."""
+    enricher = DummyTaxonEnricher()
+    try:
+        report = run_benchmark(enricher)
+    finally:
+        enricher._session.close()
+
+    assert report["items"] == len(taxa)
+    assert sorted(enricher.enriched) == sorted(taxon.id for taxon in taxa)
+    assert report["items_per_second"] > 0
+    assert 0 < report["p50_latency_seconds"] <= report["p99_latency_seconds"]
+    assert report["queries_per_item"] > 0
+
+
+def test_driver_runs_the_workload(session, tmp_path, monkeypatch):
+    """Test that the driver creates the synthetic taxa, and stores the report."""
+    # The driver points the remote client at the stand-in server.
+    monkeypatch.setenv("OVERRIDE_OT_PRODUCTION_API_ENDPOINT", "")
+    monkeypatch.setenv("OTL_RESPONSE_CACHE", "")
+    main(
+        [
+            "--users",
+            "2",
+            "--output",
+            str(tmp_path / "report.json"),
+            "otl",
+            "tests.conftest:DummyTaxonEnricher",
+            "--taxa",
+            "5",
+            "--latency",
+            "0",
+        ]
+    )
+
+    with open(tmp_path / "report.json", "r", encoding="utf8") as report:
+        assert json.load(report)["items"] == 5
+    assert session.query(Taxon).count() == 5
+
+
+def test_stubbed_dirty_pipeline():
+    """Test that the steps of the stubbed dirty pipeline only sleep."""
+
+    class DirtyPipelineEnricher(DummyTaxonEnricher):
+        """Enricher with the steps and resources of the dirty pipeline enricher."""
+
+        def _prepare_resources(self):
+            raise AssertionError("The databases must not be downloaded.")
+
+        def _get_step_commands(self, extraction_path: str):
+            return ["first step", "second step"]
+
+    enricher = stub_dirty_pipeline(DirtyPipelineEnricher, step_duration=0.5)()
+    try:
+        enricher._prepare_resources()
+        assert enricher._get_step_commands("/tmp") == ["sleep 0.5", "sleep 0.5"]
+    finally:
+        enricher._session.close()
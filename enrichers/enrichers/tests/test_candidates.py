@@ -0,0 +1,48 @@
+"""Test the streaming of the candidates of the enrichers."""
+from alchemy_wrapper import Session
+from alchemy_wrapper.models import Taxon
+from enrichers import enricher as enricher_module
+
+
+def test_candidates_are_streamed_up_to_the_round_budget(
+    session, enricher, taxa, monkeypatch
+):
+    """Test that the candidates are streamed in order, in chunks, up to the round budget."""
+    more_taxa = [
+        Taxon(name=name, description="", user_id=taxa[0].user_id)
+        for name in ("Pan troglodytes", "Canis lupus")
+    ]
+    session.add_all(more_taxa)
+    session.commit()
+    monkeypatch.setattr(enricher, "_get_discovery_chunk_size", lambda: 2)
+    monkeypatch.setattr(enricher, "_get_round_budget", lambda: 4)
+
+    candidates = enricher._get_new_elements_to_enrich()
+    streamed = []
+    for candidate in candidates:
+        # The session of the enricher is committed while the candidates are
+        # enriched, which must not interrupt the stream nor expire them.
+        enricher._session.commit()
+        streamed.append((candidate.id, candidate.name))
+    candidates.close()
+
+    expected = [(taxon.id, taxon.name) for taxon in taxa + more_taxa]
+    assert streamed == expected[:4]
+
+
+def test_discovery_session_is_closed_with_the_stream(enricher, taxa, monkeypatch):
+    """Test that the discovery session is closed once the stream is closed early."""
+    discovery_sessions = []
+
+    def create_session():
+        discovery_sessions.append(Session())
+        return discovery_sessions[-1]
+
+    monkeypatch.setattr(enricher_module, "Session", create_session)
+    candidates = enricher._get_new_elements_to_enrich()
+    assert next(candidates).id == taxa[0].id
+    assert discovery_sessions[0].in_transaction()
+
+    candidates.close()
+
+    assert not discovery_sessions[0].in_transaction()
@@ -0,0 +1,116 @@
+"""Test the circuit breaker guarding the remote repositories."""
+import datetime
+import pytest
+from alchemy_wrapper.models import Task
+from enrichers import CircuitBreaker
+
+
+def expire(circuit_breaker: CircuitBreaker):
+    """Moves the opening of the circuit back in time, past its recovery timeout."""
+    circuit_breaker._opened_at -= datetime.timedelta(
+        seconds=circuit_breaker.recovery_timeout
+    )
+
+
+def test_circuit_breaker_transitions():
+    """Test the transitions from closed to open, half-open and back."""
+    circuit_breaker = CircuitBreaker("Transitions", failure_threshold=2)
+
+    circuit_breaker.record_failure()
+    assert circuit_breaker.allow_request()
+    circuit_breaker.record_failure()
+    assert circuit_breaker.is_open()
+    assert not circuit_breaker.allow_request()
+
+    # Once the recovery timeout elapsed, a single probe is let through.
+    expire(circuit_breaker)
+    assert not circuit_breaker.is_open()
+    assert circuit_breaker.allow_request()
+    assert not circuit_breaker.allow_request()
+
+    # A failed probe opens the circuit again.
+    circuit_breaker.record_failure()
+    assert circuit_breaker.is_open()
+
+    # While a successful one closes it.
+    expire(circuit_breaker)
+    assert circuit_breaker.allow_request()
+    circuit_breaker.record_success()
+    assert circuit_breaker.allow_request()
+    assert circuit_breaker.allow_request()
+
+
+def test_circuit_breaker_releases_probes():
+    """Test that a probe which did not reach the repository frees its slot."""
+    circuit_breaker = CircuitBreaker("Release", failure_threshold=1)
+    circuit_breaker.record_failure()
+    expire(circuit_breaker)
+
+    assert circuit_breaker.allow_request()
+    circuit_breaker.record_release()
+    assert circuit_breaker.allow_request()
+
+
+def test_circuit_breaker_success_resets_the_failures():
+    """Test that only consecutive failures open the circuit."""
+    circuit_breaker = CircuitBreaker("Reset", failure_threshold=2)
+
+    circuit_breaker.record_failure()
+    circuit_breaker.record_success()
+    circuit_breaker.record_failure()
+    assert not circuit_breaker.is_open()
+
+
+def test_circuit_breaker_validates_its_parameters():
+    """Test that the circuit breaker refuses inconsistent parameters."""
+    with pytest.raises(ValueError):
+        CircuitBreaker("Invalid", failure_threshold=0)
+    with pytest.raises(ValueError):
+        CircuitBreaker("Invalid", maximal_number_of_probes=0)
+
+
+def test_open_circuit_defers_the_tasks(session, enricher, taxa):
+    """Test that the calls refused by the open circuit defer their tasks, without counting the attempt."""
+    enricher._circuit_breaker.failure_threshold = 1
+    enricher.failures = [ConnectionError("Service unavailable.")]
+
+    assert not enricher.enrich_all()
+    assert enricher.enriched == []
+
+    tasks = session.query(Task).order_by(Task.id).all()
+    assert len(tasks) == len(taxa)
+    for task in tasks:
+        assert task.status == "PENDING"
+        assert task.attempts == 0
+        assert task.next_attempt_at == enricher._circuit_breaker.get_retry_at()
+
+    # Once the recovery timeout elapsed, the probe closes the circuit again.
+    expire(enricher._circuit_breaker)
+    for task in tasks:
+        task.next_attempt_at = datetime.datetime.now()
+    session.commit()
+    assert enricher.enrich_all()
+    assert enricher.enriched == [taxon.id for taxon in taxa]
+
+
+def test_open_circuit_lets_the_local_work_through(session, enricher, taxa):
+    """Test that the enrichments which do not query the repository go on while its circuit is open."""
+
+    def enrich_locally(enrichable, task: Task) -> bool:
+        # The first taxon is resolved without querying the repository.
+        if enrichable.id != taxa[0].id:
+            enricher._call_remote(enricher._query_repository)
+        enricher.enriched.append(enrichable.id)
+        return True
+
+    enricher._enrich = enrich_locally
+    enricher._circuit_breaker.failure_threshold = 1
+    enricher._circuit_breaker.record_failure()
+
+    assert enricher.enrich_all()
+    assert enricher.enriched == [taxa[0].id]
+    assert [task.status for task in session.query(Task).order_by(Task.id)] == [
+        "SUCCESS",
+        "PENDING",
+        "PENDING",
+    ]
@@ -0,0 +1,52 @@
+"""Test the coalescing of the requests for the same enrichable."""
+import datetime
+from alchemy_wrapper.models import Task
+from enrichers.models import EnrichmentClaim
+from .conftest import DummyTaxonEnricher
+
+
+def test_running_task_coalesces_new_requests(session, enricher, taxa):
+    """Test that no new task is created while the enrichable is being enriched."""
+    task = enricher._claim_task(taxa[0])
+    task.start(session=enricher._session)
+
+    assert enricher._claim_task(taxa[0]) is None
+    assert session.query(Task).count() == 1
+
+
+def test_pending_task_absorbs_new_requests(session, enricher, taxa):
+    """Test that a new request is attached to the pending task of the enrichable."""
+    task = enricher._claim_task(taxa[0])
+
+    assert enricher._claim_task(taxa[0]).id == task.id
+    assert session.query(Task).count() == 1
+
+
+def test_failed_task_cools_down(session, enricher, taxa, monkeypatch):
+    """Test that a failed enrichable is only attempted again after the cooldown."""
+    enricher.failures = [ValueError("Malformed taxon name.")]
+    assert not enricher.enrich(taxa[0])
+    assert enricher._claim_task(taxa[0]) is None
+
+    # Once the cooldown elapsed, the claim moves to a new task.
+    monkeypatch.setattr(enricher, "_get_failure_cooldown", datetime.timedelta)
+    task = enricher._claim_task(taxa[0])
+    assert task is not None and task.is_pending()
+    assert session.query(EnrichmentClaim).one().task_id == task.id
+
+
+def test_concurrent_claims_are_coalesced(session, taxa):
+    """Test that when two replicas race to claim an enrichable, only one task is created."""
+    first, second = DummyTaxonEnricher(), DummyTaxonEnricher()
+    create_new_task = second._create_new_task
+
+    def create_new_task_while_racing(enrichable):
+        # The other replica claims the enrichable in the meantime.
+        assert first._claim_task(enrichable) is not None
+        return create_new_task(enrichable)
+
+    second._create_new_task = create_new_task_while_racing
+
+    assert second._claim_task(taxa[0]) is None
+    assert session.query(Task).count() == 1
+    assert session.query(EnrichmentClaim).count() == 1
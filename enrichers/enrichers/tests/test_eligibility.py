@@ -0,0 +1,27 @@
+"""Test the batched eligibility checks of the enrichment candidates."""
+from alchemy_wrapper.models import Taxon
+
+
+def test_eligibility_is_checked_once_per_chunk(session, enricher, taxa, monkeypatch):
+    """Test that the eligibility of the candidates is checked one chunk at a time."""
+    session.add(Taxon(name="Pan troglodytes", description="", user_id=taxa[0].user_id))
+    session.commit()
+    monkeypatch.setattr(enricher, "_get_discovery_chunk_size", lambda: 3)
+    batches = []
+    select_enrichables = enricher._select_enrichables
+
+    def record_batch(enrichables):
+        batches.append([enrichable.name for enrichable in enrichables])
+        # Only the first candidate of each chunk is eligible.
+        return select_enrichables(enrichables)[:1]
+
+    monkeypatch.setattr(enricher, "_select_enrichables", record_batch)
+
+    assert enricher.enrich_all()
+
+    assert batches == [
+        ["Homo sapiens", "Mus musculus", "Danio rerio"],
+        ["Pan troglodytes"],
+    ]
+    assert len(enricher.enriched) == 2
+    assert enricher.enriched[0] == taxa[0].id
@@ -0,0 +1,126 @@
+"""Test the Prometheus metrics of the enrichers."""
+from urllib.error import URLError
+from urllib.request import urlopen
+import socket
+import pytest
+from prometheus_client import REGISTRY
+from alchemy_wrapper.models import TaskType
+from enrichers.metrics import serve_metrics, stop_metrics
+from enrichers.models import EnrichmentCacheEntry
+
+
+def get_sample_value(name: str, **labels) -> float:
+    """Returns the current value of the provided sample, or zero if it was never set."""
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def get_free_port() -> int:
+    """Returns a port on which nothing listens."""
+    with socket.socket() as free_socket:
+        free_socket.bind(("127.0.0.1", 0))
+        return free_socket.getsockname()[1]
+
+
+def test_outcomes_and_queue_depth_are_recorded(session, enricher, taxa):
+    """Test that the outcome of each enrichment and the tasks per status are recorded."""
+    labels = {"enricher": enricher.name()}
+    task_type = session.get(TaskType, enricher._task_type_id).name
+    successes = get_sample_value("enricher_items_total", outcome="success", **labels)
+    failures = get_sample_value("enricher_items_total", outcome="failure", **labels)
+    enrichments = get_sample_value(
+        "enricher_enrichment_duration_seconds_count",
+        task_type=task_type,
+        **labels,
+    )
+
+    enricher.failures = [ValueError("Malformed taxon name.")]
+    assert not enricher.enrich(taxa[0])
+    assert enricher.enrich(taxa[1])
+    enricher._update_queue_depth()
+
+    assert (
+        get_sample_value("enricher_items_total", outcome="success", **labels)
+        == successes + 1
+    )
+    assert (
+        get_sample_value("enricher_items_total", outcome="failure", **labels)
+        == failures + 1
+    )
+    assert (
+        get_sample_value(
+            "enricher_enrichment_duration_seconds_count",
+            task_type=task_type,
+            **labels,
+        )
+        == enrichments + 2
+    )
+    assert get_sample_value("enricher_queue_depth", status="SUCCESS", **labels) == 1
+    assert get_sample_value("enricher_queue_depth", status="FAILURE", **labels) == 1
+    assert get_sample_value("enricher_queue_depth", status="PENDING", **labels) == 0
+
+
+def test_successes_are_recorded_once_written(enricher, taxa, monkeypatch):
+    """Test that a success is recorded once the result is written, and a failure if it cannot be."""
+    labels = {"enricher": enricher.name()}
+    successes = get_sample_value("enricher_items_total", outcome="success", **labels)
+    failures = get_sample_value("enricher_items_total", outcome="failure", **labels)
+    enricher._result_writer.maximal_number_of_rows = 100
+    enricher._result_writer.maximal_delay = 60
+
+    assert enricher._enrich_eligible(taxa[0])
+    assert (
+        get_sample_value("enricher_items_total", outcome="success", **labels)
+        == successes
+    )
+    enricher._flush_results()
+    assert (
+        get_sample_value("enricher_items_total", outcome="success", **labels)
+        == successes + 1
+    )
+
+    def enrich_with_an_invalid_row(enrichable, task):
+        enricher._store_result(task, EnrichmentCacheEntry, {"enricher": None})
+        return True
+
+    monkeypatch.setattr(enricher, "_enrich", enrich_with_an_invalid_row)
+    assert enricher._enrich_eligible(taxa[1])
+    enricher._flush_results()
+
+    assert (
+        get_sample_value("enricher_items_total", outcome="success", **labels)
+        == successes + 1
+    )
+    assert (
+        get_sample_value("enricher_items_total", outcome="failure", **labels)
+        == failures + 1
+    )
+
+
+def test_metrics_are_served_once_per_port(enricher):
+    """Test that the metrics endpoint is started once, and exposes the metrics in text format."""
+    port = get_free_port()
+    assert serve_metrics(port) == port
+    # Hosting a second enricher in the same process reuses the endpoint.
+    assert serve_metrics(port) == port
+
+    enricher._metrics.record_idle_time(1.5)
+    with urlopen(f"http://127.0.0.1:{port}/metrics", timeout=10) as response:
+        exposition = response.read().decode("utf8")
+
+    assert "# TYPE enricher_items_total counter" in exposition
+    assert f'enricher_idle_seconds_total{{enricher="{enricher.name()}"}}' in exposition
+
+
+def test_metrics_endpoint_is_stopped():
+    """Test that a stopped metrics endpoint can be started again on the same port."""
+    port = serve_metrics(get_free_port())
+    stop_metrics(port)
+    with pytest.raises(URLError):
+        urlopen(f"http://127.0.0.1:{port}/metrics", timeout=10)
+    # Stopping an endpoint which is not running is a no-op.
+    stop_metrics(port)
+
+    assert serve_metrics(port) == port
+    with urlopen(f"http://127.0.0.1:{port}/metrics", timeout=10) as response:
+        assert response.status == 200
+    stop_metrics(port)
@@ -0,0 +1,101 @@
+"""Test the recovery of the tasks abandoned by crashed enrichers."""
+import datetime
+from alchemy_wrapper.models import Task
+from enrichers.reaper import reap_stale_tasks
+
+
+def start_task(session, enricher, attempts: int, heartbeat_age: datetime.timedelta):
+    """Returns a task of the enricher started with the provided heartbeat age."""
+    task = Task(user_id=enricher.id, task_type_id=enricher._task_type_id)
+    session.add(task)
+    session.flush()
+    task.start(session=session)
+    task.attempts = attempts
+    task.heartbeat_at = datetime.datetime.now() - heartbeat_age
+    session.commit()
+    return task
+
+
+def test_reaper_recovers_expired_leases(session, enricher):
+    """Test that only the tasks whose lease expired are released or failed."""
+    alive = start_task(session, enricher, 1, datetime.timedelta(seconds=10))
+    abandoned = start_task(session, enricher, 1, datetime.timedelta(minutes=10))
+    exhausted = start_task(session, enricher, 3, datetime.timedelta(minutes=10))
+
+    reaped = reap_stale_tasks(
+        session=session,
+        task_type_ids=[enricher._task_type_id],
+        lease_duration=datetime.timedelta(minutes=5),
+        maximal_number_of_attempts=3,
+    )
+
+    assert {task.id for task in reaped} == {abandoned.id, exhausted.id}
+    assert alive.status == "STARTED"
+    assert abandoned.status == "PENDING"
+    assert abandoned.heartbeat_at is None
+    assert abandoned.attempts == 1
+    assert exhausted.status == "FAILURE"
+
+
+def test_reaper_falls_back_to_start_time(session, enricher):
+    """Test that the tasks started without heartbeats are reaped after their start time."""
+    task = start_task(session, enricher, 1, datetime.timedelta(0))
+    task.heartbeat_at = None
+    task.started_at = datetime.datetime.now() - datetime.timedelta(hours=1)
+    session.commit()
+
+    reap_stale_tasks(
+        session=session,
+        task_type_ids=[enricher._task_type_id],
+        lease_duration=datetime.timedelta(minutes=5),
+        maximal_number_of_attempts=3,
+    )
+
+    assert task.status == "PENDING"
+
+
+def test_reaper_ignores_other_task_types(session, enricher):
+    """Test that the tasks of the other task types are left untouched."""
+    task = start_task(session, enricher, 1, datetime.timedelta(hours=1))
+
+    assert not reap_stale_tasks(
+        session=session,
+        task_type_ids=[enricher._task_type_id + 1],
+        lease_duration=datetime.timedelta(minutes=5),
+        maximal_number_of_attempts=3,
+    )
+    assert task.status == "STARTED"
+
+
+def test_reaper_commits_once(session, enricher, monkeypatch):
+    """Test that the reaped tasks are committed at once, so that they stay locked until then."""
+    for _ in range(3):
+        start_task(session, enricher, 1, datetime.timedelta(hours=1))
+    start_task(session, enricher, 3, datetime.timedelta(hours=1))
+    commits = []
+    commit = session.commit
+    monkeypatch.setattr(session, "commit", lambda: commits.append(commit()))
+
+    reaped = reap_stale_tasks(
+        session=session,
+        task_type_ids=[enricher._task_type_id],
+        lease_duration=datetime.timedelta(minutes=5),
+        maximal_number_of_attempts=3,
+    )
+
+    assert len(reaped) == 4
+    assert len(commits) == 1
+
+
+def test_heartbeat_leaves_the_update_time(session, enricher):
+    """Test that the heartbeats do not shift the update time of the task."""
+    task = start_task(session, enricher, 1, datetime.timedelta(minutes=10))
+    task.updated_at = updated_at = datetime.datetime(2000, 1, 1)
+    session.commit()
+    heartbeat_at = task.heartbeat_at
+
+    task.heartbeat(session=session)
+
+    session.refresh(task)
+    assert task.heartbeat_at > heartbeat_at
+    assert task.updated_at == updated_at
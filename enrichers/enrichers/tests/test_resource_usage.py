@@ -0,0 +1,101 @@
+"""Test the accounting of the resources consumed by the task attempts."""
+import logging
+from alchemy_wrapper.models import Task, TaskResourceUsage
+from enrichers import resource_usage
+from enrichers.models import TaxonEnrichmentTask
+from enrichers.resource_usage import ResourceAccounting
+
+
+def get_usages(session, task_id: int):
+    """Returns the recorded resource usages of the provided task, by attempt."""
+    session.expire_all()
+    return (
+        session.query(TaskResourceUsage)
+        .filter_by(task_id=task_id)
+        .order_by(TaskResourceUsage.attempt)
+        .all()
+    )
+
+
+def test_usage_is_recorded_per_attempt(session, enricher, taxa):
+    """Test that each attempt of a task records its usage, the latest being shown."""
+    enricher.failures = [ValueError("Malformed taxon name.")]
+    assert not enricher.enrich(taxa[0])
+    task = (
+        session.query(Task)
+        .join(TaxonEnrichmentTask, TaxonEnrichmentTask.task_id == Task.id)
+        .filter(TaxonEnrichmentTask.taxon_id == taxa[0].id)
+        .one()
+    )
+    # As the worker retrying the task would.
+    task.start(session=session)
+    with ResourceAccounting(task.id, task.attempts, logging.getLogger(__name__)):
+        sum(range(100_000))
+
+    usages = get_usages(session, task.id)
+    assert [usage.attempt for usage in usages] == [1, 2]
+    for usage in usages:
+        assert usage.wall_time > 0
+        assert usage.get_cpu_time() >= 0
+        assert usage.peak_rss > 0
+    assert TaskResourceUsage.get_latest(task.id, session=session) is usages[-1]
+    assert TaskResourceUsage.get_latest(task.id + 1, session=session) is None
+
+
+def test_peak_memory_of_the_task(session, enricher, taxa):
+    """Test that the peak memory of the task is the largest of the worker and of its children."""
+    task = enricher._claim_task(taxa[0])
+    usage = TaskResourceUsage(
+        task_id=task.id,
+        attempt=1,
+        wall_time=2.0,
+        user_cpu_time=0.5,
+        system_cpu_time=0.25,
+        children_user_cpu_time=1.0,
+        children_system_cpu_time=0.25,
+        peak_rss=100,
+    )
+    assert usage.get_cpu_time() == 2.0
+    assert usage.get_peak_memory() == 100
+    usage.children_peak_rss = 300
+    assert usage.get_peak_memory() == 300
+    usage.peak_rss = usage.children_peak_rss = None
+    assert usage.get_peak_memory() is None
+
+
+def test_peak_memory_is_reset_without_concurrent_attempts(
+    session, enricher, taxa, monkeypatch
+):
+    """Test that the process-wide peak memory is not reset under a running attempt."""
+    resets = []
+    monkeypatch.setattr(
+        resource_usage,
+        "reset_peak_resident_memory",
+        lambda: resets.append(True) or True,
+    )
+    logger = logging.getLogger(__name__)
+    task_ids = [enricher._claim_task(taxon).id for taxon in taxa]
+
+    with ResourceAccounting(task_ids[0], 1, logger):
+        assert len(resets) == 1
+        # The attempts overlapping with the running one share its window.
+        with ResourceAccounting(task_ids[1], 1, logger):
+            assert len(resets) == 1
+    with ResourceAccounting(task_ids[2], 1, logger):
+        assert len(resets) == 2
+
+    assert all(get_usages(session, task_id) for task_id in task_ids)
+
+
+def test_storage_failures_are_only_logged(session, enricher, taxa, caplog):
+    """Test that a usage which cannot be stored does not interrupt the attempt."""
+    task = enricher._claim_task(taxa[0])
+    with caplog.at_level(logging.ERROR):
+        # The attempt is mandatory, so the usage cannot be stored.
+        with ResourceAccounting(task.id, None, logging.getLogger(__name__)):
+            pass
+
+    assert f"Unable to store the resource usage of task {task.id}" in caplog.text
+    assert not get_usages(session, task.id)
+    # The attempts measured afterwards reset the peak memory again.
+    assert resource_usage._number_of_active_attempts == 0
@@ -0,0 +1,121 @@
+"""Test the buffered writer of the results of the enrichers."""
+import datetime
+import pytest
+from alchemy_wrapper.models import Task
+from enrichers.models import EnrichmentCacheEntry
+from enrichers.result_writer import BufferedResultWriter
+
+
+def get_row(input_hash: str, enricher: str = "Dummy taxon enricher"):
+    """Returns a row of the result cache with the provided input hash."""
+    return {
+        "enricher": enricher,
+        "version": "1",
+        "input_hash": input_hash,
+        "result": {"input_hash": input_hash},
+        "expires_at": datetime.datetime.now() + datetime.timedelta(days=1),
+    }
+
+
+@pytest.fixture
+def tasks(enricher, taxa):
+    """Returns the started tasks of the dummy enricher for the three taxa."""
+    started_tasks = []
+    for taxon in taxa:
+        task = enricher._claim_task(taxon)
+        task.start(session=enricher._session)
+        started_tasks.append(task)
+    return started_tasks
+
+
+def get_statuses(session, tasks):
+    """Returns the current statuses of the provided tasks."""
+    session.expire_all()
+    return [session.get(Task, task.id).status for task in tasks]
+
+
+def test_completed_tasks_are_flushed_above_the_thresholds():
+    """Test that the buffer should be flushed once enough rows, or enough time, accumulated."""
+    result_writer = BufferedResultWriter(maximal_number_of_rows=3, maximal_delay=60)
+    assert not result_writer.should_flush()
+
+    result_writer.add(1, EnrichmentCacheEntry, get_row("a"))
+    result_writer.add(1, EnrichmentCacheEntry, get_row("b"))
+    assert not result_writer.should_flush()
+    result_writer.complete(1)
+    assert not result_writer.should_flush()
+    # The completed tasks without any row count as a single row.
+    result_writer.complete(2)
+    assert result_writer.should_flush()
+    assert len(result_writer) == 2
+
+    result_writer = BufferedResultWriter(maximal_number_of_rows=100, maximal_delay=0)
+    result_writer.complete(1)
+    assert result_writer.should_flush()
+
+
+def test_tasks_stay_started_until_their_rows_are_written(session, enricher, tasks):
+    """Test that the buffered tasks are only successful once their rows are written."""
+    result_writer = BufferedResultWriter(maximal_number_of_rows=100)
+    result_writer.add(tasks[0].id, EnrichmentCacheEntry, get_row("a"))
+    result_writer.complete(tasks[0].id)
+    result_writer.add(tasks[1].id, EnrichmentCacheEntry, get_row("b"))
+    result_writer.discard(tasks[1].id)
+    result_writer.add(tasks[2].id, EnrichmentCacheEntry, get_row("c"))
+
+    # Should the enricher crash now, no row would be stored, and the tasks
+    # would still be STARTED, so that the reaper recovers them.
+    assert get_statuses(session, tasks) == ["STARTED"] * 3
+    assert session.query(EnrichmentCacheEntry).count() == 0
+
+    assert result_writer.flush(enricher._session, on_failure=pytest.fail) == 1
+
+    # Neither the discarded task nor the running one are written.
+    assert get_statuses(session, tasks) == ["SUCCESS", "STARTED", "STARTED"]
+    assert [entry.input_hash for entry in session.query(EnrichmentCacheEntry)] == ["a"]
+    assert result_writer.flush(enricher._session, on_failure=pytest.fail) == 0
+
+
+def test_conflicting_rows_are_skipped(session, enricher, tasks):
+    """Test that the rows conflicting with existing ones are skipped, without failing."""
+    session.add(EnrichmentCacheEntry(**get_row("a")))
+    session.commit()
+
+    result_writer = BufferedResultWriter()
+    result_writer.add(tasks[0].id, EnrichmentCacheEntry, get_row("a"))
+    result_writer.complete(tasks[0].id)
+    result_writer.add(tasks[1].id, EnrichmentCacheEntry, get_row("b"))
+    result_writer.complete(tasks[1].id)
+    result_writer.add(tasks[2].id, EnrichmentCacheEntry, get_row("b"))
+    result_writer.complete(tasks[2].id)
+
+    assert result_writer.flush(enricher._session, on_failure=pytest.fail) == 3
+    assert get_statuses(session, tasks) == ["SUCCESS"] * 3
+    assert sorted(
+        entry.input_hash for entry in session.query(EnrichmentCacheEntry)
+    ) == ["a", "b"]
+
+
+def test_failing_rows_only_fail_their_task(session, enricher, tasks):
+    """Test that a row which cannot be written is reported for its task only."""
+    result_writer = BufferedResultWriter()
+    result_writer.add(tasks[0].id, EnrichmentCacheEntry, get_row("a"))
+    result_writer.complete(tasks[0].id)
+    result_writer.add(tasks[1].id, EnrichmentCacheEntry, get_row("b", enricher=None))
+    result_writer.complete(tasks[1].id)
+    result_writer.complete(tasks[2].id)
+
+    failures, successes = [], []
+    assert (
+        result_writer.flush(
+            enricher._session,
+            on_failure=lambda task_id, reason: failures.append(task_id),
+            on_success=successes.append,
+        )
+        == 2
+    )
+
+    assert failures == [tasks[1].id]
+    assert successes == [tasks[0].id, tasks[2].id]
+    assert get_statuses(session, tasks) == ["SUCCESS", "STARTED", "SUCCESS"]
+    assert [entry.input_hash for entry in session.query(EnrichmentCacheEntry)] == ["a"]
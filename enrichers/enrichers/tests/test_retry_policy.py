@@ -0,0 +1,78 @@
+"""Test the retries of the failed enrichments, with an exponential backoff."""
+import datetime
+import pytest
+from alchemy_wrapper.models import Task
+from enrichers import RetryPolicy
+
+
+def test_retry_policy_validates_its_parameters():
+    """Test that the retry policy refuses inconsistent parameters."""
+    with pytest.raises(ValueError):
+        RetryPolicy(maximal_number_of_attempts=0)
+    with pytest.raises(ValueError):
+        RetryPolicy(jitter=1.5)
+
+
+def test_retry_policy_backs_off_exponentially():
+    """Test that the delay doubles at each attempt, up to the maximal delay."""
+    policy = RetryPolicy(initial_delay=30, maximal_delay=100, multiplier=2, jitter=0)
+
+    assert [policy.get_delay(attempts) for attempts in (1, 2, 3, 4)] == [
+        30,
+        60,
+        100,
+        100,
+    ]
+
+
+def test_retry_policy_jitter_shortens_the_delay():
+    """Test that the jitter only removes up to the given fraction of the delay."""
+    policy = RetryPolicy(initial_delay=100, jitter=0.5)
+
+    for _ in range(100):
+        assert 50 <= policy.get_delay(1) <= 100
+
+
+def test_retry_policy_only_retries_transient_failures():
+    """Test that only the retryable exceptions are retried, up to the maximal number of attempts."""
+    policy = RetryPolicy(maximal_number_of_attempts=3)
+
+    assert policy.should_retry(ConnectionError(), attempts=2)
+    assert not policy.should_retry(ConnectionError(), attempts=3)
+    assert not policy.should_retry(ValueError(), attempts=1)
+
+
+def test_enricher_retries_transient_failures(session, enricher, taxa):
+    """Test that a task failing with a transient error is retried, then failed."""
+    enricher.failures = [ConnectionError("Connection reset.")]
+
+    assert enricher.enrich_all()
+    assert enricher.enriched == [taxa[1].id, taxa[2].id]
+    task = session.query(Task).filter_by(status="PENDING").one()
+    assert task.attempts == 1
+    assert task.next_attempt_at > datetime.datetime.now()
+
+    # The task is not resumed before its next attempt is due.
+    assert not enricher.enrich_all()
+    session.refresh(task)
+    assert task.attempts == 1
+
+    for attempts in (2, 3):
+        enricher.failures = [ConnectionError("Connection reset.")]
+        task.next_attempt_at = datetime.datetime.now()
+        session.commit()
+        assert not enricher.enrich_all()
+        session.refresh(task)
+        assert task.attempts == attempts
+
+    assert task.status == "FAILURE"
+
+
+def test_enricher_fails_permanent_failures(session, enricher, taxa):
+    """Test that a task failing with a non-retryable error is failed right away."""
+    enricher.failures = [ValueError("Malformed taxon name.")]
+
+    assert not enricher.enrich(taxa[0])
+    task = session.query(Task).one()
+    assert task.status == "FAILURE"
+    assert task.attempts == 1
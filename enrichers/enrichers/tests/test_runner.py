@@ -0,0 +1,108 @@
+"""Test the runner hosting several enrichers in a single process."""
+from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import EntryPoint
+from threading import Event, Thread
+import pytest
+from alchemy_wrapper.models import Task
+from enrichers import runner
+from enrichers.runner import ENTRY_POINT_GROUP, EnricherRunner, load_enricher_class
+from .conftest import DummyTaxonEnricher
+
+
+class OtherDummyTaxonEnricher(DummyTaxonEnricher):
+    """Dummy taxon enricher with its own task type."""
+
+    @classmethod
+    def name(cls) -> str:
+        return "Other dummy taxon enricher"
+
+
+@pytest.fixture(autouse=True)
+def registered_enrichers(monkeypatch):
+    """Registers the dummy enrichers in the entry points, as their setup.py would."""
+    registered = {
+        name: EntryPoint(name=name, value=value, group=ENTRY_POINT_GROUP)
+        for name, value in (
+            ("dummy", "tests.conftest:DummyTaxonEnricher"),
+            ("other_dummy", "tests.test_runner:OtherDummyTaxonEnricher"),
+        )
+    }
+    monkeypatch.setattr(runner, "_get_registered_enrichers", lambda: registered)
+    return registered
+
+
+def test_enrichers_are_loaded_by_name():
+    """Test that the enrichers are loaded from the entry points, or by module and class."""
+    assert load_enricher_class("dummy") is DummyTaxonEnricher
+    assert load_enricher_class("other_dummy") is OtherDummyTaxonEnricher
+    assert (
+        load_enricher_class("tests.test_runner:OtherDummyTaxonEnricher")
+        is OtherDummyTaxonEnricher
+    )
+
+    with pytest.raises(ValueError, match="is not registered"):
+        load_enricher_class("unknown")
+    with pytest.raises(ValueError, match="is not a subclass of the Enricher class"):
+        load_enricher_class("enrichers.runner:EnricherRunner")
+
+
+def test_rounds_of_the_hosted_enrichers_are_scheduled(taxa):
+    """Test that a cycle of the runner runs a round of each of the hosted enrichers."""
+    enrichers = [load_enricher_class(name)() for name in ("dummy", "other_dummy")]
+    stop_requested = Event()
+    rounds = []
+
+    def record_round(enricher, run_round):
+        def run_recorded_round() -> bool:
+            some_success = run_round()
+            rounds.append(enricher.name())
+            # The runner stops once each enricher completed a round.
+            if len(set(rounds)) == len(enrichers):
+                stop_requested.set()
+            return some_success
+
+        return run_recorded_round
+
+    for enricher in enrichers:
+        enricher.run_round = record_round(enricher, enricher.run_round)
+
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            EnricherRunner(enrichers, number_of_workers=2)._schedule_rounds(
+                pool, stop_requested
+            )
+    finally:
+        for enricher in enrichers:
+            enricher._session.close()
+
+    assert sorted(set(rounds)) == sorted(enricher.name() for enricher in enrichers)
+    # Each enricher enriched the taxa on its own, with its own task type.
+    for enricher in enrichers:
+        assert sorted(enricher.enriched) == sorted(taxon.id for taxon in taxa)
+
+
+def test_completed_results_are_written_upon_shutdown(session, enricher, taxa):
+    """Test that the results buffered by an abandoned round are written from another thread."""
+    tasks = []
+    for taxon in taxa[:2]:
+        task = enricher._claim_task(taxon)
+        task.start(session=enricher._session)
+        tasks.append(task)
+    enricher._result_writer.complete(tasks[0].id)
+    enricher._in_flight_task_id = tasks[1].id
+
+    def shut_down():
+        # As the runner does once the shutdown deadline expired.
+        enricher.flush_pending_results()
+        enricher.release_in_flight_task()
+
+    shutdown = Thread(target=shut_down)
+    shutdown.start()
+    shutdown.join()
+
+    session.expire_all()
+    assert [session.get(Task, task.id).status for task in tasks] == [
+        "SUCCESS",
+        "PENDING",
+    ]
+    assert len(enricher._result_writer) == 0
@@ -0,0 +1,75 @@
+"""Test the fair scheduling of the work items across their owners."""
+import datetime
+import pytest
+from alchemy_wrapper.models import Administrator, Task, TaskType, User
+from enrichers import FairScheduler
+
+
+@pytest.fixture
+def schedule(session):
+    """Returns a function creating the provided tasks and returning them in scheduled order."""
+    task_type = TaskType(name="Scheduled", description="")
+    session.add(task_type)
+    session.flush()
+    users = {}
+
+    def create_and_order(items, scheduler=FairScheduler(), administrators=()):
+        now = datetime.datetime.now()
+        for name in {owner for owner, _ in items}:
+            users[name] = User(first_name=name, last_name="Doe", description="")
+            session.add(users[name])
+        session.flush()
+        for name in administrators:
+            session.add(Administrator(user_id=users[name].id))
+        labels = {}
+        for age, (owner, priority) in enumerate(items):
+            task = Task(
+                user_id=users[owner].id,
+                task_type_id=task_type.id,
+                created_at=now - datetime.timedelta(minutes=len(items) - age),
+                priority=priority,
+            )
+            session.add(task)
+            session.flush()
+            labels[task.id] = f"{owner}{age}"
+        session.commit()
+        return [
+            labels[task.id]
+            for task in scheduler.order(
+                session.query(Task),
+                user_id=Task.user_id,
+                created_at=Task.created_at,
+                priority=Task.priority,
+            )
+        ]
+
+    return create_and_order
+
+
+def test_scheduler_interleaves_the_users(schedule):
+    """Test that a user with a single item is not starved by a user with a backlog."""
+    items = [("a", 0), ("a", 0), ("a", 0), ("b", 0), ("c", 0), ("c", 0)]
+
+    assert schedule(items) == ["a0", "b3", "c4", "a1", "c5", "a2"]
+
+
+def test_scheduler_runs_higher_priorities_first(schedule):
+    """Test that the priority prevails over the fair share."""
+    items = [("a", 0), ("a", 0), ("b", 1), ("b", 1)]
+
+    assert schedule(items) == ["b2", "b3", "a0", "a1"]
+
+
+def test_scheduler_boosts_the_administrators(schedule):
+    """Test that administrators get as many items as their weight per round."""
+    items = [("a", 0), ("a", 0), ("a", 0), ("b", 0), ("b", 0), ("b", 0)]
+
+    assert schedule(
+        items, scheduler=FairScheduler(administrator_weight=2), administrators="b"
+    ) == ["b3", "a0", "b4", "b5", "a1", "a2"]
+
+
+def test_scheduler_validates_the_weight():
+    """Test that the weight of the administrators must be strictly positive."""
+    with pytest.raises(ValueError):
+        FairScheduler(administrator_weight=0)
@@ -0,0 +1,44 @@
+"""Test the recycling of the session of the enrichers."""
+from enrichers import enricher as enricher_module
+
+
+def test_session_is_recycled_after_the_number_of_items(enricher, taxa, monkeypatch):
+    """Test that the session is replaced once enough items were enriched."""
+    monkeypatch.setattr(enricher, "_get_items_per_session", lambda: 2)
+    first_session = enricher._session
+
+    enricher._complete_item()
+    assert enricher._session is first_session
+    assert enricher._items_since_recycle == 1
+
+    enricher._complete_item()
+    assert enricher._session is not first_session
+    assert enricher._items_since_recycle == 0
+
+    # The batches of the async enrichers complete several items at once.
+    second_session = enricher._session
+    enricher._complete_item(number_of_items=5)
+    assert enricher._session is not second_session
+
+
+def test_session_is_recycled_above_the_memory_watermark(enricher, monkeypatch):
+    """Test that the session is replaced once the resident memory exceeds the watermark."""
+    monkeypatch.setattr(enricher, "_get_memory_watermark", lambda: 1000)
+    first_session = enricher._session
+
+    monkeypatch.setattr(enricher_module, "get_resident_memory", lambda: 999)
+    enricher._complete_item()
+    assert enricher._session is first_session
+
+    monkeypatch.setattr(enricher_module, "get_resident_memory", lambda: 1001)
+    enricher._complete_item()
+    assert enricher._session is not first_session
+
+
+def test_recycling_keeps_the_stop_request(enricher, taxa):
+    """Test that a shutdown requested during a round survives the recycling of the session."""
+    enricher.request_stop()
+    enricher._recycle_session()
+
+    assert enricher.is_stopping()
+    assert enricher._session.query(type(taxa[0])).count() == 3
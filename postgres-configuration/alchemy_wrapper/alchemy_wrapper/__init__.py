@@ -1,7 +1,9 @@
 """Module providing core models for the application."""
 from alchemy_wrapper.models import Base
 from alchemy_wrapper.database import engine, Session
+from alchemy_wrapper.migrations import apply_migrations
 
 Base.metadata.create_all(bind=engine)
+apply_migrations(engine)
 
 __all__ = ["Base", "engine", "Session"]
@@ -3,8 +3,9 @@ import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-
-DATABASE_URL = (
+# The URL of the database may be provided as a whole, for instance to
+# run the tests against a local SQLite file instead of the Postgres one.
+DATABASE_URL = os.environ.get("DATABASE_URL") or (
     f"postgresql://{os.environ['POSTGRES_USER']}:"
     f"{os.environ['POSTGRES_PASSWORD']}@postgres_database:5432"
     f"/{os.environ['POSTGRES_DB']}"
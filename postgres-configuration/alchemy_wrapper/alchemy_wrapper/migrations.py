@@ -0,0 +1,44 @@
+"""Submodule providing the migrations of the schema of the existing databases.
+
+Implementative details
+----------------------
+The tables are created with Base.metadata.create_all, which only creates the missing tables
+and never alters the existing ones. The columns, and indices, added to a table after it was
+first created are therefore added to the existing databases by the statements below, which
+are executed right after the tables are created.
+
+Each statement must be idempotent, as it is executed at each start of each service, and the
+statements are only executed on Postgres: the other databases, such as the SQLite files used
+by the tests, are always created from scratch with the current schema.
+"""
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# The migrations of the tables of the core models, in order.
+MIGRATIONS: List[str] = [
+    # The heartbeats of the running tasks, used to recover the abandoned ones.
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP WITHOUT TIME ZONE",
+    # The attempts of the tasks, and the time of their next one, used to retry them.
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP WITHOUT TIME ZONE",
+    # The priority of the tasks, used to schedule them.
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS priority INTEGER NOT NULL DEFAULT 0",
+]
+
+
+def apply_migrations(engine: Engine, migrations: List[str] = MIGRATIONS):
+    """Applies the provided migrations to the database of the engine.
+
+    Parameters
+    ----------
+    engine
+        engine of the database to migrate.
+    migrations
+        idempotent statements to execute, in order, in a single transaction.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as connection:
+        for migration in migrations:
+            connection.execute(text(migration))
@@ -10,6 +10,7 @@ from alchemy_wrapper.models.translation import Translation
 from alchemy_wrapper.models.social_profiles import SocialProfile
 from alchemy_wrapper.models.social import Social
 from alchemy_wrapper.models.data_payload import DataPayload
+from alchemy_wrapper.models.task_resource_usage import TaskResourceUsage
 
 __all__ = [
     "Base",
@@ -31,5 +32,6 @@ __all__ = [
     "TaskType",
     "Document",
     "TaskRelatedDocument",
-    "DerivedTask"
+    "DerivedTask",
+    "TaskResourceUsage",
 ]
@@ -13,6 +13,8 @@ from sqlalchemy import (
     Float,
     Enum,
     UniqueConstraint,
+    or_,
+    update,
 )
 
 from emikg_interfaces import User as UserInterface
@@ -519,6 +521,15 @@ class Task(Base, TaskInterface):
     updated_at = Column(
         DateTime, nullable=False, default=func.now(), onupdate=func.now()
     )
+    # The last time the worker executing the task reported that it is still
+    # alive. A STARTED task whose heartbeat is too old is considered abandoned.
+    heartbeat_at = Column(DateTime, nullable=True)
+    # The number of times the task has been started.
+    attempts = Column(Integer, nullable=False, default=0)
+    # The time before which a PENDING task waiting to be retried must not be started.
+    next_attempt_at = Column(DateTime, nullable=True)
+    # Tasks with a higher priority are executed before the others.
+    priority = Column(Integer, nullable=False, default=0)
 
     def __repr__(self):
         """Represent instance as a unique string."""
@@ -527,12 +538,96 @@ class Task(Base, TaskInterface):
     def restart(self, session: Type[Session]):
         """Restart the task."""
         self.status = "PENDING"
+        self.attempts = 0
+        self.next_attempt_at = None
         session.commit()
 
+    def release(
+        self, session: Type[Session], count_attempt: bool = True, commit: bool = True
+    ):
+        """Put the task back to PENDING, preserving the number of attempts.
+
+        Parameters
+        ----------
+        session
+            The session to use.
+        count_attempt
+            Whether the interrupted attempt counts towards the maximal number
+            of attempts. It does not when the task was released voluntarily,
+            as when the enricher executing it is shutting down.
+        commit
+            Whether to commit the change. It is not committed when several tasks
+            locked by the same transaction are released, until all of them are.
+        """
+        self.status = "PENDING"
+        self.heartbeat_at = None
+        if not count_attempt:
+            self.attempts = max((self.attempts or 0) - 1, 0)
+        if commit:
+            session.commit()
+
+    def retry(
+        self,
+        session: Type[Session],
+        next_attempt_at: datetime.datetime,
+        count_attempt: bool = True,
+    ):
+        """Put the task back to PENDING, to be attempted again after the provided time.
+
+        Parameters
+        ----------
+        session
+            The session to use.
+        next_attempt_at
+            The time before which the task must not be attempted again.
+        count_attempt
+            Whether the failed attempt counts towards the maximal number of
+            attempts. It does not when the task is deferred because the remote
+            repository it depends on is known to be unavailable.
+        """
+        self.status = "PENDING"
+        self.heartbeat_at = None
+        self.next_attempt_at = next_attempt_at
+        if not count_attempt:
+            self.attempts = max((self.attempts or 0) - 1, 0)
+        session.commit()
+
+    @staticmethod
+    def is_due():
+        """Return the SQL condition selecting the tasks that may be attempted now."""
+        return or_(
+            Task.next_attempt_at.is_(None),
+            Task.next_attempt_at <= datetime.datetime.now(),
+        )
+
     def start(self, session: Type[Session]):
         """Start the task."""
         self.status = "STARTED"
         self.started_at = datetime.datetime.now()
+        self.heartbeat_at = self.started_at
+        self.attempts = (self.attempts or 0) + 1
+        session.commit()
+
+    def heartbeat(self, session: Type[Session]):
+        """Record that the worker executing the task is still alive."""
+        Task.record_heartbeats([self.id], session=session)
+
+    @staticmethod
+    def record_heartbeats(task_ids: List[int], session: Type[Session]):
+        """Record that the workers executing the provided tasks are still alive.
+
+        Implementative details
+        ----------------------
+        The heartbeats are written with a single UPDATE which leaves the updated_at
+        column untouched, as the durations and the cooldowns of the tasks are
+        computed from it, and must not be shifted by every heartbeat.
+        """
+        session.execute(
+            update(Task)
+            .where(Task.id.in_(task_ids))
+            .values(heartbeat_at=datetime.datetime.now(), updated_at=Task.updated_at)
+            .execution_options(synchronize_session=False)
+        )
         session.commit()
 
     def success(self, session: Type[Session]):
@@ -547,14 +642,29 @@ class Task(Base, TaskInterface):
         session.commit()
 
     def failure(
-        self, session: Type[Session], reason: Optional[Union[str, Exception]] = None
+        self,
+        session: Type[Session],
+        reason: Optional[Union[str, Exception]] = None,
+        commit: bool = True,
     ):
-        """Finish the task with a failure."""
+        """Finish the task with a failure.
+
+        Parameters
+        ----------
+        session
+            The session to use.
+        reason
+            The reason for the failure, stored in the failure log of the task.
+        commit
+            Whether to commit the failure. It is not committed when several tasks
+            locked by the same transaction are failed, until all of them are.
+        """
         if self.status == "FAILURE":
             return
         self.status = "FAILURE"
-        session.commit()
         if reason is None:
+            if commit:
+                session.commit()
             return
 
         if isinstance(reason, subprocess.CalledProcessError):
@@ -564,7 +674,11 @@ class Task(Base, TaskInterface):
             )
 
         if isinstance(reason, Exception):
-            reason = traceback.format_exc()
+            # The traceback is taken from the exception itself, as the failure
+            # may be recorded by a thread other than the one that raised it.
+            reason = "".join(
+                traceback.format_exception(type(reason), reason, reason.__traceback__)
+            )
 
         # We create a new Document associated to the task
         path = f"/app/safe/tasks/{self.id}/failure.txt"
@@ -594,7 +708,10 @@ class Task(Base, TaskInterface):
 
         session.add(task_related_documents)
 
-        session.commit()
+        if commit:
+            session.commit()
+        else:
+            session.flush()
 
     def get_task_duration(self) -> float:
         """Return task duration."""
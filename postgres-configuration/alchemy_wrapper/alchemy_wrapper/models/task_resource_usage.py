@@ -0,0 +1,71 @@
+"""SQLAlchemy class for task_resource_usage table.
+
+Each row records the resources consumed by an attempt of a task, as measured by
+the worker executing it, so that the tasks which are CPU-bound, memory-hungry or
+I/O-bound can be identified for capacity planning.
+"""
+from typing import Optional, Type
+from sqlalchemy import BigInteger, Column, DateTime, Float, ForeignKey, Integer
+from sqlalchemy.sql import func
+from alchemy_wrapper.models.core import Base, Task
+from alchemy_wrapper.database import Session
+
+
+class TaskResourceUsage(Base):
+    """SQLAlchemy class for task_resource_usage table."""
+
+    __tablename__ = "task_resource_usage"
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(
+        Integer, ForeignKey(Task.id, ondelete="CASCADE"), nullable=False, index=True
+    )
+    # The attempt of the task the usage refers to, starting from one.
+    attempt = Column(Integer, nullable=False)
+    wall_time = Column(Float, nullable=False)
+    user_cpu_time = Column(Float, nullable=False)
+    system_cpu_time = Column(Float, nullable=False)
+    # The CPU time of the child processes, such as the steps of the dirty pipeline.
+    children_user_cpu_time = Column(Float, nullable=False)
+    children_system_cpu_time = Column(Float, nullable=False)
+    # Peak resident memory of the worker process, in bytes, which is process-wide
+    # and thus includes the attempts executed concurrently by the same process.
+    peak_rss = Column(BigInteger, nullable=True)
+    # Peak resident memory of the largest child process, in bytes, when known.
+    children_peak_rss = Column(BigInteger, nullable=True)
+    # Bytes read from and written to the storage, including the child processes.
+    read_bytes = Column(BigInteger, nullable=True)
+    written_bytes = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=func.now())
+
+    def __repr__(self):
+        """Represent instance as a unique string."""
+        return f"<TaskResourceUsage({self.task_id!r}, {self.attempt!r})>"
+
+    def get_cpu_time(self) -> float:
+        """Return the total CPU time of the attempt, including the child processes."""
+        return (
+            self.user_cpu_time
+            + self.system_cpu_time
+            + self.children_user_cpu_time
+            + self.children_system_cpu_time
+        )
+
+    def get_peak_memory(self) -> Optional[int]:
+        """Return the largest peak resident memory of the worker or of its children."""
+        peaks = [
+            peak for peak in (self.peak_rss, self.children_peak_rss) if peak is not None
+        ]
+        return max(peaks) if peaks else None
+
+    @staticmethod
+    def get_latest(
+        task_id: int, session: Type[Session]
+    ) -> Optional["TaskResourceUsage"]:
+        """Return the resource usage of the latest attempt of the task, if any."""
+        return (
+            session.query(TaskResourceUsage)
+            .filter_by(task_id=task_id)
+            .order_by(TaskResourceUsage.attempt.desc(), TaskResourceUsage.id.desc())
+            .first()
+        )
@@ -13,6 +13,7 @@ from alchemy_wrapper.models import Sample as SampleTable
 from alchemy_wrapper.models import Taxon as TaxonTable
 from alchemy_wrapper.models import Task as TaskTable
 from alchemy_wrapper.models import Document as DocumentTable
+from alchemy_wrapper.models import TaskResourceUsage as TaskResourceUsageTable
 from alchemy_wrapper.models import ORCID
 from .section import (
     RecordPage,
@@ -26,6 +27,7 @@ from .section import (
     DeletePin,
     CreatedByBotPin,
     TimeRecordPin,
+    ResourceUsagePin,
 )
 from ..exceptions import APIException, NotLoggedIn, Unauthorized
 from ..application import db
@@ -500,6 +502,25 @@ class Task(TaskInterface, Section, RecordPage, RecordBadge):
         """Return the task duration."""
         return self._task.get_task_duration()
 
+    def get_resource_usage(self) -> Optional[TaskResourceUsageTable]:
+        """Return the resources consumed by the latest attempt of the task, if recorded."""
+        return TaskResourceUsageTable.get_latest(self.get_id(), session=db.session)
+
+    def _get_resource_usage_pins(self) -> List[Type[Pin]]:
+        """Return the pin with the resources consumed by the task, if recorded."""
+        resource_usage = self.get_resource_usage()
+        if resource_usage is None:
+            return []
+        return [
+            ResourceUsagePin(
+                cpu_time_in_seconds=resource_usage.get_cpu_time(),
+                wall_time_in_seconds=resource_usage.wall_time,
+                peak_memory_in_bytes=resource_usage.get_peak_memory(),
+                read_bytes=resource_usage.read_bytes,
+                written_bytes=resource_usage.written_bytes,
+            )
+        ]
+
     def has_pins(self) -> bool:
         """Return whether the task has pins."""
         return True
@@ -538,6 +559,7 @@ class Task(TaskInterface, Section, RecordPage, RecordBadge):
                 if self.has_started() or self.has_completed()
                 else ()
             ),
+            *self._get_resource_usage_pins(),
             *(
                 (
                     DeletePin(
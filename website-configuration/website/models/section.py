@@ -2,7 +2,7 @@
 
 from typing import List, Optional, Type, Union
 from emikg_interfaces import Authored, Record
-from humanize import naturaldelta
+from humanize import naturaldelta, naturalsize
 from flask import render_template
 
 
@@ -150,6 +150,33 @@ class TimeRecordPin(FontAwesomePin):
             classes=["fa-solid", "fa-clock"], color="blue", name=name
         )
 
+class ResourceUsagePin(FontAwesomePin):
+    """Class describing a pin with the resources consumed by a task."""
+
+    def __init__(
+        self,
+        cpu_time_in_seconds: float,
+        wall_time_in_seconds: float,
+        peak_memory_in_bytes: Optional[int],
+        read_bytes: Optional[int],
+        written_bytes: Optional[int],
+    ) -> None:
+        # The resources are converted to a human readable format using the humanize
+        # functions naturaldelta and naturalsize. The memory and I/O counters may
+        # not be available on every platform, in which case they are omitted.
+        name = (
+            f"Used {naturaldelta(cpu_time_in_seconds)} of CPU time "
+            f"over {naturaldelta(wall_time_in_seconds)}"
+        )
+        if peak_memory_in_bytes is not None:
+            name += f", peak memory {naturalsize(peak_memory_in_bytes)}"
+        if read_bytes is not None and written_bytes is not None:
+            name += f", read {naturalsize(read_bytes)}, wrote {naturalsize(written_bytes)}"
+
+        super().__init__(
+            classes=["fa-solid", "fa-microchip"], color="blue", name=name
+        )
+
 class RecordBadge:
     """Abstract interface describing a record badge."""
 